@@ -0,0 +1,23 @@
+import logging
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from warehouse_backend import InventoryManager, Item, OrderManager
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # The persistence helpers default to files in the working directory.
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    logging.getLogger("warehouse").setLevel(logging.CRITICAL)
+    yield
+    logging.getLogger("warehouse").setLevel(logging.NOTSET)
+@pytest.fixture
+def managers():
+    inventory_manager = InventoryManager()
+    for item in (Item("A101", "Widget", 10, "Gadgets"), Item("B205", "Gizmo", 5, "Gadgets"),
+                 Item("C310", "Doodad", 0, "Accessories")):
+        inventory_manager.add_item(item)
+    return inventory_manager, OrderManager(inventory_manager, retry_on_restock=True)
@@ -0,0 +1,32 @@
+import random
+import pytest
+from warehouse_backend import InventoryManager, Item, Order, OrderManager
+def outcome(stock, orders, **processing):
+    inventory_manager = InventoryManager()
+    for item_id, quantity in stock.items():
+        inventory_manager.add_item(Item(item_id, item_id.title(), quantity))
+    order_manager = OrderManager(inventory_manager, retry_on_restock=True)
+    for order_id, items_ordered in orders:
+        order_manager.submit_order(Order(order_id, dict(items_ordered)))
+    result = order_manager.process_all_orders(**processing)
+    return ([order.order_id for order in result.fulfilled], [order.order_id for order in result.unfulfilled],
+            result.shortages, result.units_allocated,
+            {item_id: item.quantity for item_id, item in inventory_manager.items.items()},
+            [order.order_id for order in order_manager.fulfilled_orders],
+            [order.order_id for order in order_manager.unfulfilled_orders])
+def test_batch_matches_fifo_on_contended_stock():
+    stock = {"A101": 10, "B205": 5, "C310": 0}
+    orders = [("ORD1", {"A101": 6}), ("ORD2", {"A101": 6}), ("ORD3", {"A101": 4, "B205": 2}),
+              ("ORD4", {"C310": 1}), ("ORD5", {"Z999": 1}), ("ORD6", {"B205": 3}), ("ORD7", {"B205": 1})]
+    fifo = outcome(stock, orders)
+    assert fifo[0] == ["ORD1", "ORD3", "ORD6"]
+    assert fifo[2] == {"ORD2": ("A101", 6, 4), "ORD4": ("C310", 1, 0), "ORD5": ("Z999", 1, None),
+                       "ORD7": ("B205", 1, 0)}
+    assert outcome(stock, orders, batch=True) == fifo
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_batch_matches_fifo_on_random_streams(seed):
+    rng = random.Random(seed)
+    stock = {f"SKU{n}": rng.randint(0, 30) for n in range(8)}
+    orders = [(f"ORD{n}", {f"SKU{rng.randrange(10)}": rng.randint(1, 5) for _ in range(rng.randint(1, 3))})
+              for n in range(200)]
+    assert outcome(stock, orders, batch=True) == outcome(stock, orders)
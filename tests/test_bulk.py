@@ -0,0 +1,21 @@
+import gc
+from warehouse_backend import Item, Order
+def test_bulk_methods_leave_the_collector_alone(managers):
+    inventory_manager, order_manager = managers
+    gc.disable()
+    try:
+        inventory_manager.add_items([Item("D400", "Thing", 1)])
+        order_manager.submit_orders([Order("ORD1", {"A101": 1})])
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+    inventory_manager.upsert_items([Item("D400", "Thing", 2)])
+    order_manager.submit_orders([Order("ORD2", {"A101": 1})])
+    assert gc.isenabled()
+def test_submit_orders_reports_invalid_rows_and_queues_the_rest(managers):
+    inventory_manager, order_manager = managers
+    result = order_manager.submit_orders([Order("ORD1", {"A101": 1}), Order("", {"A101": 1}),
+                                          Order("ORD3", {"A101": 0})], batch_size=2)
+    assert result.submitted == 1 and result.batches == 2
+    assert [row for row, _ in result.errors] == [2, 3]
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD1"]
@@ -0,0 +1,31 @@
+import csv
+from warehouse_backend import Order
+from warehouse_export import LogExporter
+from warehouse_persistence import load_orders_from_file, save_orders_to_file
+def exported_ids(filename):
+    with open(filename, newline="") as f:
+        return [row[0] for row in list(csv.reader(f))[1:]]
+def test_due_date_filter_on_runtime_fulfilled_orders(managers, workdir):
+    # The GUI setup: lazy history, so runtime orders sit in the archive's columnar tail.
+    inventory_manager, order_manager = managers
+    save_orders_to_file(order_manager)
+    load_orders_from_file(order_manager, lazy_history=True)
+    for order_id, due_date in (("ORD1", "2025-01-15"), ("ORD2", "2025-02-15"), ("ORD3", None)):
+        order_manager.submit_order(Order(order_id, {"A101": 1}, due_date=due_date))
+    order_manager.process_all_orders()
+    results = LogExporter(order_manager, str(workdir)).export(due_after="2025-02-01", due_before="2025-03-01")
+    filename = str(workdir / "fulfilled_orders.csv")
+    assert results[filename] == 1
+    assert exported_ids(filename) == ["ORD2"]
+def test_incremental_export_appends_new_orders(managers, workdir):
+    inventory_manager, order_manager = managers
+    exporter = LogExporter(order_manager, str(workdir))
+    order_manager.submit_order(Order("ORD1", {"A101": 1}))
+    order_manager.process_all_orders()
+    exporter.export(incremental=True)
+    order_manager.submit_order(Order("ORD2", {"A101": 1}))
+    order_manager.process_all_orders()
+    results = exporter.export(incremental=True)
+    filename = str(workdir / "fulfilled_orders.csv")
+    assert results[filename] == 1
+    assert exported_ids(filename) == ["ORD1", "ORD2"]
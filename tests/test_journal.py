@@ -0,0 +1,66 @@
+from warehouse_backend import InventoryManager, Order, OrderManager
+from warehouse_journal import Journal
+from warehouse_persistence import load_inventory_from_file, load_orders_from_file
+def recovered(journal_filename="warehouse.journal", read_only=False):
+    # Fresh managers rebuilt from the snapshot files plus the journal.
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager, retry_on_restock=True)
+    load_inventory_from_file(inventory_manager)
+    journal_seq = load_orders_from_file(order_manager, lazy_history=True)
+    Journal(journal_filename).recover(inventory_manager, order_manager, journal_seq, read_only=read_only)
+    return inventory_manager, order_manager
+def journalled(managers):
+    inventory_manager, order_manager = managers
+    journal = Journal()
+    journal.attach(inventory_manager, order_manager)
+    journal.checkpoint()
+    return journal
+def test_reset_survives_a_crash_before_the_snapshot(managers):
+    inventory_manager, order_manager = managers
+    journal = journalled(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 1}))
+    order_manager.process_all_orders()
+    order_manager.submit_order(Order("ORD2", {"A101": 1}))
+    inventory_manager.clear_items()
+    order_manager.clear_orders()
+    journal.close()  # crash: the reset snapshot was never written
+    inventory_manager, order_manager = recovered()
+    assert not inventory_manager.items
+    assert not order_manager.order_queue and not order_manager.fulfilled_orders
+def crash_with_torn_tail(managers):
+    # Leaves a journal holding ORD1 (fulfilled), ORD2 (queued) and a restock
+    # of B205, followed by a record cut off mid-append.
+    inventory_manager, order_manager = managers
+    journal = journalled(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 3}))
+    order_manager.process_all_orders()
+    order_manager.submit_order(Order("ORD2", {"B205": 1}))
+    inventory_manager.update_item("B205", 8)
+    journal.close()
+    with open("warehouse.journal", "ab") as f:
+        f.write(b'{"op":"put_item","item":{"item_id":"D4')
+def test_recovery_replays_up_to_a_torn_tail(managers, workdir):
+    crash_with_torn_tail(managers)
+    inventory_manager, order_manager = recovered()
+    assert inventory_manager.items["A101"].quantity == 7
+    assert inventory_manager.items["B205"].quantity == 8
+    assert "D4" not in inventory_manager.items
+    assert [order.order_id for order in order_manager.fulfilled_orders] == ["ORD1"]
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD2"]
+    assert not (workdir / "warehouse.journal").read_bytes().endswith(b'"D4')
+def test_read_only_recovery_leaves_a_torn_tail_alone(managers, workdir):
+    crash_with_torn_tail(managers)
+    before = (workdir / "warehouse.journal").read_bytes()
+    inventory_manager, order_manager = recovered(read_only=True)
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD2"]
+    assert (workdir / "warehouse.journal").read_bytes() == before
+def test_records_appended_after_a_torn_tail_are_recovered(managers):
+    crash_with_torn_tail(managers)
+    inventory_manager, order_manager = recovered()
+    journal = Journal()
+    journal.attach(inventory_manager, order_manager)
+    order_manager.submit_order(Order("ORD3", {"A101": 1}))
+    journal.close()
+    inventory_manager, order_manager = recovered()
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD2", "ORD3"]
+    assert order_manager.order_queue[-1].arrival == 2
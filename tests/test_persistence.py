@@ -0,0 +1,23 @@
+from warehouse_backend import ColumnarOrderLog, InventoryManager, Order, OrderManager
+from warehouse_persistence import OrderArchive, load_orders_from_file, save_orders_to_file
+def fields(order):
+    return order.order_id, order.items_ordered, order.priority, order.due_date, order.arrival
+def test_columnar_log_keeps_order_fields():
+    order = Order("ORD1", {"A101": 2, "B205": 1}, priority=3, due_date="2025-03-31")
+    order.arrival = 7
+    plain = Order("ORD2", {"A101": 1})
+    log = ColumnarOrderLog([order, plain])
+    assert [fields(entry) for entry in log] == [fields(order), fields(plain)]
+def test_fulfilled_order_survives_lazy_round_trip(managers):
+    inventory_manager, order_manager = managers
+    save_orders_to_file(order_manager)
+    load_orders_from_file(order_manager, lazy_history=True)
+    assert isinstance(order_manager.fulfilled_orders, OrderArchive)
+    order = Order("ORD1", {"A101": 2}, priority=2, due_date="2025-03-31")
+    order_manager.submit_order(order)
+    assert order_manager.process_next_order().ok
+    assert fields(order_manager.fulfilled_orders[0]) == fields(order)
+    save_orders_to_file(order_manager)
+    reloaded = OrderManager(InventoryManager())
+    load_orders_from_file(reloaded, lazy_history=True)
+    assert [fields(entry) for entry in reloaded.fulfilled_orders] == [fields(order)]
@@ -0,0 +1,63 @@
+from warehouse_backend import Order, ReservationLedger, Result
+def ledger(managers, ttl=60.0):
+    # A ledger on a clock the test moves by hand: `now[0] += seconds`.
+    inventory_manager, order_manager = managers
+    now = [0.0]
+    return ReservationLedger(order_manager, default_ttl=ttl, clock=lambda: now[0]), now
+def test_reserved_stock_is_held_from_other_orders(managers):
+    inventory_manager, order_manager = managers
+    reservations, now = ledger(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 6}))
+    order_manager.submit_order(Order("ORD2", {"A101": 6}))
+    assert reservations.reserve_next().ok
+    assert inventory_manager.items["A101"].quantity == 10
+    assert inventory_manager.reserved == {"A101": 6}
+    assert order_manager.process_next_order().status == Result.INSUFFICIENT_STOCK
+    assert [order.order_id for order in order_manager.unfulfilled_orders] == ["ORD2"]
+def test_commit_takes_the_reserved_stock(managers):
+    inventory_manager, order_manager = managers
+    reservations, now = ledger(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 6, "B205": 2}))
+    reservations.reserve_next()
+    now[0] += 59
+    assert reservations.commit("ORD1").ok
+    assert inventory_manager.items["A101"].quantity == 4 and inventory_manager.items["B205"].quantity == 3
+    assert not inventory_manager.reserved and not order_manager.in_flight
+    assert [order.order_id for order in order_manager.fulfilled_orders] == ["ORD1"]
+    assert reservations.commit("ORD1").status == Result.UNKNOWN_RESERVATION
+def test_expired_reservation_returns_the_order_to_the_front_of_the_queue(managers):
+    inventory_manager, order_manager = managers
+    reservations, now = ledger(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 6}))
+    order_manager.submit_order(Order("ORD2", {"B205": 1}))
+    reservations.reserve_next()
+    reservations.reserve_next(ttl=120)
+    now[0] += 60
+    assert reservations.reap() == 1
+    assert list(reservations.reservations) == ["ORD2"]
+    assert inventory_manager.reserved == {"B205": 1}
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD1"]
+    assert reservations.commit("ORD1").status == Result.UNKNOWN_RESERVATION
+    assert inventory_manager.items["A101"].quantity == 10
+    now[0] += 60
+    assert reservations.commit("ORD2").status == Result.UNKNOWN_RESERVATION
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD2", "ORD1"]
+    assert not inventory_manager.reserved
+def test_release_hands_stock_back(managers):
+    inventory_manager, order_manager = managers
+    reservations, now = ledger(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 10}))
+    order_manager.submit_order(Order("ORD2", {"B205": 1}))
+    reservations.reserve_next()
+    assert reservations.release("ORD1").ok
+    assert not inventory_manager.reserved and not reservations.reservations
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD1", "ORD2"]
+    assert order_manager.process_next_order().ok
+    assert reservations.reap() == 0
+def test_unreservable_order_is_logged_as_unfulfilled(managers):
+    inventory_manager, order_manager = managers
+    reservations, now = ledger(managers)
+    order_manager.submit_order(Order("ORD1", {"C310": 1}))
+    assert reservations.reserve_next().status == Result.INSUFFICIENT_STOCK
+    assert not inventory_manager.reserved and not order_manager.in_flight
+    assert [order.order_id for order in order_manager.unfulfilled_orders] == ["ORD1"]
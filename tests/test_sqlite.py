@@ -0,0 +1,93 @@
+from warehouse_backend import InventoryManager, Order, OrderManager, OrderScheduler
+from warehouse_sqlite import SqliteStore
+def reopen(filename, scheduler=None):
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager, scheduler=scheduler, retry_on_restock=scheduler is None)
+    store = SqliteStore(filename)
+    store.recover(inventory_manager, order_manager)
+    return inventory_manager, order_manager, store
+def test_recover_restores_arrivals_and_numbers_new_orders_after_them(managers, workdir):
+    inventory_manager, order_manager = managers
+    store = SqliteStore(str(workdir / "warehouse.db"))
+    store.save_all(inventory_manager, order_manager)
+    store.attach(inventory_manager, order_manager)
+    order_manager.submit_order(Order("ORD1", {"C310": 1}))  # out of stock: backordered
+    order_manager.process_all_orders()
+    order_manager.submit_order(Order("ORD2", {"A101": 1}))
+    store.close()
+    inventory_manager, order_manager, store = reopen(str(workdir / "warehouse.db"))
+    assert [order.arrival for order in order_manager.unfulfilled_orders] == [0]
+    assert [order.arrival for order in order_manager.order_queue] == [1]
+    order_manager.submit_order(Order("ORD3", {"A101": 1}))
+    assert order_manager.order_queue[-1].arrival == 2
+    store.close()
+def test_scheduler_keeps_stored_arrival_order(managers, workdir):
+    inventory_manager, order_manager = managers
+    store = SqliteStore(str(workdir / "warehouse.db"))
+    store.save_all(inventory_manager, order_manager)
+    store.attach(inventory_manager, order_manager)
+    for order_id in ("ORD1", "ORD2", "ORD3"):
+        order_manager.submit_order(Order(order_id, {"A101": 1}))
+    store.close()
+    inventory_manager, order_manager, store = reopen(str(workdir / "warehouse.db"), OrderScheduler("fifo"))
+    order_manager.submit_order(Order("ORD4", {"A101": 1}))
+    assert [order.order_id for order in order_manager.order_queue] == ["ORD1", "ORD2", "ORD3", "ORD4"]
+    store.close()
+def attached_store(managers, workdir):
+    inventory_manager, order_manager = managers
+    store = SqliteStore(str(workdir / "warehouse.db"))
+    store.save_all(inventory_manager, order_manager)
+    store.attach(inventory_manager, order_manager)
+    return store
+def test_items_page_filters_and_counts(managers, workdir):
+    inventory_manager, order_manager = managers
+    store = attached_store(managers, workdir)
+    items, total = store.items_page("quantity", page=0, page_size=2, descending=True)
+    assert [item.item_id for item in items] == ["A101", "B205"] and total == 3
+    items, total = store.items_page("name", term="gi")
+    assert [item.item_id for item in items] == ["B205"] and total == 1
+    store.close()
+def test_items_at_reorder_point_sees_uncommitted_writes(managers, workdir):
+    inventory_manager, order_manager = managers
+    store = attached_store(managers, workdir)
+    inventory_manager.set_reorder_point("A101", 4)
+    inventory_manager.set_reorder_point("B205", 6)
+    inventory_manager.update_item("A101", 2)
+    assert [item.item_id for item in store.items_at_reorder_point()] == ["A101", "B205"]
+    store.close()
+class FakeTree:
+    # The parts of ttk.Treeview that InventoryView uses.
+    def __init__(self):
+        self.rows = []
+    def insert(self, parent, index, iid, values):
+        self.rows.insert(index, iid)
+    def delete(self, iid):
+        self.rows.remove(iid)
+    def item(self, iid, values):
+        pass
+    def move(self, iid, parent, index):
+        self.rows.remove(iid)
+        self.rows.insert(index, iid)
+def test_inventory_view_pages_through_the_store(managers, workdir):
+    from warehouse_gui import InventoryView
+    inventory_manager, order_manager = managers
+    store = attached_store(managers, workdir)
+    tree = FakeTree()
+    view = InventoryView(tree, inventory_manager, page_size=2, store=store)
+    view.refresh()
+    assert tree.rows == ["A101", "B205"] and view.total == 3
+    view.set_filter("doo")
+    view.refresh()
+    assert tree.rows == ["C310"]
+    assert view.describe() == "Items 1-1 of 1 matching 'doo' (page 1/1)"
+    store.close()
+def test_clears_are_written_through(managers, workdir):
+    inventory_manager, order_manager = managers
+    store = attached_store(managers, workdir)
+    order_manager.submit_order(Order("ORD1", {"A101": 1}))
+    inventory_manager.clear_items()
+    order_manager.clear_orders()
+    store.close()
+    inventory_manager, order_manager, store = reopen(str(workdir / "warehouse.db"))
+    assert not inventory_manager.items and not order_manager.order_queue
+    store.close()
@@ -0,0 +1,54 @@
+from warehouse_backend import Item, Order, Result, VersionedInventory
+def versioned(managers):
+    inventory_manager, order_manager = managers
+    history = VersionedInventory(clock=lambda: 0.0)
+    history.attach(inventory_manager)
+    return history
+def quantities(view):
+    return {item.item_id: item.quantity for item in view}
+def test_undo_and_redo_move_the_live_inventory(managers):
+    inventory_manager, order_manager = managers
+    history = versioned(managers)
+    inventory_manager.update_item("A101", 7)
+    inventory_manager.add_item(Item("D400", "Thing", 3))
+    assert history.head == 2
+    assert history.undo().ok
+    assert "D400" not in inventory_manager.items
+    assert history.undo().ok
+    assert inventory_manager.items["A101"].quantity == 10
+    assert history.undo().status == Result.NO_VERSION
+    assert history.redo().ok and history.redo().ok
+    assert inventory_manager.items["A101"].quantity == 7 and inventory_manager.items["D400"].quantity == 3
+    assert history.redo().status == Result.NO_VERSION
+def test_a_change_after_undo_discards_the_redo_versions(managers):
+    inventory_manager, order_manager = managers
+    history = versioned(managers)
+    inventory_manager.update_item("A101", 7)
+    inventory_manager.update_item("A101", 4)
+    history.undo()
+    inventory_manager.update_item("B205", 1)
+    assert history.head == 2
+    assert history.redo().status == Result.NO_VERSION
+    assert history.item("A101").quantity == 7 and history.item("A101", 0).quantity == 10
+def test_as_of_views_earlier_versions(managers):
+    inventory_manager, order_manager = managers
+    history = versioned(managers)
+    inventory_manager.update_item("A101", 7)
+    inventory_manager.remove_item("C310")
+    assert quantities(history.as_of(0)) == {"A101": 10, "B205": 5, "C310": 0}
+    assert quantities(history.as_of(1)) == {"A101": 7, "B205": 5, "C310": 0}
+    assert "C310" not in history.as_of(2) and len(history.as_of(2)) == 2
+    assert history.as_of(1)["A101"].quantity == 7
+    assert set(history.diff(0)) == {"A101", "C310"}
+    assert history.diff(0)["C310"][1] is None
+def test_a_group_is_one_version(managers):
+    inventory_manager, order_manager = managers
+    history = versioned(managers)
+    order_manager.submit_order(Order("ORD1", {"A101": 2}))
+    order_manager.submit_order(Order("ORD2", {"A101": 1, "B205": 5}))
+    with history.group("Process All Orders"):
+        order_manager.process_all_orders()
+    assert history.head == 1 and history.describe(1) == "version 1 (Process All Orders)"
+    assert quantities(history.as_of(1)) == {"A101": 7, "B205": 0, "C310": 0}
+    history.undo()
+    assert quantities(inventory_manager.items.values()) == {"A101": 10, "B205": 5, "C310": 0}
@@ -0,0 +1,234 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+PERIODS = {"hour": 3600, "day": 86400}
+class Bucket:
+    # Order outcomes recorded within one hour or day (UTC). Units ordered are
+    # counted when an order is first processed, units shipped when it is
+    # fulfilled, which for a backorder may be in a later bucket.
+    __slots__ = ("start", "orders_fulfilled", "orders_unfulfilled", "orders_released", "units_ordered", "units_shipped")
+    def __init__(self, start):
+        self.start = start
+        self.orders_fulfilled = 0
+        self.orders_unfulfilled = 0
+        self.orders_released = 0
+        self.units_ordered = 0
+        self.units_shipped = 0
+    def to_dict(self):
+        processed = self.orders_fulfilled + self.orders_unfulfilled
+        return {"start": self.start,
+                "orders_fulfilled": self.orders_fulfilled,
+                "orders_unfulfilled": self.orders_unfulfilled,
+                "orders_released": self.orders_released,
+                "units_ordered": self.units_ordered,
+                "units_shipped": self.units_shipped,
+                "fill_rate": self.orders_fulfilled / processed if processed else 1.0}
+class OrderAnalytics:
+    # Running demand aggregates kept up to date as OrderManager records order
+    # outcomes, so reports cost O(items), O(categories) or O(buckets) rather
+    # than a walk over the order history. Attach it like Metrics: the manager
+    # holds an optional `analytics` attribute and calls record() and
+    # released() next to its journal writes. As with SearchIndex, outcomes
+    # are only queued (with the time they happened) on the processing path
+    # and folded into the aggregates by the next query, or once `flush_at`
+    # are waiting. Orders carry no timestamps, so history already on disk
+    # when attach() seeds the totals is not placed in any hourly or daily
+    # bucket. Categories are joined when outcomes are folded in, so a later
+    # change of category does not move past figures.
+    def __init__(self, retain_hours=24 * 7, retain_days=365, flush_at=4096, clock=time.time):
+        self.retain = {"hour": retain_hours, "day": retain_days}
+        self.flush_at = flush_at
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.inventory_manager = None
+        self.clear()
+    def attach(self, inventory_manager, order_manager, seed=True):
+        # With `seed`, the totals start from the manager's current history
+        # (one pass over it, paging through archived history).
+        self.inventory_manager = inventory_manager
+        if seed:
+            self.seed(order_manager)
+        order_manager.analytics = self
+    def clear(self):
+        with self.lock:
+            self.pending = []
+            self.orders_processed = 0
+            self.orders_fulfilled = 0
+            self.total_ordered = 0
+            self.total_shipped = 0
+            self.units_ordered = {}
+            self.units_shipped = {}
+            self.units_backordered = {}
+            self.category_ordered = {}
+            self.category_shipped = {}
+            self.buckets = {period: OrderedDict() for period in PERIODS}
+    def seed(self, order_manager):
+        with order_manager.results_lock, self.lock:
+            self._flush()
+            self._add(order_manager.fulfilled_orders, (), None)
+            self._add((), order_manager.unfulfilled_orders, None)
+    def record(self, fulfilled, unfulfilled):
+        # Orders processed for the first time.
+        if fulfilled or unfulfilled:
+            self._queue((fulfilled, unfulfilled, None, self.clock()))
+    def released(self, orders):
+        # Backorders fulfilled after a restock; their demand was counted
+        # when they first failed.
+        if orders:
+            self._queue(((), (), orders, self.clock()))
+    def _queue(self, entry):
+        with self.lock:
+            self.pending.append(entry)
+            if len(self.pending) >= self.flush_at:
+                self._flush()
+    def _flush(self):
+        # Caller holds the lock.
+        pending, self.pending = self.pending, []
+        for fulfilled, unfulfilled, released, now in pending:
+            if released is None:
+                self._add(fulfilled, unfulfilled, now)
+            else:
+                self._release(released, now)
+    def _items(self):
+        return self.inventory_manager.items if self.inventory_manager is not None else {}
+    def _add(self, fulfilled, unfulfilled, now):
+        items = self._items()
+        units_ordered = self.units_ordered
+        units_shipped = self.units_shipped
+        units_backordered = self.units_backordered
+        category_ordered = self.category_ordered
+        category_shipped = self.category_shipped
+        shipped = 0
+        fulfilled_count = unfulfilled_count = 0
+        for order in fulfilled:
+            for item_id, qty in order.items_ordered.items():
+                units_ordered[item_id] = units_ordered.get(item_id, 0) + qty
+                units_shipped[item_id] = units_shipped.get(item_id, 0) + qty
+                item = items.get(item_id)
+                if item is not None:
+                    category_ordered[item.category] = category_ordered.get(item.category, 0) + qty
+                    category_shipped[item.category] = category_shipped.get(item.category, 0) + qty
+                shipped += qty
+            fulfilled_count += 1
+        ordered = shipped
+        for order in unfulfilled:
+            for item_id, qty in order.items_ordered.items():
+                units_ordered[item_id] = units_ordered.get(item_id, 0) + qty
+                units_backordered[item_id] = units_backordered.get(item_id, 0) + qty
+                item = items.get(item_id)
+                if item is not None:
+                    category_ordered[item.category] = category_ordered.get(item.category, 0) + qty
+                ordered += qty
+            unfulfilled_count += 1
+        self.orders_processed += fulfilled_count + unfulfilled_count
+        self.orders_fulfilled += fulfilled_count
+        self.total_ordered += ordered
+        self.total_shipped += shipped
+        if now is None:
+            return
+        for bucket in self._buckets(now):
+            bucket.orders_fulfilled += fulfilled_count
+            bucket.orders_unfulfilled += unfulfilled_count
+            bucket.units_ordered += ordered
+            bucket.units_shipped += shipped
+    def _release(self, orders, now):
+        items = self._items()
+        units_shipped = self.units_shipped
+        units_backordered = self.units_backordered
+        category_shipped = self.category_shipped
+        shipped = 0
+        for order in orders:
+            for item_id, qty in order.items_ordered.items():
+                units_shipped[item_id] = units_shipped.get(item_id, 0) + qty
+                remaining = units_backordered.get(item_id, 0) - qty
+                if remaining > 0:
+                    units_backordered[item_id] = remaining
+                else:
+                    units_backordered.pop(item_id, None)
+                item = items.get(item_id)
+                if item is not None:
+                    category_shipped[item.category] = category_shipped.get(item.category, 0) + qty
+                shipped += qty
+        self.orders_fulfilled += len(orders)
+        self.total_shipped += shipped
+        for bucket in self._buckets(now):
+            bucket.orders_released += len(orders)
+            bucket.units_shipped += shipped
+    def _buckets(self, now):
+        # The current hourly and daily buckets, creating them (and dropping
+        # those past retention) when a new period starts. Caller holds the lock.
+        current = []
+        for period, seconds in PERIODS.items():
+            buckets = self.buckets[period]
+            key = int(now // seconds)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = Bucket(key * seconds)
+                oldest = key - self.retain[period]
+                while buckets:
+                    first = next(iter(buckets))
+                    if first > oldest:
+                        break
+                    del buckets[first]
+            current.append(bucket)
+        return current
+    def units(self, item_id):
+        # (ordered, shipped, backordered) units of one item.
+        with self.lock:
+            self._flush()
+            return (self.units_ordered.get(item_id, 0), self.units_shipped.get(item_id, 0),
+                    self.units_backordered.get(item_id, 0))
+    def fill_rate(self, category=None):
+        # Share of ordered units shipped, overall or within one category.
+        with self.lock:
+            self._flush()
+            if category is None:
+                ordered = self.total_ordered
+                shipped = self.total_shipped
+            else:
+                ordered = self.category_ordered.get(category, 0)
+                shipped = self.category_shipped.get(category, 0)
+        return shipped / ordered if ordered else 1.0
+    def order_fill_rate(self):
+        with self.lock:
+            self._flush()
+            return self.orders_fulfilled / self.orders_processed if self.orders_processed else 1.0
+    def categories(self):
+        with self.lock:
+            self._flush()
+            return {category: {"ordered": ordered,
+                               "shipped": self.category_shipped.get(category, 0),
+                               "fill_rate": self.category_shipped.get(category, 0) / ordered if ordered else 1.0}
+                    for category, ordered in self.category_ordered.items()}
+    def top_shipped(self, k=10):
+        with self.lock:
+            self._flush()
+            return heapq.nlargest(k, self.units_shipped.items(), key=lambda entry: entry[1])
+    def top_unfulfilled(self, k=10):
+        # Items with the most units waiting in unfulfilled orders.
+        with self.lock:
+            self._flush()
+            return heapq.nlargest(k, self.units_backordered.items(), key=lambda entry: entry[1])
+    def rollup(self, period="hour", last=None):
+        # Bucket dicts for `period` ("hour" or "day"), oldest first, limited
+        # to the `last` most recent.
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}'. Choose from: {', '.join(PERIODS)}.")
+        with self.lock:
+            self._flush()
+            buckets = sorted(self.buckets[period].values(), key=lambda bucket: bucket.start)
+            if last is not None:
+                buckets = buckets[-last:] if last else []
+            return [bucket.to_dict() for bucket in buckets]
+    def summary(self):
+        with self.lock:
+            self._flush()
+            orders_processed = self.orders_processed
+            orders_fulfilled = self.orders_fulfilled
+            backordered = sum(self.units_backordered.values())
+        return {"orders_processed": orders_processed,
+                "orders_fulfilled": orders_fulfilled,
+                "order_fill_rate": orders_fulfilled / orders_processed if orders_processed else 1.0,
+                "unit_fill_rate": self.fill_rate(),
+                "units_backordered": backordered}
@@ -1,124 +1,1749 @@
 import sys
-import csv
+import heapq
+import bisect
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from array import array
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from warehouse_export import LogExporter
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+logger = logging.getLogger("warehouse")
+def configure_logging(level=logging.INFO, stream=None, queued=False):
+    # Sends backend messages to `stream` (stdout by default) as plain lines,
+    # replacing any handler set up by an earlier call. With queued=True the
+    # records are written by a QueueListener thread, so callers never wait on
+    # the stream; the listener is returned and should be stopped on exit.
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.setLevel(level)
+    logger.propagate = False
+    if not queued:
+        logger.addHandler(handler)
+        return None
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    return listener
+class Result:
+    # Outcome of a backend operation. The message is only formatted when it
+    # is logged or str() is called, so callers that check `status` pay
+    # nothing for it.
+    OK = "ok"
+    FULFILLED = "fulfilled"
+    INSUFFICIENT_STOCK = "insufficient_stock"
+    UNKNOWN_ITEM = "unknown_item"
+    DUPLICATE_ITEM = "duplicate_item"
+    QUEUE_EMPTY = "queue_empty"
+    UNKNOWN_RESERVATION = "unknown_reservation"
+    DUPLICATE_RESERVATION = "duplicate_reservation"
+    NO_VERSION = "no_version"
+    __slots__ = ("status", "template", "args", "item_id", "order_id", "needed", "available")
+    def __init__(self, status, template, args=(), item_id=None, order_id=None, needed=None, available=None):
+        self.status = status
+        self.template = template
+        self.args = args
+        self.item_id = item_id
+        self.order_id = order_id
+        self.needed = needed
+        self.available = available
+    @property
+    def ok(self):
+        return self.status in (Result.OK, Result.FULFILLED)
+    def __str__(self):
+        return self.template % self.args
+def _report(level, status, template, *args, **fields):
+    logger.log(level, template, *args)
+    return Result(status, template, args, **fields)
 class Item:
-    def __init__(self, item_id, name, quantity, category="General"):
+    __slots__ = ("item_id", "name", "quantity", "category", "reorder_point")
+    def __init__(self, item_id, name, quantity, category="General", reorder_point=None):
         self.item_id = item_id
         self.name = name
         self.quantity = quantity
         self.category = category
+        self.reorder_point = reorder_point  # alert when quantity falls to this level; None for no alerts
     def __str__(self):
         return f"[ID: {self.item_id}] {self.name} (Category: {self.category}, Qty: {self.quantity})"
+class SearchIndex:
+    # Inverted trigram index over the lower-cased item ID and name. Each field is
+    # padded with start/end markers so that IDs and names shorter than three
+    # characters are still indexed; one and two character terms are answered
+    # from the trigrams that contain them. Two sorted lists (by ID and by name)
+    # serve prefix matches and let broad queries stop after `limit` results.
+    def __init__(self):
+        self.postings = {}
+        self.short_terms = {}
+        self.entries = {}
+        self.by_id = []
+        self.by_name = []
+        self.pending = {}  # item_id -> item queued by add_many
+        self.lock = threading.Lock()
+    def _grams(self, item_key, name_key):
+        text = "\x02" + item_key + "\x03"
+        grams = {text[i:i + 3] for i in range(len(text) - 2)}
+        text = "\x02" + name_key + "\x03"
+        grams.update([text[i:i + 3] for i in range(len(text) - 2)])
+        return grams
+    def _index(self, item):
+        item_id = item.item_id
+        item_key = str(item_id).lower()
+        name_key = str(item.name).lower()
+        self.entries[item_id] = (item, item_key, name_key)
+        postings = self.postings
+        for gram in self._grams(item_key, name_key):
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = set()
+                for short in (gram[0], gram[1], gram[2], gram[:2], gram[1:]):
+                    self.short_terms.setdefault(short, set()).add(gram)
+            ids.add(item_id)
+        return item_key, name_key
+    def add(self, item):
+        self.pending.pop(item.item_id, None)
+        if item.item_id in self.entries:
+            self._unindex(item.item_id)
+        item_key, name_key = self._index(item)
+        bisect.insort(self.by_id, (item_key, item.item_id))
+        bisect.insort(self.by_name, (name_key, item_key, item.item_id))
+    def add_many(self, items):
+        # Queues a batch to be indexed by the next search, so bulk imports do
+        # not wait on indexing; queued items are merged into the sorted lists
+        # with one sort rather than an insort each.
+        with self.lock:
+            for item in items:
+                self.pending[item.item_id] = item
+    def _flush(self):
+        with self.lock:
+            pending = self.pending
+            if not pending:
+                return
+            self.pending = {}
+        added = []
+        for item in pending.values():
+            if item.item_id in self.entries:
+                self._unindex(item.item_id)
+            added.append((item.item_id, self._index(item)))
+        if len(added) <= 16:
+            for item_id, (item_key, name_key) in added:
+                bisect.insort(self.by_id, (item_key, item_id))
+                bisect.insort(self.by_name, (name_key, item_key, item_id))
+            return
+        self.by_id.extend((item_key, item_id) for item_id, (item_key, name_key) in added)
+        self.by_name.extend((name_key, item_key, item_id) for item_id, (item_key, name_key) in added)
+        self.by_id.sort()
+        self.by_name.sort()
+    def rebuild(self, items):
+        self.clear()
+        for item in items:
+            item_key, name_key = self._index(item)
+            self.by_id.append((item_key, item.item_id))
+            self.by_name.append((name_key, item_key, item.item_id))
+        self.by_id.sort()
+        self.by_name.sort()
+    def remove(self, item_id):
+        self.pending.pop(item_id, None)
+        self._unindex(item_id)
+    def _unindex(self, item_id):
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return
+        item, item_key, name_key = entry
+        for gram in self._grams(item_key, name_key):
+            ids = self.postings.get(gram)
+            if ids is None:
+                continue
+            ids.discard(item_id)
+            if not ids:
+                del self.postings[gram]
+                for short in (gram[0], gram[1], gram[2], gram[:2], gram[1:]):
+                    grams = self.short_terms.get(short)
+                    if grams is not None:
+                        grams.discard(gram)
+                        if not grams:
+                            del self.short_terms[short]
+        for keys, key in ((self.by_id, (item_key, item_id)), (self.by_name, (name_key, item_key, item_id))):
+            pos = bisect.bisect_left(keys, key)
+            if pos < len(keys) and keys[pos] == key:
+                del keys[pos]
+    def clear(self):
+        self.pending.clear()
+        self.postings.clear()
+        self.short_terms.clear()
+        self.entries.clear()
+        self.by_id.clear()
+        self.by_name.clear()
+    def _candidates(self, term, dense_above):
+        # Returns (ids, exact). Short terms whose match set is estimated to be
+        # larger than `dense_above` return None, as a name-ordered scan finds
+        # the first matches sooner; large trigram intersections are returned
+        # unverified (exact=False) for the scan to check.
+        if len(term) < 3:
+            grams = [self.postings[gram] for gram in self.short_terms.get(term, ())]
+            if sum(len(ids) for ids in grams) > dense_above:
+                return None, False
+            return set().union(*grams), True
+        postings = sorted((self.postings.get(term[i:i + 3], ()) for i in range(len(term) - 2)), key=len)
+        if not postings[0]:
+            return set(), True
+        if len(postings) == 1:
+            return postings[0], True
+        candidates = postings[0] & postings[1]
+        for ids in postings[2:]:
+            if not candidates:
+                break
+            candidates &= ids
+        if len(term) == 3:
+            return candidates, True
+        if len(candidates) > dense_above:
+            return candidates, False
+        entries = self.entries
+        return {item_id for item_id in candidates if term in entries[item_id][1] or term in entries[item_id][2]}, True
+    def search(self, search_term, limit=None):
+        # Results are ranked: exact ID match, ID prefix (by ID), name prefix
+        # (by name), then any other substring match (by name).
+        term = str(search_term).lower()
+        if not term:
+            return []
+        if self.pending:
+            self._flush()
+        if limit is None:
+            limit = len(self.entries)
+        ranked = []
+        taken = set()
+        for keys in (self.by_id, self.by_name):
+            pos = bisect.bisect_left(keys, (term,))
+            while pos < len(keys) and len(ranked) < limit and keys[pos][0].startswith(term):
+                item_id = keys[pos][-1]
+                if item_id not in taken:
+                    taken.add(item_id)
+                    ranked.append(item_id)
+                pos += 1
+        remaining = limit - len(ranked)
+        if remaining > 0:
+            candidates, exact = self._candidates(term, 32 * remaining)
+            if exact:
+                entries = self.entries
+                rest = [item_id for item_id in candidates if item_id not in taken]
+                ranked.extend(heapq.nsmallest(remaining, rest, key=lambda item_id: (entries[item_id][2], entries[item_id][1])))
+            else:
+                for name_key, item_key, item_id in self.by_name:
+                    if item_id in taken or (candidates is not None and item_id not in candidates):
+                        continue
+                    if term in name_key or term in item_key:
+                        ranked.append(item_id)
+                        remaining -= 1
+                        if not remaining:
+                            break
+        return [self.entries[item_id][0] for item_id in ranked]
+class StripedLocks:
+    # A fixed pool of locks shared by item IDs through hashing. Multi-item
+    # reservations always take their stripes in ascending order, so two orders
+    # can never wait on each other.
+    def __init__(self, stripes=64):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+    def acquire(self, item_ids):
+        locks = self.locks
+        if len(item_ids) == 1:
+            for item_id in item_ids:
+                stripes = (hash(item_id) % len(locks),)
+        else:
+            stripes = sorted({hash(item_id) % len(locks) for item_id in item_ids})
+        for stripe in stripes:
+            locks[stripe].acquire()
+        return stripes
+    def release(self, stripes):
+        locks = self.locks
+        for stripe in reversed(stripes):
+            locks[stripe].release()
+    @contextmanager
+    def hold(self, item_ids):
+        stripes = self.acquire(item_ids)
+        try:
+            yield
+        finally:
+            self.release(stripes)
+    @contextmanager
+    def hold_all(self):
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+class SortIndex:
+    # Sorted (key, item_id) lists of the inventory, one per sortable field,
+    # built on first use. Changed item IDs are queued by mark_dirty (wired to
+    # InventoryManager.change_listeners) and patched in with bisect on the
+    # next query, so the order-processing hot path only pays for a set add.
+    fields = {
+        "item_id": lambda item: (str(item.item_id).lower(), str(item.item_id)),
+        "name": lambda item: (str(item.name).lower(), str(item.item_id)),
+        "category": lambda item: (str(item.category).lower(), str(item.name).lower(), str(item.item_id)),
+        "quantity": lambda item: (item.quantity, str(item.item_id)),
+    }
+    def __init__(self, items):
+        self.items = items
+        self.orders = {}  # field -> sorted [(key, item_id)]
+        self.keys = {}  # field -> {item_id: key}
+        self.dirty = set()
+        self.lock = threading.Lock()
+    def mark_dirty(self, item_ids):
+        with self.lock:
+            if self.orders:
+                self.dirty.update(item_ids)
+    def clear(self):
+        with self.lock:
+            self.orders.clear()
+            self.keys.clear()
+            self.dirty.clear()
+    def _order(self, field):
+        # Caller holds self.lock.
+        if self.dirty:
+            if len(self.dirty) > len(self.items) // 8:
+                # Re-sorting beats patching once a large share of items changed.
+                self.orders.clear()
+                self.keys.clear()
+            else:
+                self._patch()
+            self.dirty.clear()
+        order = self.orders.get(field)
+        if order is None:
+            key = self.fields[field]
+            keys = self.keys[field] = {item_id: key(item) for item_id, item in self.items.items()}
+            order = self.orders[field] = sorted((value, item_id) for item_id, value in keys.items())
+        return order
+    def _patch(self):
+        items = self.items
+        for field, order in self.orders.items():
+            key = self.fields[field]
+            keys = self.keys[field]
+            for item_id in self.dirty:
+                old = keys.pop(item_id, None)
+                if old is not None:
+                    del order[bisect.bisect_left(order, (old, item_id))]
+                item = items.get(item_id)
+                if item is not None:
+                    keys[item_id] = key(item)
+                    bisect.insort(order, (keys[item_id], item_id))
+    def _items(self, entries):
+        items = self.items
+        return [items[item_id] for _, item_id in entries if item_id in items]
+    def page(self, field, number=0, page_size=50, descending=False, among=None):
+        # Returns (items on page `number`, total). `among` restricts the view
+        # to a set of item IDs, e.g. search results.
+        with self.lock:
+            order = self._order(field)
+            if among is not None:
+                keys = self.keys[field]
+                order = sorted((keys[item_id], item_id) for item_id in among if item_id in keys)
+            start = number * page_size
+            if descending:
+                end = len(order) - start
+                entries = order[max(end - page_size, 0):max(end, 0)][::-1]
+            else:
+                entries = order[start:start + page_size]
+            return self._items(entries), len(order)
+    def pages(self, field, page_size=50, descending=False):
+        # Yields successive pages; each is fetched when the previous one has
+        # been consumed, so changes in between are picked up.
+        number = 0
+        while True:
+            items, total = self.page(field, number, page_size, descending)
+            if not items:
+                return
+            yield items
+            number += 1
+            if number * page_size >= total:
+                return
+    def quantity_range(self, low=None, high=None, limit=None):
+        # Items with low <= quantity < high, lowest quantity first.
+        with self.lock:
+            order = self._order("quantity")
+            start = 0 if low is None else bisect.bisect_left(order, ((low,),))
+            end = len(order) if high is None else bisect.bisect_left(order, ((high,),))
+            if limit is not None:
+                end = min(end, start + limit)
+            return self._items(order[start:end])
+    def below(self, quantity, limit=None):
+        return self.quantity_range(high=quantity, limit=limit)
+    def top_by_quantity(self, k, largest=True):
+        with self.lock:
+            order = self._order("quantity")
+            entries = order[:-k - 1:-1] if largest else order[:k]
+            return self._items(entries)
+    def in_category(self, category, limit=None):
+        # Case-insensitive, ordered by name.
+        category = str(category).lower()
+        with self.lock:
+            order = self._order("category")
+            pos = bisect.bisect_left(order, ((category,),))
+            matches = []
+            while pos < len(order) and order[pos][0][0] == category and (limit is None or len(matches) < limit):
+                matches.append(order[pos])
+                pos += 1
+            return self._items(matches)
+class BulkResult:
+    # Outcome of a bulk call. Rejected rows are kept as (row, message), row
+    # being the 1-based position in the input; the rest of the input is
+    # still applied.
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        self.submitted = 0
+        self.batches = 0
+        self.errors = []
+    def __str__(self):
+        done = [f"{count} {label}" for count, label in ((self.added, "added"), (self.updated, "updated"),
+                                                        (self.submitted, "submitted")) if count]
+        return f"{', '.join(done) or 'Nothing applied'}; {len(self.errors)} row(s) rejected."
+def _is_count(value, minimum=0):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+def _item_error(item):
+    # Why `item` cannot be stored, or None. Readers pass rows they could not
+    # parse through as ValueError instances.
+    if isinstance(item, Exception):
+        return str(item)
+    if not isinstance(item, Item):
+        return "Expected an Item."
+    if not isinstance(item.item_id, str) or not item.item_id:
+        return "Missing item_id."
+    if not isinstance(item.name, str) or not item.name:
+        return f"Missing name for item '{item.item_id}'."
+    if not _is_count(item.quantity):
+        return f"Invalid quantity for item '{item.item_id}'."
+    if item.reorder_point is not None and not _is_count(item.reorder_point):
+        return f"Invalid reorder point for item '{item.item_id}'."
+    return None
+def _order_error(order):
+    if isinstance(order, Exception):
+        return str(order)
+    if not isinstance(order, Order):
+        return "Expected an Order."
+    if not isinstance(order.order_id, str) or not order.order_id:
+        return "Missing order_id."
+    if not isinstance(order.items_ordered, dict) or not order.items_ordered:
+        return f"Missing items_ordered for order '{order.order_id}'."
+    for item_id, qty in order.items_ordered.items():
+        if not _is_count(qty, 1):
+            return f"Invalid quantity for item '{item_id}' in order '{order.order_id}'."
+    if not isinstance(order.priority, int) or isinstance(order.priority, bool):
+        return f"Invalid priority for order '{order.order_id}'."
+    return None
+def _batches(rows, batch_size):
+    # Yields lists of (row, entry) with rows numbered from 1.
+    batch = []
+    for row, entry in enumerate(rows, 1):
+        batch.append((row, entry))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 class InventoryManager:
     def __init__(self):
         self.items = {}
+        self.search_index = SearchIndex()
+        self.sort_index = SortIndex(self.items)
+        self.journal = None
+        self.locks = StripedLocks()
+        self.restock_listeners = []  # called as listener(item_id) after update_item raises stock
+        self.change_listeners = [self.sort_index.mark_dirty]  # called as listener(item_ids) after items are added, removed or change stock
+        self.reserved = {}  # item_id -> units held by a ReservationLedger; changed only under the item's stripe
+        self.history = None  # a VersionedInventory, told under the items' stripes before they change
+    def _notify(self, item_ids):
+        for listener in self.change_listeners:
+            listener(item_ids)
+    def reindex(self):
+        self.search_index.rebuild(self.items.values())
+        self.sort_index.clear()
     def add_item(self, item):
-        if item.item_id in self.items:
-            print("Item ID already exists. Consider updating the quantity instead.")
-        else:
+        with self.locks.hold((item.item_id,)):
+            if item.item_id in self.items:
+                return _report(logging.WARNING, Result.DUPLICATE_ITEM,
+                               "Item ID already exists. Consider updating the quantity instead.", item_id=item.item_id)
+            if self.history is not None:
+                self.history.touch((item.item_id,))
             self.items[item.item_id] = item
-            print(f"Item '{item.name}' added successfully.")
+            self.search_index.add(item)
+            if self.journal is not None:
+                self.journal.item_put(item)
+        self._notify((item.item_id,))
+        return _report(logging.INFO, Result.OK, "Item '%s' added successfully.", item.name, item_id=item.item_id)
     def update_item(self, item_id, quantity):
-        if item_id in self.items:
-            self.items[item_id].quantity = quantity
-            print(f"Item '{self.items[item_id].name}' updated successfully.")
-        else:
-            print("Item not found in inventory.")
+        with self.locks.hold((item_id,)):
+            item = self.items.get(item_id)
+            if item is None:
+                return _report(logging.WARNING, Result.UNKNOWN_ITEM, "Item not found in inventory.", item_id=item_id)
+            restocked = quantity > item.quantity
+            if self.history is not None:
+                self.history.touch((item_id,))
+            item.quantity = quantity
+            if self.journal is not None:
+                self.journal.item_put(item)
+        self._notify((item_id,))
+        result = _report(logging.INFO, Result.OK, "Item '%s' updated successfully.", item.name, item_id=item_id)
+        if restocked:
+            for listener in self.restock_listeners:
+                listener(item_id)
+        return result
+    def set_reorder_point(self, item_id, reorder_point):
+        with self.locks.hold((item_id,)):
+            item = self.items.get(item_id)
+            if item is None:
+                return _report(logging.WARNING, Result.UNKNOWN_ITEM, "Item not found in inventory.", item_id=item_id)
+            if self.history is not None:
+                self.history.touch((item_id,))
+            item.reorder_point = reorder_point
+            if self.journal is not None:
+                self.journal.item_put(item)
+        self._notify((item_id,))
+        return _report(logging.INFO, Result.OK, "Reorder point for '%s' set to %s.", item.name, reorder_point,
+                       item_id=item_id)
     def remove_item(self, item_id):
-        if item_id in self.items:
+        with self.locks.hold((item_id,)):
+            if item_id not in self.items:
+                return _report(logging.WARNING, Result.UNKNOWN_ITEM, "Item not found in inventory.", item_id=item_id)
+            if self.history is not None:
+                self.history.touch((item_id,))
             removed_item = self.items.pop(item_id)
-            print(f"Item '{removed_item.name}' removed successfully.")
-        else:
-            print("Item not found in inventory.")
-    def search_item(self, search_term):
-        found = False
-        for item in self.items.values():
-            if search_term.lower() in item.item_id.lower() or search_term.lower() in item.name.lower():
-                print(item)
-                found = True
-        if not found:
+            self.search_index.remove(item_id)
+            if self.journal is not None:
+                self.journal.item_removed(item_id)
+        self._notify((item_id,))
+        return _report(logging.INFO, Result.OK, "Item '%s' removed successfully.", removed_item.name, item_id=item_id)
+    def add_items(self, items, batch_size=10000):
+        # Bulk add_item: rows whose ID is already stocked, or repeated in the
+        # input, are rejected. See _put_items.
+        return self._put_items(items, batch_size, upsert=False)
+    def upsert_items(self, items, batch_size=10000):
+        # Adds new items and replaces existing ones; a later row for the same
+        # ID wins. Raising stock this way counts as a restock.
+        return self._put_items(items, batch_size, upsert=True)
+    def _put_items(self, items, batch_size, upsert):
+        # Validates and applies `items` (an iterable of Item) `batch_size` rows
+        # at a time. Each batch is applied under every stock stripe and
+        # written as one journal record, so other threads and a recovery see
+        # all of it or none of it; invalid rows are reported in the returned
+        # BulkResult and skipped.
+        result = BulkResult()
+        self._put_batches(items, batch_size, upsert, result)
+        result.errors.sort()
+        logger.info("Bulk item import: %s", result)
+        return result
+    def _put_batches(self, items, batch_size, upsert, result):
+        seen = set()
+        for batch in _batches(items, batch_size):
+            result.batches += 1
+            valid = {}
+            for row, item in batch:
+                error = _item_error(item)
+                if error is None and not upsert and item.item_id in seen:
+                    error = f"Item ID '{item.item_id}' appears more than once."
+                if error is not None:
+                    result.errors.append((row, error))
+                    continue
+                if not upsert:
+                    seen.add(item.item_id)
+                valid[item.item_id] = (row, item)
+            restocked = []
+            put = []
+            reindex = []
+            with self.locks.hold_all():
+                if self.history is not None:
+                    self.history.touch(valid)
+                for item_id, (row, item) in valid.items():
+                    existing = self.items.get(item_id)
+                    if existing is None:
+                        self.items[item_id] = item
+                        reindex.append(item)
+                        result.added += 1
+                    elif not upsert:
+                        result.errors.append((row, f"Item ID '{item_id}' already exists."))
+                        continue
+                    else:
+                        if item.quantity > existing.quantity:
+                            restocked.append(item_id)
+                        if existing.name == item.name:
+                            existing.quantity = item.quantity
+                            existing.category = item.category
+                            existing.reorder_point = item.reorder_point
+                            item = existing
+                        else:
+                            self.items[item_id] = item
+                            reindex.append(item)
+                        result.updated += 1
+                    put.append(item)
+                self.search_index.add_many(reindex)
+                if put and self.journal is not None:
+                    self.journal.items_put(put)
+            if put:
+                self._notify([item.item_id for item in put])
+            for item_id in restocked:
+                for listener in self.restock_listeners:
+                    listener(item_id)
+    def clear_items(self):
+        # Removes every item, journalled as one record.
+        with self.locks.hold_all():
+            item_ids = list(self.items)
+            if self.history is not None:
+                self.history.touch(item_ids)
+            self.items.clear()
+            self.reindex()
+            if self.journal is not None:
+                self.journal.items_cleared()
+        self._notify(item_ids)
+    def _restore(self, states):
+        # Puts items back as they were: `states` maps item_id -> Item, or
+        # None for an item that did not exist. The caller holds every stripe
+        # and notifies. Journalled like a bulk import, but restock listeners
+        # are not called.
+        put = []
+        for item_id, state in states.items():
+            existing = self.items.get(item_id)
+            if state is None:
+                if existing is not None:
+                    del self.items[item_id]
+                    self.search_index.remove(item_id)
+                    if self.journal is not None:
+                        self.journal.item_removed(item_id)
+                continue
+            if existing is not None and existing.name == state.name:
+                existing.quantity = state.quantity
+                existing.category = state.category
+                existing.reorder_point = state.reorder_point
+                state = existing
+            else:
+                self.items[item_id] = state
+                self.search_index.add(state)
+            put.append(state)
+        if put and self.journal is not None:
+            self.journal.items_put(put)
+    def available(self, item_id):
+        # On-hand stock less any units reserved for orders being picked.
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        return item.quantity - self.reserved.get(item_id, 0)
+    def search(self, search_term, limit=None):
+        return self.search_index.search(search_term, limit)
+    def search_item(self, search_term, limit=None):
+        matches = self.search(search_term, limit)
+        for item in matches:
+            print(item)
+        if not matches:
             print("No matching item found.")
-    def display_inventory(self, sort_by="name"):
+    def items_below(self, quantity, limit=None):
+        return self.sort_index.below(quantity, limit)
+    def top_by_quantity(self, k, largest=True):
+        return self.sort_index.top_by_quantity(k, largest)
+    def items_in_category(self, category, limit=None):
+        return self.sort_index.in_category(category, limit)
+    def display_inventory(self, sort_by="name", page=None, page_size=50, descending=False):
+        # Prints the whole list, or only page number `page` (0-based).
         if not self.items:
             print("Inventory is empty.")
             return
-        try:
-            sorted_items = sorted(self.items.values(), key=lambda x: getattr(x, sort_by))
-        except AttributeError:
-            print("Invalid sort key provided. Sorting by name instead.")
-            sorted_items = sorted(self.items.values(), key=lambda x: x.name)
+        if sort_by not in SortIndex.fields:
+            logger.warning("Invalid sort key provided. Sorting by name instead.")
+            sort_by = "name"
         print("\n--- Inventory List ---")
-        for item in sorted_items:
-            print(item)
+        if page is None:
+            for items in self.sort_index.pages(sort_by, page_size, descending):
+                for item in items:
+                    print(item)
+        else:
+            items, total = self.sort_index.page(sort_by, page, page_size, descending)
+            for item in items:
+                print(item)
+            print(f"Page {page + 1} of {max(1, -(-total // page_size))} ({total} items)")
         print("----------------------\n")
+class StockAlert:
+    __slots__ = ("item_id", "name", "quantity", "reorder_point", "raised_at")
+    def __init__(self, item_id, name, quantity, reorder_point, raised_at):
+        self.item_id = item_id
+        self.name = name
+        self.quantity = quantity
+        self.reorder_point = reorder_point
+        self.raised_at = raised_at
+    def __str__(self):
+        return f"Low stock: [ID: {self.item_id}] {self.name} has {self.quantity} left (reorder point {self.reorder_point})"
+class ReorderAlerts:
+    # Tracks items at or below their reorder point. Quantity changes arrive
+    # through InventoryManager.change_listeners and only touch the set of low
+    # items, so listing them costs O(k) in the number of low items. An alert
+    # is raised when an item crosses into low stock (not again while it stays
+    # low), at most once per `cooldown` seconds per item, and handed to the
+    # hooks on a dispatcher thread so order processing never waits on them.
+    def __init__(self, cooldown=300.0, clock=time.monotonic):
+        self.cooldown = cooldown
+        self.clock = clock
+        self.inventory_manager = None
+        self.low = set()
+        self.last_raised = {}
+        self.suppressed = 0
+        self.hooks = []  # called as hook(alert) on the dispatcher thread
+        self.pending = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.dispatcher = None
+    def attach(self, inventory_manager):
+        self.inventory_manager = inventory_manager
+        inventory_manager.change_listeners.append(self.on_change)
+        if self.dispatcher is None:
+            self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self.dispatcher.start()
+        self.rescan()
+    def close(self):
+        if self.inventory_manager is not None and self.on_change in self.inventory_manager.change_listeners:
+            self.inventory_manager.change_listeners.remove(self.on_change)
+        if self.dispatcher is not None:
+            self.pending.put(None)
+            self.dispatcher.join()
+            self.dispatcher = None
+    def rescan(self):
+        # Re-evaluates every item, e.g. after the inventory was reloaded.
+        with self.lock:
+            self.low.clear()
+        self.on_change(list(self.inventory_manager.items))
+    def on_change(self, item_ids):
+        items = self.inventory_manager.items
+        with self.lock:
+            for item_id in item_ids:
+                item = items.get(item_id)
+                if item is None or item.reorder_point is None or item.quantity > item.reorder_point:
+                    self.low.discard(item_id)
+                    continue
+                if item_id in self.low:
+                    continue
+                self.low.add(item_id)
+                now = self.clock()
+                last = self.last_raised.get(item_id)
+                if last is not None and now - last < self.cooldown:
+                    self.suppressed += 1
+                    continue
+                self.last_raised[item_id] = now
+                self.pending.put(StockAlert(item_id, item.name, item.quantity, item.reorder_point, now))
+    def below_reorder_point(self):
+        # Items at or below their reorder point, furthest below first.
+        items = self.inventory_manager.items
+        with self.lock:
+            low = [items[item_id] for item_id in self.low if item_id in items]
+        low.sort(key=lambda item: item.quantity - item.reorder_point)
+        return low
+    def _dispatch(self):
+        while True:
+            alert = self.pending.get()
+            if alert is None:
+                return
+            for hook in self.hooks:
+                try:
+                    hook(alert)
+                except Exception:
+                    logger.exception("Error in stock alert hook")
+def _item_state(item):
+    return None if item is None else (item.name, item.quantity, item.category, item.reorder_point)
+class InventoryVersion:
+    # Read-only, dict-like view of the inventory as of one version. Lookups
+    # go through VersionedInventory.item; iteration yields the items (as
+    # fresh Item objects) that existed at that version.
+    def __init__(self, history, version):
+        self.history = history
+        self.version = version
+    def get(self, item_id, default=None):
+        item = self.history.item(item_id, self.version)
+        return default if item is None else item
+    def __getitem__(self, item_id):
+        item = self.history.item(item_id, self.version)
+        if item is None:
+            raise KeyError(item_id)
+        return item
+    def __contains__(self, item_id):
+        return self.history.item(item_id, self.version) is not None
+    def __iter__(self):
+        history = self.history
+        chains = dict(history.chains)
+        for item_id in list(history.inventory_manager.items):
+            if item_id not in chains:
+                item = history.item(item_id, self.version)
+                if item is not None:
+                    yield item
+        for item_id in chains:
+            item = history.item(item_id, self.version)
+            if item is not None:
+                yield item
+    def __len__(self):
+        return sum(1 for _ in self)
+class VersionedInventory:
+    # Copy-on-write version history of an InventoryManager. Every change
+    # notification becomes a new version (or joins the open group()), and
+    # only the changed items are stored: each item that has changed keeps a
+    # chain of (version, state) pairs, so a version shares every unchanged
+    # item with its neighbours and the history costs memory in proportion
+    # to the changes. An item's state before its first change is captured
+    # by touch(), which InventoryManager calls under the item's stripes.
+    # Reading an item as of version N is a bisect on its chain. undo() and
+    # redo() move the live inventory between versions; a change made after
+    # an undo discards the versions that could have been redone. Order
+    # history is not versioned, and concurrent changes are recorded in the
+    # order their notifications arrive.
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.inventory_manager = None
+        self.chains = {}  # item_id -> ([versions], [states]); a state is None while the item does not exist
+        self.changes = [{}]  # version -> item IDs changed by it
+        self.labels = [None]
+        self.times = [clock()]
+        self.head = 0
+        self.cursor = 0  # the version the live inventory is at; below head after an undo
+        self.grouping = None  # label of the open group(), if any
+        self.group_open = False  # whether the open group has started its version
+        self.applying = None  # thread ID of an undo or redo being notified
+        self.lock = threading.Lock()
+    def attach(self, inventory_manager):
+        self.inventory_manager = inventory_manager
+        inventory_manager.history = self
+        inventory_manager.change_listeners.append(self.on_change)
+    def close(self):
+        inventory_manager = self.inventory_manager
+        if inventory_manager is not None:
+            if self.on_change in inventory_manager.change_listeners:
+                inventory_manager.change_listeners.remove(self.on_change)
+            if inventory_manager.history is self:
+                inventory_manager.history = None
+    def touch(self, item_ids):
+        # Records the current state of items about to change for the first
+        # time since attach(); that state holds for every earlier version.
+        chains = self.chains
+        first = [item_id for item_id in item_ids if item_id not in chains]
+        if not first:
+            return
+        items = self.inventory_manager.items
+        with self.lock:
+            for item_id in first:
+                if item_id not in chains:
+                    chains[item_id] = ([0], [_item_state(items.get(item_id))])
+    @contextmanager
+    def group(self, label=None):
+        # Changes made inside the block form a single version, e.g. a whole
+        # Process All Orders run.
+        with self.lock:
+            self.grouping = label
+            self.group_open = False
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.grouping = None
+                self.group_open = False
+    def on_change(self, item_ids):
+        if self.applying == threading.get_ident():
+            return
+        items = self.inventory_manager.items
+        with self.lock:
+            chains = self.chains
+            latest = self.cursor == self.head
+            changed = []
+            for item_id in item_ids:
+                state = _item_state(items.get(item_id))
+                chain = chains.get(item_id)
+                if chain is not None and (chain[1][-1] if latest else self._state(chain, self.cursor)) == state:
+                    continue
+                changed.append((item_id, state))
+            if not changed:
+                return
+            if not self.group_open:
+                self._truncate()
+                self.head += 1
+                self.cursor = self.head
+                self.changes.append({})
+                self.labels.append(self.grouping)
+                self.times.append(self.clock())
+                self.group_open = self.grouping is not None
+            version = self.head
+            changes = self.changes[version]
+            for item_id, state in changed:
+                chain = chains.get(item_id)
+                if chain is None:
+                    # Changed without touch(): no earlier state is known.
+                    chain = chains[item_id] = ([], [])
+                versions, states = chain
+                if versions and versions[-1] == version:
+                    states[-1] = state
+                else:
+                    versions.append(version)
+                    states.append(state)
+                changes[item_id] = None
+    def _truncate(self):
+        # Drops the versions after the cursor. Caller holds the lock.
+        cursor = self.cursor
+        for version in range(cursor + 1, self.head + 1):
+            for item_id in self.changes[version]:
+                chain = self.chains.get(item_id)
+                if chain is None:
+                    continue
+                versions, states = chain
+                while versions and versions[-1] > cursor:
+                    versions.pop()
+                    states.pop()
+                if not versions:
+                    del self.chains[item_id]
+        del self.changes[cursor + 1:]
+        del self.labels[cursor + 1:]
+        del self.times[cursor + 1:]
+        self.head = cursor
+    def _state(self, chain, version):
+        versions, states = chain
+        index = bisect.bisect_right(versions, version) - 1
+        return states[max(index, 0)]
+    def item(self, item_id, version=None):
+        # The item as of `version` (default: the current one) as a new Item,
+        # or None if it did not exist then.
+        if version is None:
+            version = self.cursor
+        with self.lock:
+            chain = self.chains.get(item_id)
+            if chain is None:
+                state = _item_state(self.inventory_manager.items.get(item_id))
+            else:
+                state = self._state(chain, version)
+        return None if state is None else Item(item_id, *state)
+    def as_of(self, version):
+        if not 0 <= version <= self.head:
+            raise ValueError(f"No version {version}; versions run from 0 to {self.head}.")
+        return InventoryVersion(self, version)
+    def diff(self, old, new=None):
+        # item_id -> (item at `old`, item at `new`) for every item that
+        # differs between the two versions.
+        if new is None:
+            new = self.cursor
+        low, high = sorted((old, new))
+        item_ids = {}
+        for version in range(low + 1, min(high, self.head) + 1):
+            item_ids.update(self.changes[version])
+        differences = {}
+        for item_id in item_ids:
+            before, after = self.item(item_id, old), self.item(item_id, new)
+            if _item_state(before) != _item_state(after):
+                differences[item_id] = (before, after)
+        return differences
+    def describe(self, version):
+        label = self.labels[version]
+        if label is None:
+            item_ids = list(self.changes[version])
+            label = ", ".join(str(item_id) for item_id in item_ids[:3])
+            if len(item_ids) > 3:
+                label += f" and {len(item_ids) - 3} more"
+        return f"version {version} ({label})" if label else f"version {version}"
+    def undo(self):
+        return self._move(-1)
+    def redo(self):
+        return self._move(1)
+    def _move(self, step):
+        inventory_manager = self.inventory_manager
+        with inventory_manager.locks.hold_all(), self.lock:
+            target = self.cursor + step
+            if self.grouping is not None or not 0 <= target <= self.head:
+                return _report(logging.INFO, Result.NO_VERSION, "Nothing to %s.", "undo" if step < 0 else "redo")
+            moved = max(self.cursor, target)
+            item_ids = list(self.changes[moved])
+            states = {}
+            for item_id in item_ids:
+                state = self._state(self.chains[item_id], target)
+                states[item_id] = None if state is None else Item(item_id, *state)
+            inventory_manager._restore(states)
+            self.cursor = target
+        self.applying = threading.get_ident()
+        try:
+            inventory_manager._notify(item_ids)
+        finally:
+            self.applying = None
+        return _report(logging.INFO, Result.OK, "%s %s.", "Undid" if step < 0 else "Redid", self.describe(moved))
 class Order:
-    def __init__(self, order_id, items_ordered):
+    __slots__ = ("order_id", "items_ordered", "priority", "due_date", "arrival")
+    def __init__(self, order_id, items_ordered, priority=0, due_date=None):
         self.order_id = order_id
         self.items_ordered = items_ordered  # e.g., {"item1": 3, "item2": 5}
+        self.priority = priority  # higher is more urgent
+        self.due_date = due_date  # any sortable value, e.g. "2025-03-31"; None for no deadline
+        self.arrival = None  # submission number assigned by OrderManager
 
     def __str__(self):
         items_str = ", ".join([f"{k}: {v}" for k, v in self.items_ordered.items()])
         return f"Order ID: {self.order_id} | Items: {items_str}"
+class ColumnarOrderLog:
+    # Append-only, list-like order history stored column-wise: item IDs are
+    # interned into a shared table and each order's lines live in flat arrays,
+    # so a line costs 16 bytes instead of a dict entry plus boxed ints.
+    # Arrival numbers are a column too (-1 for none); priorities and due
+    # dates, which most orders leave at their defaults, are kept sparsely by
+    # index. Indexing and iteration materialise fresh Order objects.
+    def __init__(self, orders=()):
+        self.order_ids = []
+        self.line_starts = array("Q", [0])
+        self.line_items = array("L")
+        self.line_quantities = array("q")
+        self.arrivals = array("q")
+        self.priorities = {}  # index -> priority, when not 0
+        self.due_dates = {}  # index -> due_date, when set
+        self.item_ids = []
+        self.item_slots = {}
+        self.extend(orders)
+    def append(self, order):
+        index = len(self.order_ids)
+        if order.priority:
+            self.priorities[index] = order.priority
+        if order.due_date is not None:
+            self.due_dates[index] = order.due_date
+        self.arrivals.append(order.arrival if order.arrival is not None else -1)
+        for item_id, qty in order.items_ordered.items():
+            slot = self.item_slots.get(item_id)
+            if slot is None:
+                slot = self.item_slots[item_id] = len(self.item_ids)
+                self.item_ids.append(item_id)
+            self.line_items.append(slot)
+            self.line_quantities.append(qty)
+        self.order_ids.append(order.order_id)
+        self.line_starts.append(len(self.line_items))
+    def extend(self, orders):
+        for order in orders:
+            self.append(order)
+    def clear(self):
+        self.__init__()
+    def _order(self, index):
+        start, end = self.line_starts[index], self.line_starts[index + 1]
+        item_ids = self.item_ids
+        order = Order(self.order_ids[index], {item_ids[slot]: qty for slot, qty in
+                                              zip(self.line_items[start:end], self.line_quantities[start:end])},
+                      self.priorities.get(index, 0), self.due_dates.get(index))
+        arrival = self.arrivals[index]
+        if arrival >= 0:
+            order.arrival = arrival
+        return order
+    def __len__(self):
+        return len(self.order_ids)
+    def __iter__(self):
+        for index in range(len(self.order_ids)):
+            yield self._order(index)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._order(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("order log index out of range")
+        return self._order(index)
+    def nbytes(self):
+        # Approximate memory held by the log, excluding the shared ID strings.
+        return (sys.getsizeof(self.order_ids) + sys.getsizeof(self.item_ids) + sys.getsizeof(self.item_slots)
+                + sys.getsizeof(self.priorities) + sys.getsizeof(self.due_dates)
+                + sum(column.itemsize * len(column) for column in (self.line_starts, self.line_items,
+                                                                  self.line_quantities, self.arrivals)))
+class OrderBacklog:
+    # List-like store for unfulfilled orders with a reverse index from each
+    # item ID to the orders waiting on it, so a restock only has to look at
+    # the orders that need the restocked item. Orders are keyed by their
+    # arrival number (orders loaded from disk, which have none, sort first)
+    # and then by when they entered the backlog.
+    def __init__(self, orders=()):
+        self.orders = {}
+        self.waiting = {}
+        self.entries = 0
+        self.extend(orders)
+    def append(self, order):
+        key = (order.arrival if order.arrival is not None else -1, self.entries)
+        self.entries += 1
+        self.orders[key] = order
+        for item_id in order.items_ordered:
+            self.waiting.setdefault(item_id, {})[key] = order
+    def extend(self, orders):
+        for order in orders:
+            self.append(order)
+    def waiting_on(self, item_id):
+        # (key, order) pairs for the orders needing `item_id`, in arrival order.
+        return sorted(self.waiting.get(item_id, {}).items(), key=lambda entry: entry[0])
+    def discard(self, key):
+        order = self.orders.pop(key, None)
+        if order is None:
+            return
+        for item_id in order.items_ordered:
+            waiters = self.waiting.get(item_id)
+            if waiters is not None:
+                waiters.pop(key, None)
+                if not waiters:
+                    del self.waiting[item_id]
+    def clear(self):
+        self.orders.clear()
+        self.waiting.clear()
+    def __len__(self):
+        return len(self.orders)
+    def __iter__(self):
+        return iter(list(self.orders.values()))
+    def __getitem__(self, index):
+        return list(self.orders.values())[index]
+class OrderScheduler:
+    # Heap-backed replacement for the FIFO deque with the same interface
+    # (append, popleft, len, iteration, clear). Orders are popped by the
+    # policy's key and then by arrival, in O(log n) per insert and pop: the
+    # order's own arrival number where it has one (orders without sort
+    # first), so an order put back keeps its place, then insertion order.
+    # Iteration yields pending orders in the order they would be popped.
+    policies = {
+        "fifo": lambda order: (),
+        "priority": lambda order: (-order.priority,),
+        "due_date": lambda order: (order.due_date is None, order.due_date if order.due_date is not None else 0),
+        "smallest": lambda order: (sum(order.items_ordered.values()),),
+    }
+    def __init__(self, policy="fifo", orders=()):
+        if policy not in self.policies:
+            raise ValueError(f"Unknown scheduling policy '{policy}'. Choose from: {', '.join(self.policies)}.")
+        self.policy = policy
+        self.key = self.policies[policy]
+        self.heap = []
+        self.arrivals = 0
+        self.extend(orders)
+    def append(self, order):
+        arrival = order.arrival if order.arrival is not None else -1
+        heapq.heappush(self.heap, (self.key(order), arrival, self.arrivals, order))
+        self.arrivals += 1
+    def extend(self, orders):
+        for order in orders:
+            self.append(order)
+    def popleft(self):
+        if not self.heap:
+            raise IndexError("pop from an empty scheduler")
+        return heapq.heappop(self.heap)[3]
+    def peek(self):
+        return self.heap[0][3]
+    def remove(self, order):
+        for index, entry in enumerate(self.heap):
+            if entry[3] is order:
+                self.heap[index] = self.heap[-1]
+                self.heap.pop()
+                heapq.heapify(self.heap)
+                return
+        raise ValueError("order not in scheduler")
+    def arrival_order(self):
+        return [entry[3] for entry in sorted(self.heap, key=lambda entry: entry[1:3])]
+    def clear(self):
+        self.heap.clear()
+    def __len__(self):
+        return len(self.heap)
+    def __iter__(self):
+        return (entry[3] for entry in sorted(self.heap, key=lambda entry: entry[:3]))
+class AllocationResult:
+    def __init__(self):
+        self.fulfilled = []
+        self.unfulfilled = []
+        self.shortages = {}  # order_id -> (item_id, needed, available); available is None for unknown items
+        self.units_allocated = {}
+    def record(self, order, shortage):
+        if shortage is None:
+            self.fulfilled.append(order)
+            for item_id, qty in order.items_ordered.items():
+                self.units_allocated[item_id] = self.units_allocated.get(item_id, 0) + qty
+        else:
+            self.unfulfilled.append(order)
+            self.shortages[order.order_id] = shortage
+    def __str__(self):
+        return f"Allocated {len(self.fulfilled)} order(s), {len(self.unfulfilled)} could not be fulfilled."
 class OrderManager:
 
-    def __init__(self, inventory_manager):
+    def __init__(self, inventory_manager, compact_history=False, scheduler=None, retry_on_restock=False):
         self.inventory_manager = inventory_manager
-        self.order_queue = deque()
-        self.fulfilled_orders = []
-        self.unfulfilled_orders = []
+        self.order_queue = scheduler if scheduler is not None else deque()
+        self.fulfilled_orders = ColumnarOrderLog() if compact_history else []
+        if retry_on_restock:
+            self.unfulfilled_orders = OrderBacklog()
+        else:
+            self.unfulfilled_orders = ColumnarOrderLog() if compact_history else []
+        self.journal = None
+        self.metrics = None  # a warehouse_metrics.Metrics, when instrumentation is on
+        self.analytics = None  # a warehouse_analytics.OrderAnalytics, when demand aggregates are kept
+        self.results_lock = threading.Lock()
+        self.in_flight = {}  # id(order) -> order taken off the queue but not yet logged (or reserved)
+        self.arrivals = 0
+        if retry_on_restock:
+            inventory_manager.restock_listeners.append(self.retry_unfulfilled)
 
+    def _enqueue(self, order):
+        with self.results_lock:
+            order.arrival = self.arrivals
+            self.arrivals += 1
+            self.order_queue.append(order)
+            if self.journal is not None:
+                self.journal.order_submitted(order)
+            if self.metrics is not None:
+                self.metrics.inc("orders_submitted_total")
+                self.metrics.record_max("order_queue_depth_max", len(self.order_queue))
+    def submit_orders(self, orders, batch_size=10000):
+        # Bulk submit_order: each batch of valid orders is queued, and
+        # journalled, as one unit; invalid rows are reported in the returned
+        # BulkResult and skipped.
+        result = BulkResult()
+        for batch in _batches(orders, batch_size):
+            result.batches += 1
+            valid = []
+            for row, order in batch:
+                error = _order_error(order)
+                if error is None:
+                    valid.append(order)
+                else:
+                    result.errors.append((row, error))
+            if not valid:
+                continue
+            with self.results_lock:
+                for order in valid:
+                    order.arrival = self.arrivals
+                    self.arrivals += 1
+                self.order_queue.extend(valid)
+                if self.journal is not None:
+                    self.journal.orders_submitted(valid)
+                if self.metrics is not None:
+                    self.metrics.inc("orders_submitted_total", len(valid))
+                    self.metrics.record_max("order_queue_depth_max", len(self.order_queue))
+            result.submitted += len(valid)
+        logger.info("Bulk order import: %s", result)
+        return result
+    def _next_order(self):
+        # Takes the next order off the queue, or returns None when it is
+        # empty. Until the order is logged it stays in `in_flight`, so a
+        # checkpoint taken meanwhile still writes it as pending.
+        with self.results_lock:
+            if not self.order_queue:
+                return None
+            order = self.order_queue.popleft()
+            self.in_flight[id(order)] = order
+            return order
+    def clear_orders(self):
+        # Empties the queue and the order history, e.g. on an inventory reset,
+        # journalled as one record.
+        with self.results_lock:
+            self.order_queue.clear()
+            self.in_flight.clear()
+            self.fulfilled_orders.clear()
+            self.unfulfilled_orders.clear()
+            if self.journal is not None:
+                self.journal.orders_cleared()
     def submit_order(self, order):
-        self.order_queue.append(order)
-        print(f"Order '{order.order_id}' submitted successfully.")
+        self._enqueue(order)
+        return _report(logging.INFO, Result.OK, "Order '%s' submitted successfully.", order.order_id,
+                       order_id=order.order_id)
 
-    def process_next_order(self):
-        if not self.order_queue:
-            print("No pending orders to process.")
-            return
-        order = self.order_queue.popleft()
-        can_fulfill = True
-        for item_id, qty in order.items_ordered.items():
-            item = self.inventory_manager.items.get(item_id)
-            if item is None:
-                print(f"Item ID '{item_id}' does not exist in inventory for Order '{order.order_id}'.")
-                can_fulfill = False
-                break
-            if item.quantity < qty:
-                print(
-                    f"Not enough stock for '{item.name}' (needed: {qty}, available: {item.quantity}) in Order '{order.order_id}'.")
-                can_fulfill = False
-                break
-        if can_fulfill:
+    def _allocate(self, order):
+        # Checks and takes stock for one order while holding the stripes of
+        # every item it touches. Returns None once fulfilled, otherwise the
+        # first shortage as (item_id, needed, available), with available None
+        # for an unknown item.
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        items = self.inventory_manager.items
+        reserved = self.inventory_manager.reserved
+        locks = self.inventory_manager.locks
+        stripes = locks.acquire(order.items_ordered)
+        try:
             for item_id, qty in order.items_ordered.items():
-                self.inventory_manager.items[item_id].quantity -= qty
-            self.fulfilled_orders.append(order)
-            print(f"Order '{order.order_id}' has been fulfilled.")
+                item = items.get(item_id)
+                if item is None:
+                    shortage = (item_id, qty, None)
+                    break
+                available = item.quantity
+                if reserved:
+                    available -= reserved.get(item_id, 0)
+                if available < qty:
+                    shortage = (item_id, qty, available)
+                    break
+            else:
+                shortage = None
+                if self.inventory_manager.history is not None:
+                    self.inventory_manager.history.touch(order.items_ordered)
+                for item_id, qty in order.items_ordered.items():
+                    items[item_id].quantity -= qty
+            with self.results_lock:
+                self.in_flight.pop(id(order), None)
+                if shortage is None:
+                    self.fulfilled_orders.append(order)
+                    if self.journal is not None:
+                        self.journal.orders_processed([order], [], {item_id: items[item_id].quantity
+                                                                    for item_id in order.items_ordered})
+                    if self.analytics is not None:
+                        self.analytics.record([order], ())
+                else:
+                    self.unfulfilled_orders.append(order)
+                    if self.journal is not None:
+                        self.journal.orders_processed([], [order], {})
+                    if self.analytics is not None:
+                        self.analytics.record((), [order])
+        finally:
+            locks.release(stripes)
+        if shortage is None:
+            self.inventory_manager._notify(order.items_ordered)
+        if metrics is not None:
+            metrics.observe("order_processing_seconds", time.perf_counter() - started,
+                            "orders_fulfilled_total" if shortage is None else "orders_unfulfilled_total")
+        return shortage
+    def _outcome(self, order, shortage):
+        # Logs and returns the Result for an order _allocate has processed.
+        order_id = order.order_id
+        if shortage is None:
+            return _report(logging.INFO, Result.FULFILLED, "Order '%s' has been fulfilled.", order_id, order_id=order_id)
+        item_id, qty, available = shortage
+        if available is None:
+            result = _report(logging.WARNING, Result.UNKNOWN_ITEM,
+                             "Item ID '%s' does not exist in inventory for Order '%s'.", item_id, order_id,
+                             item_id=item_id, order_id=order_id, needed=qty)
+        else:
+            item = self.inventory_manager.items.get(item_id)
+            result = _report(logging.WARNING, Result.INSUFFICIENT_STOCK,
+                             "Not enough stock for '%s' (needed: %s, available: %s) in Order '%s'.",
+                             item.name if item is not None else item_id, qty, available, order_id,
+                             item_id=item_id, order_id=order_id, needed=qty, available=available)
+        logger.info("Order '%s' could not be fulfilled due to inventory issues.", order_id)
+        return result
+    def process_next_order(self):
+        order = self._next_order()
+        if order is None:
+            return _report(logging.INFO, Result.QUEUE_EMPTY, "No pending orders to process.")
+        return self._outcome(order, self._allocate(order))
+    def retry_unfulfilled(self, item_id=None):
+        # Re-tries unfulfilled orders (only those needing `item_id`, if given),
+        # fulfilling any that now fit in stock. With an OrderBacklog only the
+        # orders waiting on the item are examined, in arrival order; otherwise
+        # the whole list is scanned in the order the orders failed. Runs under
+        # every stock stripe so the journalled stock is exact.
+        items = self.inventory_manager.items
+        reserved = self.inventory_manager.reserved
+        fits = lambda order: all(ordered_id in items and items[ordered_id].quantity - reserved.get(ordered_id, 0) >= qty
+                                 for ordered_id, qty in order.items_ordered.items())
+        history = self.inventory_manager.history
+        released = []
+        with self.inventory_manager.locks.hold_all(), self.results_lock:
+            backlog = self.unfulfilled_orders
+            if isinstance(backlog, OrderBacklog) and item_id is not None:
+                for key, order in backlog.waiting_on(item_id):
+                    if fits(order):
+                        backlog.discard(key)
+                        released.append(order)
+                        if history is not None:
+                            history.touch(order.items_ordered)
+                        for ordered_id, qty in order.items_ordered.items():
+                            items[ordered_id].quantity -= qty
+            else:
+                remaining = []
+                for order in backlog:
+                    if (item_id is None or item_id in order.items_ordered) and fits(order):
+                        released.append(order)
+                        if history is not None:
+                            history.touch(order.items_ordered)
+                        for ordered_id, qty in order.items_ordered.items():
+                            items[ordered_id].quantity -= qty
+                    else:
+                        remaining.append(order)
+                if released:
+                    backlog.clear()
+                    backlog.extend(remaining)
+            if released:
+                self.fulfilled_orders.extend(released)
+                if self.journal is not None:
+                    self.journal.orders_released(released, {ordered_id: items[ordered_id].quantity
+                                                            for order in released for ordered_id in order.items_ordered})
+                if self.analytics is not None:
+                    self.analytics.released(released)
+        if released:
+            self.inventory_manager._notify({ordered_id for order in released for ordered_id in order.items_ordered})
+        for order in released:
+            logger.info("Backordered order '%s' has been fulfilled after restock.", order.order_id)
+        return released
+    def compare_policies(self, policies=None):
+        # Dry-runs the pending queue under each scheduling policy against a
+        # copy of current stock. Latency is the number of processing slots an
+        # order waited before it was fulfilled.
+        reserved = self.inventory_manager.reserved
+        stock = {item_id: item.quantity - reserved.get(item_id, 0) for item_id, item in self.inventory_manager.items.items()}
+        if isinstance(self.order_queue, OrderScheduler):
+            pending = self.order_queue.arrival_order()
         else:
-            self.unfulfilled_orders.append(order)
-            print(f"Order '{order.order_id}' could not be fulfilled due to inventory issues.")
-    def process_all_orders(self):
-        while self.order_queue:
-            self.process_next_order()
-    def export_logs(self):
+            pending = list(self.order_queue)
+        report = {}
+        for policy in policies or OrderScheduler.policies:
+            scheduler = OrderScheduler(policy, pending)
+            remaining = dict(stock)
+            fulfilled = units = units_fulfilled = 0
+            latencies = []
+            for slot in range(len(scheduler)):
+                order = scheduler.popleft()
+                units += sum(order.items_ordered.values())
+                if all(remaining.get(item_id, -1) >= qty for item_id, qty in order.items_ordered.items()):
+                    for item_id, qty in order.items_ordered.items():
+                        remaining[item_id] -= qty
+                    fulfilled += 1
+                    units_fulfilled += sum(order.items_ordered.values())
+                    latencies.append(slot)
+            latencies.sort()
+            report[policy] = {
+                "orders": len(pending),
+                "fulfilled": fulfilled,
+                "fill_rate": fulfilled / len(pending) if pending else 1.0,
+                "unit_fill_rate": units_fulfilled / units if units else 1.0,
+                "mean_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0,
+            }
+        return report
+    def process_all_orders(self, batch=False, workers=None):
+        if batch:
+            return self.allocate_batch()
+        if workers:
+            return self.process_concurrently(workers)
+        result = AllocationResult()
+        while True:
+            order = self._next_order()
+            if order is None:
+                return result
+            shortage = self._allocate(order)
+            self._outcome(order, shortage)
+            result.record(order, shortage)
+    def process_concurrently(self, workers=4):
+        # Drains the queue with a pool of worker threads. Each order is
+        # all-or-nothing under its item stripes, so stock never goes below
+        # zero, but orders on different items may complete out of FIFO order.
+        result = AllocationResult()
+        def work():
+            while True:
+                order = self._next_order()
+                if order is None:
+                    return
+                shortage = self._allocate(order)
+                with self.results_lock:
+                    result.record(order, shortage)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(work) for _ in range(workers)]:
+                future.result()
+        return result
+    def allocate_batch(self):
+        # Drains the whole queue with the same outcome as FIFO processing.
+        # Demand is aggregated per item first: an item whose total demand fits
+        # in stock can never fail a check, so only orders touching contended
+        # or unknown items need the sequential pass, which runs over
+        # array-backed stock for the contended items alone.
+        started = time.perf_counter()
+        with self.inventory_manager.locks.hold_all():
+            result = self._allocate_batch()
+        if result.units_allocated:
+            self.inventory_manager._notify(result.units_allocated)
+        if self.metrics is not None:
+            self.metrics.observe("batch_allocation_seconds", time.perf_counter() - started)
+            self.metrics.inc("orders_fulfilled_total", len(result.fulfilled))
+            self.metrics.inc("orders_unfulfilled_total", len(result.unfulfilled))
+        return result
+    def _allocate_batch(self):
+        result = AllocationResult()
+        with self.results_lock:
+            orders = [self.order_queue.popleft() for _ in range(len(self.order_queue))]
+        items = self.inventory_manager.items
+        reserved = self.inventory_manager.reserved
+        demand = {}
+        blocked = set()
+        for order in orders:
+            for item_id, qty in order.items_ordered.items():
+                demand[item_id] = demand.get(item_id, 0) + qty
+                if qty < 0:
+                    blocked.add(item_id)
+        for item_id, total in demand.items():
+            item = items.get(item_id)
+            if item is None or total > item.quantity - reserved.get(item_id, 0):
+                blocked.add(item_id)
+        slots = {item_id: slot for slot, item_id in enumerate(item_id for item_id in blocked if item_id in items)}
+        stock = array("q", (items[item_id].quantity - reserved.get(item_id, 0) for item_id in slots))
+        released = {}
+        for order in orders:
+            if blocked.isdisjoint(order.items_ordered):
+                self.fulfilled_orders.append(order)
+                result.fulfilled.append(order)
+                continue
+            shortage = None
+            for item_id, qty in order.items_ordered.items():
+                slot = slots.get(item_id)
+                if slot is None:
+                    if item_id not in items:
+                        shortage = (item_id, qty, None)
+                        break
+                elif stock[slot] < qty:
+                    shortage = (item_id, qty, stock[slot])
+                    break
+            if shortage is None:
+                for item_id, qty in order.items_ordered.items():
+                    slot = slots.get(item_id)
+                    if slot is not None:
+                        stock[slot] -= qty
+                self.fulfilled_orders.append(order)
+                result.fulfilled.append(order)
+            else:
+                for item_id, qty in order.items_ordered.items():
+                    if item_id not in slots and item_id in items:
+                        released[item_id] = released.get(item_id, 0) + qty
+                self.unfulfilled_orders.append(order)
+                result.unfulfilled.append(order)
+                result.shortages[order.order_id] = shortage
+        if self.inventory_manager.history is not None:
+            self.inventory_manager.history.touch(demand)
+        for item_id, total in demand.items():
+            if item_id in slots:
+                item = items[item_id]
+                allocated = item.quantity - reserved.get(item_id, 0) - stock[slots[item_id]]
+            elif item_id in items:
+                item = items[item_id]
+                allocated = total - released.get(item_id, 0)
+            else:
+                continue
+            if allocated:
+                item.quantity -= allocated
+                result.units_allocated[item_id] = allocated
+        if self.journal is not None and orders:
+            self.journal.orders_processed(result.fulfilled, result.unfulfilled,
+                                          {item_id: items[item_id].quantity for item_id in result.units_allocated})
+        if self.analytics is not None:
+            self.analytics.record(result.fulfilled, result.unfulfilled)
+        return result
+    def export_logs(self, directory=".", incremental=False, compress=False, progress=None, **filters):
+        # See warehouse_export.LogExporter; `filters` narrow the exported
+        # orders by ID or due date range.
         try:
-            with open("fulfilled_orders.csv", mode="w", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow(["Order ID", "Items Ordered"])
-                for order in self.fulfilled_orders:
-                    items_str = "; ".join([f"{k}:{v}" for k, v in order.items_ordered.items()])
-                    writer.writerow([order.order_id, items_str])
-            print("Fulfilled orders exported to fulfilled_orders.csv")
-            with open("unfulfilled_orders.csv", mode="w", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow(["Order ID", "Items Ordered"])
-                for order in self.unfulfilled_orders:
-                    items_str = "; ".join([f"{k}:{v}" for k, v in order.items_ordered.items()])
-                    writer.writerow([order.order_id, items_str])
-            print("Unfulfilled orders exported to unfulfilled_orders.csv")
+            results = LogExporter(self, directory).export(incremental, compress, progress, **filters)
         except Exception as e:
-            print(f"Error exporting logs: {e}")
+            logger.error("Error exporting logs: %s", e)
+            return None
+        for filename, written in results.items():
+            logger.info("Exported %s orders to %s", written, filename)
+        return results
+class Reservation:
+    __slots__ = ("order", "expires_at")
+    def __init__(self, order, expires_at):
+        self.order = order
+        self.expires_at = expires_at
+class ReservationLedger:
+    # Two-phase order processing. reserve() holds stock for an order taken
+    # off the queue while it is picked, commit() takes the stock and logs
+    # the order as fulfilled, and release() (or expiry after its TTL) hands
+    # the stock back and returns the order to the queue. Held units are kept
+    # per item in InventoryManager.reserved, which every allocation path
+    # subtracts from on-hand stock, so available = on_hand - reserved without
+    # touching the items. Expiry times sit in a heap; entries for orders
+    # already committed or released are skipped when popped. reap() runs at
+    # the start of each call and, after start(), on a timer thread.
+    # Reservations are not journalled: a reserved order stays in the order
+    # manager's `in_flight` until it is committed or released, so a
+    # checkpoint writes it as pending and after a restart it is simply back
+    # in the queue.
+    def __init__(self, order_manager, default_ttl=300.0, clock=time.monotonic):
+        self.order_manager = order_manager
+        self.inventory_manager = order_manager.inventory_manager
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.reservations = {}  # order_id -> Reservation
+        self.expiries = []  # heap of (expires_at, sequence, order_id)
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.reaper = None
+    def start(self, interval=1.0):
+        if self.reaper is None:
+            self.stopped.clear()
+            self.reaper = threading.Thread(target=self._reap_periodically, args=(interval,), daemon=True)
+            self.reaper.start()
+    def close(self):
+        if self.reaper is not None:
+            self.stopped.set()
+            self.reaper.join()
+            self.reaper = None
+    def _reap_periodically(self, interval):
+        while not self.stopped.wait(interval):
+            self.reap()
+    def _unreserve(self, order):
+        # Caller holds the stripes of the order's items.
+        reserved = self.inventory_manager.reserved
+        for item_id, qty in order.items_ordered.items():
+            left = reserved.get(item_id, 0) - qty
+            if left > 0:
+                reserved[item_id] = left
+            else:
+                reserved.pop(item_id, None)
+    def _requeue(self, order):
+        # Back to the front of a FIFO queue, where it was taken from; a
+        # scheduler places it by its key and original arrival number.
+        order_manager = self.order_manager
+        with order_manager.results_lock:
+            order_manager.in_flight.pop(id(order), None)
+            if isinstance(order_manager.order_queue, deque):
+                order_manager.order_queue.appendleft(order)
+            else:
+                order_manager.order_queue.append(order)
+    def _take(self, order_id):
+        # Removes and returns the live reservation for order_id, holding the
+        # stripes of its items, or returns None.
+        with self.lock:
+            reservation = self.reservations.get(order_id)
+        if reservation is None:
+            return None
+        stripes = self.inventory_manager.locks.acquire(reservation.order.items_ordered)
+        with self.lock:
+            if self.reservations.get(order_id) is not reservation:
+                self.inventory_manager.locks.release(stripes)
+                return None
+            del self.reservations[order_id]
+        return reservation, stripes
+    def reserve(self, order, ttl=None):
+        # `order` must already have been submitted (and taken off the queue),
+        # so the journal knows it when the reservation is committed.
+        self.reap()
+        order_id = order.order_id
+        items = self.inventory_manager.items
+        reserved = self.inventory_manager.reserved
+        with self.inventory_manager.locks.hold(order.items_ordered):
+            with self.lock:
+                if order_id in self.reservations:
+                    return _report(logging.WARNING, Result.DUPLICATE_RESERVATION,
+                                   "Order '%s' already has a reservation.", order_id, order_id=order_id)
+                for item_id, qty in order.items_ordered.items():
+                    item = items.get(item_id)
+                    if item is None:
+                        return _report(logging.WARNING, Result.UNKNOWN_ITEM,
+                                       "Item ID '%s' does not exist in inventory for Order '%s'.", item_id, order_id,
+                                       item_id=item_id, order_id=order_id, needed=qty)
+                    available = item.quantity - reserved.get(item_id, 0)
+                    if available < qty:
+                        return _report(logging.WARNING, Result.INSUFFICIENT_STOCK,
+                                       "Cannot reserve '%s' (needed: %s, available: %s) for Order '%s'.",
+                                       item.name, qty, available, order_id,
+                                       item_id=item_id, order_id=order_id, needed=qty, available=available)
+                for item_id, qty in order.items_ordered.items():
+                    reserved[item_id] = reserved.get(item_id, 0) + qty
+                expires_at = self.clock() + (self.default_ttl if ttl is None else ttl)
+                self.reservations[order_id] = Reservation(order, expires_at)
+                heapq.heappush(self.expiries, (expires_at, self.sequence, order_id))
+                self.sequence += 1
+        if self.order_manager.metrics is not None:
+            self.order_manager.metrics.inc("reservations_total")
+        return _report(logging.INFO, Result.OK, "Stock reserved for Order '%s'.", order_id, order_id=order_id)
+    def reserve_next(self, ttl=None):
+        # Takes the next order off the queue and reserves its stock. An order
+        # that cannot be reserved is logged as unfulfilled, as
+        # process_next_order would.
+        order_manager = self.order_manager
+        order = order_manager._next_order()
+        if order is None:
+            return _report(logging.INFO, Result.QUEUE_EMPTY, "No pending orders to process.")
+        result = self.reserve(order, ttl)
+        if result.status == Result.DUPLICATE_RESERVATION:
+            self._requeue(order)
+        elif not result.ok:
+            with order_manager.results_lock:
+                order_manager.in_flight.pop(id(order), None)
+                order_manager.unfulfilled_orders.append(order)
+                if order_manager.journal is not None:
+                    order_manager.journal.orders_processed([], [order], {})
+                if order_manager.analytics is not None:
+                    order_manager.analytics.record((), [order])
+        return result
+    def commit(self, order_id):
+        # Takes the reserved stock and logs the order as fulfilled. Stock set
+        # below the reservation since (by update_item) fails the order.
+        self.reap()
+        taken = self._take(order_id)
+        if taken is None:
+            return _report(logging.WARNING, Result.UNKNOWN_RESERVATION,
+                           "No reservation for Order '%s' (it may have expired).", order_id, order_id=order_id)
+        reservation, stripes = taken
+        order = reservation.order
+        order_manager = self.order_manager
+        items = self.inventory_manager.items
+        try:
+            self._unreserve(order)
+            shortage = None
+            for item_id, qty in order.items_ordered.items():
+                item = items.get(item_id)
+                if item is None:
+                    shortage = (item_id, qty, None)
+                    break
+                if item.quantity < qty:
+                    shortage = (item_id, qty, item.quantity)
+                    break
+            else:
+                if self.inventory_manager.history is not None:
+                    self.inventory_manager.history.touch(order.items_ordered)
+                for item_id, qty in order.items_ordered.items():
+                    items[item_id].quantity -= qty
+            with order_manager.results_lock:
+                order_manager.in_flight.pop(id(order), None)
+                if shortage is None:
+                    order_manager.fulfilled_orders.append(order)
+                    if order_manager.journal is not None:
+                        order_manager.journal.orders_processed([order], [], {item_id: items[item_id].quantity
+                                                                             for item_id in order.items_ordered})
+                    if order_manager.analytics is not None:
+                        order_manager.analytics.record([order], ())
+                else:
+                    order_manager.unfulfilled_orders.append(order)
+                    if order_manager.journal is not None:
+                        order_manager.journal.orders_processed([], [order], {})
+                    if order_manager.analytics is not None:
+                        order_manager.analytics.record((), [order])
+        finally:
+            self.inventory_manager.locks.release(stripes)
+        if shortage is None:
+            self.inventory_manager._notify(order.items_ordered)
+        if order_manager.metrics is not None:
+            order_manager.metrics.inc("orders_fulfilled_total" if shortage is None else "orders_unfulfilled_total")
+        return order_manager._outcome(order, shortage)
+    def release(self, order_id):
+        # Hands the reserved stock back and returns the order to the queue.
+        self.reap()
+        taken = self._take(order_id)
+        if taken is None:
+            return _report(logging.WARNING, Result.UNKNOWN_RESERVATION,
+                           "No reservation for Order '%s' (it may have expired).", order_id, order_id=order_id)
+        reservation, stripes = taken
+        try:
+            self._unreserve(reservation.order)
+        finally:
+            self.inventory_manager.locks.release(stripes)
+        self._requeue(reservation.order)
+        return _report(logging.INFO, Result.OK, "Reservation for Order '%s' released.", order_id, order_id=order_id)
+    def reap(self):
+        # Releases every reservation past its expiry; returns how many.
+        now = self.clock()
+        due = []
+        with self.lock:
+            expiries = self.expiries
+            while expiries and expiries[0][0] <= now:
+                order_id = heapq.heappop(expiries)[2]
+                reservation = self.reservations.get(order_id)
+                if reservation is not None and reservation.expires_at <= now:
+                    due.append(order_id)
+        expired = 0
+        for order_id in due:
+            taken = self._take(order_id)
+            if taken is None:
+                continue
+            reservation, stripes = taken
+            try:
+                self._unreserve(reservation.order)
+            finally:
+                self.inventory_manager.locks.release(stripes)
+            self._requeue(reservation.order)
+            expired += 1
+            logger.info("Reservation for Order '%s' expired; the order is pending again.", order_id)
+        if expired and self.order_manager.metrics is not None:
+            self.order_manager.metrics.inc("reservations_expired_total", expired)
+        return expired
 def display_menu():
     menu = """
 --- Warehouse Management System ---
@@ -131,11 +1756,15 @@ def display_menu():
 7. Process Next Order
 8. Process All Orders
 9. Export Order Logs to CSV
+10. Compare Scheduling Policies
+11. Set Item Reorder Point
+12. Show Items Below Reorder Point
 0. Exit
 -------------------------------------
 Choose an option: """
     return input(menu).strip()
 def main():
+    configure_logging()
     inventory_manager = InventoryManager()
     order_manager = OrderManager(inventory_manager)
     sample_items = [
@@ -145,6 +1774,9 @@ def main():
     ]
     for item in sample_items:
         inventory_manager.add_item(item)
+    alerts = ReorderAlerts()
+    alerts.hooks.append(lambda alert: print(f"\n*** {alert} ***"))
+    alerts.attach(inventory_manager)
     while True:
         choice = display_menu()
 
@@ -152,7 +1784,14 @@ def main():
             sort_by = input("Enter sort key (name/quantity/category) [default: name]: ").strip()
             if sort_by == "":
                 sort_by = "name"
-            inventory_manager.display_inventory(sort_by)
+            page = 0
+            while True:
+                inventory_manager.display_inventory(sort_by, page)
+                if (page + 1) * 50 >= len(inventory_manager.items):
+                    break
+                if input("Press Enter for the next page, or q to stop: ").strip().lower() == "q":
+                    break
+                page += 1
 
         elif choice == "2":
             item_id = input("Enter new item ID: ").strip()
@@ -211,6 +1850,32 @@ def main():
         elif choice == "9":
             order_manager.export_logs()
 
+        elif choice == "10":
+            report = order_manager.compare_policies()
+            print("\n--- Scheduling Policy Comparison ---")
+            for policy, row in report.items():
+                print(f"{policy:>10}: fill rate {row['fill_rate']:.1%} ({row['fulfilled']}/{row['orders']} orders, "
+                      f"{row['unit_fill_rate']:.1%} of units), mean latency {row['mean_latency']:.1f}, "
+                      f"p95 latency {row['p95_latency']}")
+            print("------------------------------------\n")
+
+        elif choice == "11":
+            item_id = input("Enter item ID: ").strip()
+            reorder_point = input("Enter reorder point (blank to disable alerts): ").strip()
+            try:
+                reorder_point = int(reorder_point) if reorder_point else None
+            except ValueError:
+                print("Invalid reorder point. Must be an integer.")
+                continue
+            inventory_manager.set_reorder_point(item_id, reorder_point)
+
+        elif choice == "12":
+            low = alerts.below_reorder_point()
+            if not low:
+                print("No items are below their reorder point.")
+            for item in low:
+                print(f"{item} - reorder point {item.reorder_point}")
+
         elif choice == "0":
             print("Exiting the program.")
             sys.exit(0)
@@ -291,10 +1956,7 @@ def launch_gui(inventory_manager, order_manager):
         search_term = simpledialog.askstring("Search Item", "Enter Item ID or name to search:", parent=root)
         if not search_term:
             return
-        matches = []
-        for item in inventory_manager.items.values():
-            if search_term.lower() in item.item_id.lower() or search_term.lower() in item.name.lower():
-                matches.append(str(item))
+        matches = [str(item) for item in inventory_manager.search(search_term, limit=500)]
         if matches:
             messagebox.showinfo("Search Results", "\n".join(matches))
         else:
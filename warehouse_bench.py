@@ -0,0 +1,340 @@
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from warehouse_backend import InventoryManager, Item, Order, OrderManager, ReservationLedger
+from warehouse_ingest import import_items, import_orders
+from warehouse_persistence import (OrderArchive, load_inventory_from_file, load_orders_from_file, order_to_dict,
+                                   save_inventory_to_file, save_orders_to_file)
+from warehouse_simulator import Scenario, WhatIfSimulator
+from warehouse_sites import ShardedInventory, ShardedOrderManager, Site
+CATEGORIES = ["Gadgets", "Accessories", "Tools", "Hardware", "Electrical", "Plumbing", "Garden", "Office"]
+WORDS = ["Widget", "Gizmo", "Doodad", "Sprocket", "Bracket", "Valve", "Cable", "Adapter", "Hinge", "Bolt",
+         "Washer", "Clamp", "Filter", "Switch", "Panel", "Gear", "Spring", "Pulley", "Socket", "Fuse"]
+class Workload:
+    # Seeded synthetic catalog and order stream. SKU popularity follows a
+    # Zipf distribution with exponent `skew` (rank 1 is the most ordered
+    # item), and stock is scaled to expected demand so that popular items run
+    # short first, as they do in practice.
+    def __init__(self, skus, orders, seed=42, skew=1.1, max_lines=5, stock_factor=0.8):
+        self.skus = skus
+        self.orders = orders
+        self.seed = seed
+        self.skew = skew
+        self.max_lines = max_lines
+        self.stock_factor = stock_factor
+        self.cum_weights = list(itertools.accumulate(1.0 / rank ** skew for rank in range(1, skus + 1)))
+    def demand_share(self, rank):
+        return 1.0 / (rank + 1) ** self.skew / self.cum_weights[-1]
+    def item_id(self, rank):
+        return f"SKU{rank:08d}"
+    def catalog(self):
+        rng = random.Random(self.seed)
+        mean_units = (self.max_lines + 1) / 2 * 3
+        expected_units = self.orders * mean_units
+        for rank in range(self.skus):
+            name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rank}"
+            stock = int(expected_units * self.demand_share(rank) * self.stock_factor * rng.uniform(0.5, 1.5))
+            yield Item(self.item_id(rank), name, stock, rng.choice(CATEGORIES))
+    def order_stream(self, prefix="ORD"):
+        rng = random.Random(self.seed + 1)
+        ranks = range(self.skus)
+        for number in range(self.orders):
+            lines = rng.randint(1, self.max_lines)
+            picked = rng.choices(ranks, cum_weights=self.cum_weights, k=lines)
+            items_ordered = {self.item_id(rank): rng.randint(1, 5) for rank in picked}
+            yield Order(f"{prefix}{number:09d}", items_ordered, rng.randint(0, 3))
+    def search_terms(self, count):
+        rng = random.Random(self.seed + 2)
+        terms = []
+        for _ in range(count):
+            kind = rng.random()
+            if kind < 0.4:
+                terms.append(self.item_id(rng.randrange(self.skus)))
+            elif kind < 0.8:
+                terms.append(rng.choice(WORDS)[:rng.randint(3, 6)])
+            else:
+                terms.append(rng.choice(WORDS).lower()[1:4])
+        return terms
+    def build(self, **manager_options):
+        inventory_manager = InventoryManager()
+        for item in self.catalog():
+            inventory_manager.items[item.item_id] = item
+        inventory_manager.reindex()
+        order_manager = OrderManager(inventory_manager, **manager_options)
+        for order in self.order_stream():
+            order_manager.order_queue.append(order)
+        return inventory_manager, order_manager
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+# Traced memory when the current benchmark's window opened (see allocation_peak).
+_window_start = 0
+def allocation_peak():
+    # Peak Python allocation above the level the window opened at, in bytes,
+    # then opens a new window for the next benchmark. None unless run_suite
+    # is tracing. Worker processes (what-if, process shards) are not traced.
+    global _window_start
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    peak, _window_start = peak - _window_start, current
+    return peak
+def summarize(name, latencies, ops=None, seconds=None, **extra):
+    # `latencies` are per-operation seconds; `ops`/`seconds` override the
+    # throughput basis when one timed call covers many operations.
+    latencies = sorted(latencies)
+    if seconds is None:
+        seconds = sum(latencies)
+    if ops is None:
+        ops = len(latencies)
+    peak = allocation_peak()
+    result = {
+        "name": name,
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "throughput": round(ops / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        "peak_alloc_mb": round(peak / 2 ** 20, 1) if peak is not None else None,
+    }
+    result.update(extra)
+    return result
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - started
+def bench_search(inventory_manager, workload, queries=2000):
+    latencies = [timed(inventory_manager.search, term, 50) for term in workload.search_terms(queries)]
+    return summarize("search", latencies)
+def bench_display(inventory_manager, pages=200):
+    # Pages through display_inventory for each sort key; output is discarded.
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for sort_by in ("name", "quantity", "category"):
+            first = timed(inventory_manager.display_inventory, sort_by, 0)
+            total_pages = max(1, -(-len(inventory_manager.items) // 50))
+            latencies = [timed(inventory_manager.display_inventory, sort_by, page % total_pages)
+                         for page in range(1, pages + 1)]
+            results.append(summarize(f"display_inventory[{sort_by}]", latencies, first_page_ms=round(first * 1000, 4)))
+    return results
+def bench_processing(workload, mode):
+    inventory_manager, order_manager = workload.build()
+    options = {"sequential": {}, "batch": {"batch": True}, "concurrent": {"workers": 4}}[mode]
+    if mode == "sequential":
+        # Per-order latencies from process_next_order.
+        latencies = []
+        queue = order_manager.order_queue
+        started = time.perf_counter()
+        while queue:
+            latencies.append(timed(order_manager.process_next_order))
+        seconds = time.perf_counter() - started
+        return summarize("process_orders[sequential]", latencies, seconds=seconds,
+                         fulfilled=len(order_manager.fulfilled_orders))
+    seconds = timed(order_manager.process_all_orders, **options)
+    return summarize(f"process_orders[{mode}]", [seconds], ops=workload.orders, seconds=seconds,
+                     fulfilled=len(order_manager.fulfilled_orders))
+def bench_reservations(workload):
+    # Stages the whole order stream as reservations, commits every other one
+    # and lets the rest expire in a single reap.
+    inventory_manager, order_manager = workload.build()
+    now = [0.0]
+    ledger = ReservationLedger(order_manager, default_ttl=60.0, clock=lambda: now[0])
+    reserve = [timed(ledger.reserve_next) for _ in range(workload.orders)]
+    staged = list(ledger.reservations)
+    commit = [timed(ledger.commit, order_id) for order_id in staged[::2]]
+    now[0] += 61.0
+    reap = timed(ledger.reap)
+    return [summarize("reserve", reserve, staged=len(staged)),
+            summarize("commit", commit),
+            summarize("reap_expired", [reap], ops=len(staged) - len(commit), seconds=reap)]
+def bench_whatif(workload, scenarios=8, processes=4):
+    # Evaluates `scenarios` restock plans for the 100 most ordered items
+    # against the whole order stream, in-process and in worker processes.
+    inventory_manager, order_manager = workload.build()
+    simulator = WhatIfSimulator(order_manager)
+    item_ids = [workload.item_id(rank) for rank in range(min(100, workload.skus))]
+    plans = [Scenario(f"restock{number}", restock={item_id: number * 10 for item_id in item_ids})
+             for number in range(scenarios)]
+    results = []
+    for name, count in (("whatif[in-process]", None), (f"whatif[{processes} processes]", processes)):
+        seconds = timed(simulator.run, plans, count)
+        results.append(summarize(name, [seconds], ops=scenarios * workload.orders, seconds=seconds,
+                                 scenarios=scenarios))
+    return results
+def bench_sharding(workload, shards, processes=None):
+    # Hash-partitions the catalog over `shards` sites and drains the order
+    # stream in-process, or with one worker process per shard.
+    sharded = ShardedInventory([Site(f"site{index}") for index in range(shards)], "hash")
+    for item in workload.catalog():
+        sharded.sites[sharded.shard_index(item.item_id)].inventory_manager.items[item.item_id] = item
+    for site in sharded.sites:
+        site.inventory_manager.reindex()
+    order_manager = ShardedOrderManager(sharded)
+    order_manager.order_queue.extend((order, None) for order in workload.order_stream())
+    seconds = timed(order_manager.process_all_orders, processes)
+    mode = f"{processes} processes" if processes else "in-process"
+    return summarize(f"sharded[{shards} shards, {mode}]", [seconds], ops=workload.orders, seconds=seconds,
+                     fulfilled=len(order_manager.fulfilled_orders))
+def bench_persistence(inventory_manager, order_manager, directory, repeat=3):
+    inventory_filename = os.path.join(directory, "inventory.json")
+    orders_filename = os.path.join(directory, "orders.json")
+    items = len(inventory_manager.items)
+    orders = len(order_manager.fulfilled_orders) + len(order_manager.unfulfilled_orders) + len(order_manager.order_queue)
+    results = [
+        summarize("save_inventory", [timed(save_inventory_to_file, inventory_manager, inventory_filename)
+                                     for _ in range(repeat)], ops=items * repeat,
+                  bytes=os.path.getsize(inventory_filename)),
+        summarize("save_orders", [timed(save_orders_to_file, order_manager, orders_filename)
+                                  for _ in range(repeat)], ops=orders * repeat,
+                  bytes=os.path.getsize(orders_filename)),
+    ]
+    loaded_inventory = InventoryManager()
+    results.append(summarize("load_inventory", [timed(load_inventory_from_file, loaded_inventory, inventory_filename)
+                                                for _ in range(repeat)], ops=items * repeat))
+    loaded_orders = OrderManager(loaded_inventory)
+    results.append(summarize("load_orders", [timed(load_orders_from_file, loaded_orders, orders_filename)
+                                             for _ in range(repeat)], ops=orders * repeat))
+    lazy_orders = OrderManager(loaded_inventory)
+    results.append(summarize("load_orders[lazy]", [timed(load_orders_from_file, lazy_orders, orders_filename, True)
+                                                   for _ in range(repeat)], ops=orders * repeat))
+    for orders in (lazy_orders.fulfilled_orders, lazy_orders.unfulfilled_orders):
+        if isinstance(orders, OrderArchive):
+            orders.close()
+    return results
+def bench_ingest(workload, directory):
+    # Writes the catalog as CSV and the order stream as NDJSON, then times
+    # bulk loading them into empty managers and upserting the catalog again.
+    items_filename = os.path.join(directory, "items.csv")
+    orders_filename = os.path.join(directory, "orders.ndjson")
+    with open(items_filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["item_id", "name", "quantity", "category", "reorder_point"])
+        writer.writerows([item.item_id, item.name, item.quantity, item.category, ""] for item in workload.catalog())
+    with open(orders_filename, "w") as f:
+        for order in workload.order_stream():
+            f.write(json.dumps(order_to_dict(order)) + "\n")
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager)
+    results = []
+    for name, function, args, rows in (
+            ("import_items[csv]", import_items, (inventory_manager, items_filename, None, False), workload.skus),
+            ("upsert_items[csv]", import_items, (inventory_manager, items_filename), workload.skus),
+            ("import_orders[ndjson]", import_orders, (order_manager, orders_filename), workload.orders)):
+        seconds = timed(function, *args)
+        results.append(summarize(name, [seconds], ops=rows, seconds=seconds))
+    return results
+def bench_export(order_manager, directory):
+    orders = len(order_manager.fulfilled_orders) + len(order_manager.unfulfilled_orders)
+    seconds = timed(order_manager.export_logs, directory)
+    return summarize("export_logs", [seconds], ops=orders, seconds=seconds)
+def run_suite(skus, orders, seed=42, skew=1.1, modes=("sequential", "batch", "concurrent"), shards=(),
+              memory=False):
+    # With `memory`, each benchmark reports the peak it allocated since the
+    # previous one finished. Tracing slows allocation, so timings from such
+    # a run are not comparable with untraced ones.
+    global _window_start
+    if memory:
+        tracemalloc.start()
+        _window_start = 0
+    try:
+        return _run_suite(skus, orders, seed, skew, modes, shards)
+    finally:
+        if memory:
+            tracemalloc.stop()
+def _run_suite(skus, orders, seed, skew, modes, shards):
+    workload = Workload(skus, orders, seed, skew)
+    benchmarks = []
+    started = time.perf_counter()
+    inventory_manager = InventoryManager()
+    for item in workload.catalog():
+        inventory_manager.items[item.item_id] = item
+    reindex_seconds = timed(inventory_manager.reindex)
+    benchmarks.append(summarize("reindex", [reindex_seconds], ops=skus, seconds=reindex_seconds))
+    benchmarks.append(bench_search(inventory_manager, workload))
+    benchmarks.extend(bench_display(inventory_manager))
+    del inventory_manager
+    for mode in modes:
+        benchmarks.append(bench_processing(workload, mode))
+    benchmarks.extend(bench_reservations(workload))
+    benchmarks.extend(bench_whatif(workload))
+    for count in shards:
+        benchmarks.append(bench_sharding(workload, count))
+        benchmarks.append(bench_sharding(workload, count, processes=count))
+    inventory_manager, order_manager = workload.build()
+    order_manager.process_all_orders(batch=True)
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks.extend(bench_persistence(inventory_manager, order_manager, directory))
+        benchmarks.append(bench_export(order_manager, directory))
+        benchmarks.extend(bench_ingest(workload, directory))
+    return {"skus": skus, "orders": orders, "seed": seed, "skew": skew,
+            "wall_seconds": round(time.perf_counter() - started, 3), "benchmarks": benchmarks}
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+def compare(baseline, results):
+    # Prints throughput and p99 changes for benchmarks present in both files.
+    previous = {(run["skus"], run["orders"], bench["name"]): bench
+                for run in baseline["runs"] for bench in run["benchmarks"]}
+    for run in results["runs"]:
+        for bench in run["benchmarks"]:
+            old = previous.get((run["skus"], run["orders"], bench["name"]))
+            if old is None or not old["throughput"] or not bench["throughput"]:
+                continue
+            change = bench["throughput"] / old["throughput"] - 1
+            print(f"{run['skus']:>9} SKUs {bench['name']:<32} throughput {change:+7.1%}   "
+                  f"p99 {old['p99_ms']:.3f} -> {bench['p99_ms']:.3f} ms")
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse benchmark suite.")
+    parser.add_argument("--skus", type=int, nargs="+", default=[1000, 100000],
+                        help="catalog sizes to run (e.g. 1000 100000 10000000)")
+    parser.add_argument("--orders", type=int, default=20000, help="orders in each stream")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of SKU demand")
+    parser.add_argument("--modes", nargs="+", default=["sequential", "batch", "concurrent"],
+                        choices=["sequential", "batch", "concurrent"])
+    parser.add_argument("--shards", type=int, nargs="*", default=[1, 2, 4, 8],
+                        help="shard counts for the multi-site allocation runs")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--memory", action="store_true",
+                        help="trace each benchmark's peak allocation (slows the timings)")
+    args = parser.parse_args()
+    logging.getLogger("warehouse").setLevel(logging.CRITICAL)
+    results = {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": [],
+    }
+    for skus in args.skus:
+        run = run_suite(skus, args.orders, args.seed, args.skew, args.modes, args.shards, args.memory)
+        results["runs"].append(run)
+        for bench in run["benchmarks"]:
+            print(f"{skus:>9} SKUs {bench['name']:<32} {bench['throughput'] or 0:>14,.1f} ops/s   "
+                  f"p50 {bench['p50_ms']:.3f} ms   p99 {bench['p99_ms']:.3f} ms   peak {bench['peak_alloc_mb']} MB")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+if __name__ == "__main__":
+    main()
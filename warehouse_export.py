@@ -0,0 +1,99 @@
+import csv
+import gzip
+import json
+import os
+HEADER = ["Order ID", "Items Ordered"]
+def order_rows(orders, start=0, end=None, min_order_id=None, max_order_id=None, due_after=None, due_before=None,
+               chunk_size=1000):
+    # Yields (position, rows) for orders[start:end] that pass the filters,
+    # `chunk_size` orders at a time; position is the index reached. Order ID
+    # bounds compare as strings; due date bounds are inclusive and skip
+    # orders without one. Slicing a chunk at a time keeps paged archives from
+    # being materialised.
+    if end is None:
+        end = len(orders)
+    due_filtered = due_after is not None or due_before is not None
+    for chunk_start in range(start, end, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, end)
+        rows = []
+        for order in orders[chunk_start:chunk_end]:
+            order_id = order.order_id
+            if min_order_id is not None and str(order_id) < min_order_id:
+                continue
+            if max_order_id is not None and str(order_id) > max_order_id:
+                continue
+            if due_filtered:
+                due_date = order.due_date
+                if due_date is None or (due_after is not None and due_date < due_after) or \
+                        (due_before is not None and due_date > due_before):
+                    continue
+            rows.append([order_id, "; ".join([f"{k}:{v}" for k, v in order.items_ordered.items()])])
+        yield chunk_end, rows
+def write_rows(filename, chunks, total, append=False, compress=False, progress=None, label=None):
+    # Streams row chunks from order_rows into `filename` (gzip-compressed
+    # when `compress`), writing the header unless appending. Calls
+    # progress(label, position, total) after each chunk and returns the
+    # number of rows written.
+    mode = "at" if append else "wt"
+    if compress:
+        file = gzip.open(filename, mode, newline="")
+    else:
+        file = open(filename, mode, newline="", buffering=1 << 16)
+    written = 0
+    with file:
+        writer = csv.writer(file)
+        if not append:
+            writer.writerow(HEADER)
+        for position, rows in chunks:
+            writer.writerows(rows)
+            written += len(rows)
+            if progress is not None:
+                progress(label, position, total)
+    return written
+class LogExporter:
+    # Writes the fulfilled and unfulfilled order logs to CSV. With
+    # incremental=True only fulfilled orders added since the previous export
+    # are appended; the position reached is kept in a small watermark file
+    # next to the CSVs. The fulfilled log only ever grows, so a position is a
+    # valid watermark; the unfulfilled file is always rewritten, since orders
+    # leave the backlog when a restock releases them.
+    def __init__(self, order_manager, directory=".", watermark_filename="export_watermark.json"):
+        self.order_manager = order_manager
+        self.directory = directory
+        self.watermark_filename = os.path.join(directory, watermark_filename)
+    def read_watermark(self):
+        try:
+            with open(self.watermark_filename) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    def write_watermark(self, watermark):
+        tmp_filename = self.watermark_filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(watermark, f)
+        os.replace(tmp_filename, self.watermark_filename)
+    def export(self, incremental=False, compress=False, progress=None, **filters):
+        # Returns {filename: rows written}. `filters` are passed to order_rows.
+        order_manager = self.order_manager
+        results = {}
+        with order_manager.results_lock:
+            # Results are appended under this lock; fix the range to export
+            # and copy the (bounded) backlog so workers can keep going.
+            fulfilled = order_manager.fulfilled_orders
+            end = len(fulfilled)
+            unfulfilled = list(order_manager.unfulfilled_orders)
+        suffix = ".csv.gz" if compress else ".csv"
+        filename = os.path.join(self.directory, "fulfilled_orders" + suffix)
+        watermark = self.read_watermark()
+        start = watermark.get(filename, 0) if incremental else 0
+        if start > end or not os.path.exists(filename):
+            # The log was reset, or the file removed, since the last export.
+            start = 0
+        chunks = order_rows(fulfilled, start, end, **filters)
+        results[filename] = write_rows(filename, chunks, end, start > 0, compress, progress, "fulfilled")
+        watermark[filename] = end
+        self.write_watermark(watermark)
+        filename = os.path.join(self.directory, "unfulfilled_orders" + suffix)
+        chunks = order_rows(unfulfilled, **filters)
+        results[filename] = write_rows(filename, chunks, len(unfulfilled), False, compress, progress, "unfulfilled")
+        return results
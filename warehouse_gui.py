@@ -1,72 +1,176 @@
-import json
+import argparse
+import logging
 import os
+import threading
+import time
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from warehouse_backend import InventoryManager, Item, Order, OrderManager
-def item_to_dict(item):
-    return {
-        "item_id": item.item_id,
-        "name": item.name,
-        "quantity": item.quantity,
-        "category": item.category
-    }
-def dict_to_item(d):
-    return Item(d["item_id"], d["name"], d["quantity"], d.get("category", "General"))
-def order_to_dict(order):
-    return {
-        "order_id": order.order_id,
-        "items_ordered": order.items_ordered
-    }
-def dict_to_order(d):
-    return Order(d["order_id"], d["items_ordered"])
-def save_inventory_to_file(inventory_manager, filename="inventory.json"):
-    data = [item_to_dict(item) for item in inventory_manager.items.values()]
-    try:
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=4)
-    except Exception as e:
-        print("Error saving inventory:", e)
-def load_inventory_from_file(inventory_manager, filename="inventory.json"):
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-            inventory_manager.items.clear()
-            for item_data in data:
-                item = dict_to_item(item_data)
-                inventory_manager.items[item.item_id] = item
-        except Exception as e:
-            print("Error loading inventory:", e)
-def save_orders_to_file(order_manager, filename="orders.json"):
-    data = {
-        "order_queue": [order_to_dict(order) for order in list(order_manager.order_queue)],
-        "fulfilled_orders": [order_to_dict(order) for order in order_manager.fulfilled_orders],
-        "unfulfilled_orders": [order_to_dict(order) for order in order_manager.unfulfilled_orders]
-    }
-    try:
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=4)
-    except Exception as e:
-        print("Error saving orders:", e)
-def load_orders_from_file(order_manager, filename="orders.json"):
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-            order_manager.order_queue.clear()
-            order_manager.fulfilled_orders.clear()
-            order_manager.unfulfilled_orders.clear()
-            for order_data in data.get("order_queue", []):
-                order_manager.order_queue.append(dict_to_order(order_data))
-            for order_data in data.get("fulfilled_orders", []):
-                order_manager.fulfilled_orders.append(dict_to_order(order_data))
-            for order_data in data.get("unfulfilled_orders", []):
-                order_manager.unfulfilled_orders.append(dict_to_order(order_data))
-        except Exception as e:
-            print("Error loading orders:", e)
-def launch_gui(inventory_manager, order_manager):
-    load_inventory_from_file(inventory_manager)
-    load_orders_from_file(order_manager)
+from warehouse_backend import (InventoryManager, Item, Order, OrderManager, ReorderAlerts, VersionedInventory,
+                               configure_logging)
+from warehouse_intake import start_intake_thread
+from warehouse_export import LogExporter
+from warehouse_analytics import OrderAnalytics
+from warehouse_journal import Journal
+from warehouse_metrics import Metrics, RateMeter
+from warehouse_sqlite import open_store
+from warehouse_persistence import (save_inventory_to_file, load_inventory_from_file, load_orders_from_file,
+                                   peak_rss_bytes, PersistenceWorker)
+logger = logging.getLogger("warehouse.gui")
+class InventoryView:
+    # Paged view of the inventory for the Treeview. Only the current page is
+    # materialised as rows (iid = item ID), and a refresh only touches rows
+    # whose values changed. Ordering and filtering come from the inventory's
+    # SortIndex and SearchIndex, or from a SqliteStore's indexes when one is
+    # given as `store`.
+    columns = {"ID": "item_id", "Name": "name", "Category": "category", "Quantity": "quantity"}
+    def __init__(self, tree, inventory_manager, page_size=200, store=None):
+        self.tree = tree
+        self.inventory_manager = inventory_manager
+        self.store = store
+        self.page_size = page_size
+        self.page = 0
+        self.sort_column = "ID"
+        self.descending = False
+        self.filter_term = ""
+        self.filter_ids = None
+        self.rows = {}  # iid -> values currently shown
+        self.row_ids = {}  # iid -> item_id
+        self.page_iids = []
+        self.total = 0
+        self.dirty = set()
+        self.dirty_lock = threading.Lock()
+        inventory_manager.change_listeners.append(self.mark_dirty)
+    def mark_dirty(self, item_ids):
+        # Called from whichever thread changed the items; only needed to keep
+        # an active in-memory filter's matches current.
+        if self.filter_ids is not None:
+            with self.dirty_lock:
+                self.dirty.update(item_ids)
+    def item_id(self, iid):
+        return self.row_ids[iid]
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        self.page = 0
+    def set_filter(self, term):
+        self.filter_term = str(term).lower()
+        self.filter_ids = None
+        if self.filter_term and self.store is None:
+            self.filter_ids = {item.item_id for item in self.inventory_manager.search(self.filter_term)}
+        with self.dirty_lock:
+            self.dirty.clear()
+        self.page = 0
+    def page_count(self):
+        return max(1, -(-self.total // self.page_size))
+    def turn_page(self, step):
+        self.page = min(max(self.page + step, 0), self.page_count() - 1)
+    def _update_filter(self, full):
+        with self.dirty_lock:
+            dirty, self.dirty = self.dirty, set()
+        if self.filter_ids is None:
+            return
+        if full:
+            self.set_filter(self.filter_term)
+            return
+        items = self.inventory_manager.items
+        term = self.filter_term
+        for item_id in dirty:
+            item = items.get(item_id)
+            if item is not None and (term in str(item_id).lower() or term in str(item.name).lower()):
+                self.filter_ids.add(item_id)
+            else:
+                self.filter_ids.discard(item_id)
+    def _query(self):
+        field = self.columns[self.sort_column]
+        if self.store is not None:
+            return self.store.items_page(field, self.page, self.page_size, self.descending, self.filter_term)
+        return self.inventory_manager.sort_index.page(field, self.page, self.page_size, self.descending,
+                                                      self.filter_ids)
+    def _page_items(self):
+        items, self.total = self._query()
+        if self.page >= self.page_count():
+            self.page = self.page_count() - 1
+            items, self.total = self._query()
+        return items
+    def refresh(self, full=False):
+        # Returns the time taken in seconds.
+        started = time.perf_counter()
+        self._update_filter(full)
+        if full:
+            for iid in self.page_iids:
+                self.tree.delete(iid)
+            self.rows.clear()
+            self.row_ids.clear()
+            self.page_iids = []
+        page = [(str(item.item_id), item.item_id, (item.item_id, item.name, item.category, item.quantity))
+                for item in self._page_items()]
+        wanted = {iid for iid, _, _ in page}
+        for iid in self.page_iids:
+            if iid not in wanted:
+                self.tree.delete(iid)
+                del self.rows[iid]
+                del self.row_ids[iid]
+        kept = [iid for iid in self.page_iids if iid in wanted]
+        # Rows already shown only need moving if their relative order changed.
+        reorder = kept != [iid for iid, _, _ in page if iid in self.rows]
+        for index, (iid, item_id, values) in enumerate(page):
+            shown = self.rows.get(iid)
+            if shown is None:
+                self.tree.insert("", index, iid=iid, values=values)
+            else:
+                if shown != values:
+                    self.tree.item(iid, values=values)
+                if reorder:
+                    self.tree.move(iid, "", index)
+            self.rows[iid] = values
+            self.row_ids[iid] = item_id
+        self.page_iids = [iid for iid, _, _ in page]
+        return time.perf_counter() - started
+    def describe(self):
+        if not self.total:
+            return "No items" if not self.filter_term else f"No items match '{self.filter_term}'"
+        first = self.page * self.page_size + 1
+        last = first + len(self.page_iids) - 1
+        text = f"Items {first}-{last} of {self.total}"
+        if self.filter_term:
+            text += f" matching '{self.filter_term}'"
+        return text + f" (page {self.page + 1}/{self.page_count()})"
+def launch_gui(inventory_manager, order_manager, journal_filename="warehouse.journal", database=None, compact=False):
+    # With `database`, state lives in that SQLite file (imported from the JSON
+    # files on first use) instead of the JSON snapshot plus journal. With
+    # `compact`, JSON snapshots are written without indentation.
+    started = time.perf_counter()
+    if database is None:
+        load_inventory_from_file(inventory_manager)
+        journal_seq = load_orders_from_file(order_manager, lazy_history=True)
+        storage = Journal(journal_filename, indent=None if compact else 4)
+    else:
+        journal_seq = 0
+        storage = open_store(database)
+    storage.recover(inventory_manager, order_manager, journal_seq)
+    storage.attach(inventory_manager, order_manager)
+    metrics = Metrics()
+    metrics.attach(inventory_manager, order_manager, storage)
+    analytics = OrderAnalytics()
+    analytics.attach(inventory_manager, order_manager)
+    persistence = PersistenceWorker(storage)
+    persistence.start()
+    history = VersionedInventory()
+    history.attach(inventory_manager)
+    alerts = ReorderAlerts()
+    raised_alerts = deque(maxlen=100)
+    alerts.hooks.append(raised_alerts.append)
+    alerts.attach(inventory_manager)
+    startup_message = (f"Loaded {len(inventory_manager.items)} items and {len(order_manager.order_queue)} pending orders "
+                       f"in {time.perf_counter() - started:.2f}s")
+    peak_rss = peak_rss_bytes()
+    if peak_rss is not None:
+        startup_message += f" (peak RSS {peak_rss / 2 ** 20:.1f} MB)"
+    logger.info("%s", startup_message)
     root = tk.Tk()
     root.title("Warehouse Inventory & Order Management System")
     root.geometry("900x650")
@@ -85,19 +189,93 @@ def launch_gui(inventory_manager, order_manager):
     tree.column("Category", anchor=tk.CENTER, width=120)
     tree.column("Quantity", anchor=tk.CENTER, width=80)
     tree.pack(fill="both", expand=True, padx=5, pady=5)
+    # With a database, paging, search and the low-stock list are SQL queries.
+    query_store = storage if database is not None else None
+    view = InventoryView(tree, inventory_manager, store=query_store)
+    frame_paging = ttk.Frame(frame_inventory)
+    frame_paging.pack(fill="x", padx=5, pady=(0, 5))
+    page_var = tk.StringVar()
+    filter_var = tk.StringVar()
     status_var = tk.StringVar()
     status_var.set("Ready")
     status_bar = ttk.Label(root, textvariable=status_var, relief="sunken", anchor=tk.W, padding=5, font=default_font)
     status_bar.pack(side="bottom", fill="x")
     def update_status(message):
         status_var.set(message)
+    def show_inventory(full=False):
+        seconds = view.refresh(full)
+        metrics.observe("inventory_refresh_seconds", seconds)
+        page_var.set(view.describe())
+        for column in InventoryView.columns:
+            arrow = (" \u25bc" if view.descending else " \u25b2") if column == view.sort_column else ""
+            tree.heading(column, text=headings[column] + arrow)
+        return seconds
     def refresh_inventory():
-        for row in tree.get_children():
-            tree.delete(row)
-        for item in inventory_manager.items.values():
-            tree.insert("", "end", values=(item.item_id, item.name, item.category, item.quantity))
-        update_status("Inventory refreshed.")
-    refresh_inventory()
+        seconds = show_inventory(full=True)
+        update_status(f"Inventory refreshed in {seconds * 1000:.1f} ms.")
+    def sort_inventory(column):
+        view.sort_by(column)
+        show_inventory()
+    def turn_page(step):
+        view.turn_page(step)
+        show_inventory()
+    def apply_filter(event=None):
+        view.set_filter(filter_var.get().strip())
+        seconds = show_inventory()
+        update_status(f"Filtered inventory in {seconds * 1000:.1f} ms.")
+    def clear_filter():
+        filter_var.set("")
+        apply_filter()
+    headings = {"ID": "Item ID", "Name": "Name", "Category": "Category", "Quantity": "Quantity"}
+    for column in InventoryView.columns:
+        tree.heading(column, command=lambda column=column: sort_inventory(column))
+    ttk.Button(frame_paging, text="< Prev", command=lambda: turn_page(-1)).pack(side="left")
+    ttk.Button(frame_paging, text="Next >", command=lambda: turn_page(1)).pack(side="left", padx=5)
+    ttk.Label(frame_paging, textvariable=page_var).pack(side="left", padx=5)
+    ttk.Button(frame_paging, text="Clear", command=clear_filter).pack(side="right")
+    ttk.Button(frame_paging, text="Filter", command=apply_filter).pack(side="right", padx=5)
+    filter_entry = ttk.Entry(frame_paging, textvariable=filter_var, width=24)
+    filter_entry.pack(side="right")
+    filter_entry.bind("<Return>", apply_filter)
+    show_inventory()
+    update_status(startup_message)
+    processing = {"thread": None}
+    exporting = {"job": None}  # a Future from persistence.submit()
+    resetting = {"job": None}
+    def request_checkpoint():
+        # Snapshots are taken by the persistence worker. One taken mid-export
+        # would rebind the archived history under the exporter, so exports
+        # run on the worker too.
+        persistence.request()
+    frame_metrics = ttk.LabelFrame(main_frame, text="Metrics", padding="5")
+    frame_metrics.pack(fill="x", padx=5, pady=5)
+    metrics_var = tk.StringVar()
+    ttk.Label(frame_metrics, textvariable=metrics_var, font=default_font).pack(side="left", padx=5)
+    orders_meter = RateMeter(metrics, "orders_fulfilled_total", "orders_unfulfilled_total")
+    def poll_metrics():
+        snapshot = metrics.snapshot()
+        processing_latency = snapshot["histograms"].get("order_processing_seconds")
+        text = f"Orders/s: {orders_meter.rate():.0f}"
+        if processing_latency is not None:
+            text += (f"   Processing p50: {processing_latency['p50'] * 1000:.3f} ms"
+                     f"   p99: {processing_latency['p99'] * 1000:.3f} ms")
+        gauges = snapshot["gauges"]
+        text += f"   Queue: {gauges['order_queue_depth']} (max {gauges.get('order_queue_depth_max', 0)})"
+        text += f"   Backorders: {gauges['unfulfilled_orders']}"
+        metrics_var.set(text)
+        if storage.pending:
+            # Changes made off the Tk thread, e.g. by order intake.
+            request_checkpoint()
+        root.after(1000, poll_metrics)
+    def export_metrics():
+        try:
+            metrics.write_prometheus()
+            metrics.write_json()
+        except OSError as e:
+            messagebox.showerror("Export Metrics", f"Could not write metrics: {e}")
+            return
+        update_status("Metrics written to metrics.prom and metrics.json.")
+    ttk.Button(frame_metrics, text="Export Metrics", command=export_metrics).pack(side="right", padx=5)
     frame_item_ops = ttk.LabelFrame(main_frame, text="Item Operations", padding="10")
     frame_item_ops.pack(fill="x", padx=5, pady=5)
     frame_order_ops = ttk.LabelFrame(main_frame, text="Order Operations", padding="10")
@@ -122,60 +300,154 @@ def launch_gui(inventory_manager, order_manager):
         if not category:
             category = "General"
         new_item = Item(item_id, name, quantity, category)
-        inventory_manager.add_item(new_item)
-        refresh_inventory()
-        save_inventory_to_file(inventory_manager)
+        result = inventory_manager.add_item(new_item)
+        if not result.ok:
+            messagebox.showwarning("Add Item", str(result))
+            return
+        show_inventory()
+        request_checkpoint()
         update_status(f"Item '{name}' added.")
     def update_item():
         selected = tree.selection()
         if not selected:
             messagebox.showwarning("Update Item", "Please select an item to update.")
             return
-        item_values = tree.item(selected[0])["values"]
-        item_id = item_values[0]
+        item_id = view.item_id(selected[0])
         new_quantity = simpledialog.askinteger("Update Item", f"Enter new quantity for item {item_id}:", parent=root,
                                                minvalue=0)
         if new_quantity is None:
             return
-        inventory_manager.update_item(item_id, new_quantity)
-        refresh_inventory()
-        save_inventory_to_file(inventory_manager)
+        result = inventory_manager.update_item(item_id, new_quantity)
+        show_inventory()
+        if not result.ok:
+            messagebox.showwarning("Update Item", str(result))
+            return
+        request_checkpoint()
         update_status(f"Item '{item_id}' updated.")
     def remove_item():
         selected = tree.selection()
         if not selected:
             messagebox.showwarning("Remove Item", "Select an item to remove.")
             return
-        item_values = tree.item(selected[0])["values"]
-        item_id = item_values[0]
+        item_id = view.item_id(selected[0])
         if messagebox.askyesno("Remove Item", f"Are you sure you want to remove item {item_id}?"):
-            inventory_manager.remove_item(item_id)
-            refresh_inventory()
-            save_inventory_to_file(inventory_manager)
+            result = inventory_manager.remove_item(item_id)
+            show_inventory()
+            if not result.ok:
+                messagebox.showwarning("Remove Item", str(result))
+                return
+            request_checkpoint()
             update_status(f"Item '{item_id}' removed.")
+    def set_reorder_point():
+        selected = tree.selection()
+        if not selected:
+            messagebox.showwarning("Reorder Point", "Select an item to set its reorder point.")
+            return
+        item_id = view.item_id(selected[0])
+        item = inventory_manager.items.get(item_id)
+        current = item.reorder_point if item is not None else None
+        disable = False
+        if current is not None:
+            disable = messagebox.askyesnocancel("Reorder Point", f"Item {item_id} alerts at {current} units.\n"
+                                                                 "Disable the alert? (No sets a new reorder point.)")
+            if disable is None:
+                return
+        if disable:
+            reorder_point = None
+        else:
+            reorder_point = simpledialog.askinteger("Reorder Point", f"Alert when item {item_id} falls to:",
+                                                    parent=root, minvalue=0, initialvalue=current)
+            if reorder_point is None:
+                return
+        result = inventory_manager.set_reorder_point(item_id, reorder_point)
+        if not result.ok:
+            messagebox.showwarning("Reorder Point", str(result))
+            return
+        request_checkpoint()
+        if reorder_point is None:
+            update_status(f"Reorder point for '{item_id}' disabled.")
+        else:
+            update_status(f"Reorder point for '{item_id}' set to {reorder_point}.")
+    def show_low_stock():
+        low = query_store.items_at_reorder_point() if query_store is not None else alerts.below_reorder_point()
+        if not low:
+            messagebox.showinfo("Low Stock", "No items are below their reorder point.")
+            return
+        lines = [f"{item} - reorder point {item.reorder_point}" for item in low[:500]]
+        if len(low) > 500:
+            lines.append(f"... and {len(low) - 500} more")
+        messagebox.showinfo("Low Stock", "\n".join(lines))
+    def poll_alerts():
+        # Alert hooks run on the dispatcher thread; Tk is only touched here.
+        if raised_alerts:
+            latest = raised_alerts[-1]
+            count = len(raised_alerts)
+            raised_alerts.clear()
+            update_status(str(latest) if count == 1 else f"{latest} (+{count - 1} more low-stock alerts)")
+        root.after(500, poll_alerts)
+    def step_history(undo):
+        # Stock taken by processed orders comes back with an undo, but the
+        # orders stay in the fulfilled log.
+        if processing["thread"] is not None:
+            messagebox.showwarning("Undo" if undo else "Redo", "Wait for order processing to finish.")
+            return
+        result = history.undo() if undo else history.redo()
+        if result.ok:
+            show_inventory()
+            request_checkpoint()
+        update_status(f"{result} Now at version {history.cursor} of {history.head}.")
+    def show_version():
+        version = simpledialog.askinteger("Inventory As Of", f"Version (0-{history.head}, now at {history.cursor}):",
+                                          parent=root, minvalue=0, maxvalue=history.head)
+        if version is None:
+            return
+        differences = history.diff(version)
+        lines = [f"Inventory as of {history.describe(version)}: {len(history.as_of(version))} items, "
+                 f"{len(differences)} differ from now."]
+        for item_id, (then, now) in list(differences.items())[:500]:
+            lines.append(f"{item_id}: {then.quantity if then is not None else 'absent'} -> "
+                         f"{now.quantity if now is not None else 'absent'}")
+        if len(differences) > 500:
+            lines.append(f"... and {len(differences) - 500} more")
+        messagebox.showinfo("Inventory As Of", "\n".join(lines))
     def search_item():
         search_term = simpledialog.askstring("Search Item", "Enter Item ID or name to search:", parent=root)
         if not search_term:
             return
-        matches = []
-        for item in inventory_manager.items.values():
-            if search_term.lower() in item.item_id.lower() or search_term.lower() in item.name.lower():
-                matches.append(str(item))
+        matches = [str(item) for item in (query_store or inventory_manager).search(search_term, limit=500)]
         if matches:
             messagebox.showinfo("Search Results", "\n".join(matches))
         else:
             messagebox.showinfo("Search Results", "No matching items found.")
         update_status(f"Search completed for '{search_term}'.")
     def reset_inventory():
-        if messagebox.askyesno("Reset Inventory", "This will clear all inventory and order data. Continue?"):
-            inventory_manager.items.clear()
-            order_manager.order_queue.clear()
-            order_manager.fulfilled_orders.clear()
-            order_manager.unfulfilled_orders.clear()
+        if processing["thread"] is not None or exporting["job"] is not None or resetting["job"] is not None:
+            messagebox.showwarning("Reset Inventory", "Wait for order processing or export to finish before resetting.")
+            return
+        if messagebox.askyesno("Reset Inventory", "This will clear all inventory and order data. The inventory can "
+                                                  "be brought back with Undo; the orders cannot. Continue?"):
+            inventory_manager.clear_items()
+            order_manager.clear_orders()
+            analytics.clear()
+            alerts.rescan()
             refresh_inventory()
-            save_inventory_to_file(inventory_manager)
-            save_orders_to_file(order_manager)
-            update_status("Inventory and order data reset.")
+            # Both clears are journalled, so a crash from here on recovers the
+            # empty state; the new snapshot is written by the persistence
+            # worker and poll() reports back from the Tk thread.
+            def poll():
+                job = resetting["job"]
+                if not job.done():
+                    root.after(100, poll)
+                    return
+                resetting["job"] = None
+                if job.exception() is not None:
+                    update_status("Reset failed.")
+                    messagebox.showerror("Reset Inventory", f"Error saving the reset state: {job.exception()}")
+                    return
+                update_status("Inventory and order data reset.")
+            resetting["job"] = persistence.submit(storage.reset)
+            update_status("Resetting inventory and order data...")
+            root.after(100, poll)
     def submit_order():
         order_id = simpledialog.askstring("Submit Order", "Enter Order ID:", parent=root)
         if not order_id:
@@ -202,41 +474,169 @@ def launch_gui(inventory_manager, order_manager):
             return
         new_order = Order(order_id, items_ordered)
         order_manager.submit_order(new_order)
-        save_orders_to_file(order_manager)
+        request_checkpoint()
         update_status(f"Order '{order_id}' submitted.")
         messagebox.showinfo("Submit Order", f"Order {order_id} submitted successfully.")
     def process_next_order():
-        order_manager.process_next_order()
-        refresh_inventory()
-        save_inventory_to_file(inventory_manager)
-        save_orders_to_file(order_manager)
-        update_status("Processed next order.")
-        messagebox.showinfo("Process Order", "Processed next order.")
+        result = order_manager.process_next_order()
+        show_inventory()
+        request_checkpoint()
+        update_status(str(result))
+        if result.ok:
+            messagebox.showinfo("Process Order", str(result))
+        else:
+            messagebox.showwarning("Process Order", str(result))
     def process_all_orders():
-        order_manager.process_all_orders()
-        refresh_inventory()
-        save_inventory_to_file(inventory_manager)
-        save_orders_to_file(order_manager)
-        update_status("Processed all pending orders.")
-        messagebox.showinfo("Process Orders", "Processed all pending orders.")
+        # Drains the queue with allocate_batch, which matches FIFO processing
+        # order for order, on a thread off the Tk thread; poll for completion
+        # so the window stays responsive while the queue drains.
+        if processing["thread"] is not None:
+            update_status("Order processing is already running.")
+            return
+        outcome = {}
+        def work():
+            try:
+                with persistence.paused(), history.group("Process All Orders"):
+                    outcome["result"] = order_manager.process_all_orders(batch=True)
+            except Exception as e:
+                outcome["error"] = e
+        def poll():
+            if processing["thread"].is_alive():
+                root.after(100, poll)
+                return
+            processing["thread"] = None
+            show_inventory()
+            request_checkpoint()
+            if "error" in outcome:
+                update_status("Order processing failed.")
+                messagebox.showerror("Process Orders", f"Error processing orders: {outcome['error']}")
+                return
+            update_status(str(outcome["result"]))
+            messagebox.showinfo("Process Orders", f"Processed all pending orders.\n{outcome['result']}")
+        processing["thread"] = threading.Thread(target=work, daemon=True)
+        processing["thread"].start()
+        update_status("Processing all pending orders...")
+        root.after(100, poll)
     def export_logs():
-        order_manager.export_logs()
-        update_status("Order logs exported.")
-        messagebox.showinfo("Export Logs", "Order logs exported successfully.")
+        # Streams the CSVs on the persistence worker, so the export never
+        # overlaps a snapshot; the worker only records progress, and poll()
+        # shows it and the outcome from the Tk thread.
+        if exporting["job"] is not None:
+            update_status("An export is already running.")
+            return
+        incremental = messagebox.askyesnocancel(
+            "Export Logs", "Only append fulfilled orders added since the last export?\n"
+                           "(No rewrites the full logs.)")
+        if incremental is None:
+            return
+        state = {"progress": None}
+        def progress(label, done, total):
+            state["progress"] = (label, done, total)
+        def poll():
+            job = exporting["job"]
+            if not job.done():
+                if state["progress"] is not None:
+                    label, count, total = state["progress"]
+                    update_status(f"Exporting {label} orders: {count}/{total}...")
+                root.after(100, poll)
+                return
+            exporting["job"] = None
+            error = job.exception()
+            if error is not None:
+                update_status("Export failed.")
+                messagebox.showerror("Export Logs", f"Error exporting logs: {error}")
+                return
+            summary = "\n".join(f"{filename}: {written} orders" for filename, written in job.result().items())
+            update_status("Order logs exported.")
+            messagebox.showinfo("Export Logs", f"Order logs exported successfully.\n{summary}")
+        exporting["job"] = persistence.submit(
+            lambda: LogExporter(order_manager).export(incremental=incremental, progress=progress))
+        update_status("Exporting order logs...")
+        root.after(100, poll)
+    def show_analytics():
+        # Built from the running aggregates, so opening or refreshing the
+        # report does not walk the order history.
+        window = tk.Toplevel(root)
+        window.title("Order Analytics")
+        window.geometry("640x520")
+        text = tk.Text(window, font=("Courier", 10), wrap="none")
+        def fill():
+            summary = analytics.summary()
+            lines = [f"Orders processed: {summary['orders_processed']}   fulfilled: {summary['orders_fulfilled']}"
+                     f"   order fill rate: {summary['order_fill_rate']:.1%}",
+                     f"Unit fill rate: {summary['unit_fill_rate']:.1%}"
+                     f"   units on backorder: {summary['units_backordered']}", "",
+                     f"{'Category':<24}{'Ordered':>12}{'Shipped':>12}{'Fill rate':>12}"]
+            for category, figures in sorted(analytics.categories().items()):
+                lines.append(f"{category:<24}{figures['ordered']:>12}{figures['shipped']:>12}"
+                             f"{figures['fill_rate']:>12.1%}")
+            lines += ["", f"{'Top unfulfilled items':<24}{'Units':>12}"]
+            lines += [f"{str(item_id):<24}{units:>12}" for item_id, units in analytics.top_unfulfilled(10)]
+            lines += ["", f"{'Top shipped items':<24}{'Units':>12}"]
+            lines += [f"{str(item_id):<24}{units:>12}" for item_id, units in analytics.top_shipped(10)]
+            for period, label, last, fmt in (("hour", "Last 24 hours", 24, "%Y-%m-%d %H:00"),
+                                              ("day", "Last 14 days", 14, "%Y-%m-%d")):
+                lines += ["", f"{label:<24}{'Fulfilled':>12}{'Unfulfilled':>12}{'Released':>12}{'Shipped':>12}"]
+                for bucket in analytics.rollup(period, last):
+                    lines.append(f"{time.strftime(fmt, time.gmtime(bucket['start'])):<24}"
+                                 f"{bucket['orders_fulfilled']:>12}{bucket['orders_unfulfilled']:>12}"
+                                 f"{bucket['orders_released']:>12}{bucket['units_shipped']:>12}")
+            text.configure(state="normal")
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, "\n".join(lines))
+            text.configure(state="disabled")
+        ttk.Button(window, text="Refresh", command=fill).pack(side="bottom", pady=5)
+        text.pack(fill="both", expand=True, padx=5, pady=5)
+        fill()
     ttk.Button(frame_item_ops, text="Add Item", command=add_item).grid(row=0, column=0, padx=5, pady=5)
     ttk.Button(frame_item_ops, text="Update Item", command=update_item).grid(row=0, column=1, padx=5, pady=5)
     ttk.Button(frame_item_ops, text="Remove Item", command=remove_item).grid(row=0, column=2, padx=5, pady=5)
     ttk.Button(frame_item_ops, text="Search Item", command=search_item).grid(row=0, column=3, padx=5, pady=5)
     ttk.Button(frame_item_ops, text="Reset Inventory", command=reset_inventory).grid(row=0, column=4, padx=5, pady=5)
+    ttk.Button(frame_item_ops, text="Set Reorder Point", command=set_reorder_point).grid(row=1, column=0, padx=5,
+                                                                                        pady=5)
+    ttk.Button(frame_item_ops, text="Low Stock", command=show_low_stock).grid(row=1, column=1, padx=5, pady=5)
+    ttk.Button(frame_item_ops, text="Undo", command=lambda: step_history(True)).grid(row=1, column=2, padx=5, pady=5)
+    ttk.Button(frame_item_ops, text="Redo", command=lambda: step_history(False)).grid(row=1, column=3, padx=5, pady=5)
+    ttk.Button(frame_item_ops, text="Inventory As Of...", command=show_version).grid(row=1, column=4, padx=5, pady=5)
     ttk.Button(frame_order_ops, text="Submit Order", command=submit_order).grid(row=0, column=0, padx=5, pady=5)
     ttk.Button(frame_order_ops, text="Process Next Order", command=process_next_order).grid(row=0, column=1, padx=5,                                                                                   pady=5)
     ttk.Button(frame_order_ops, text="Process All Orders", command=process_all_orders).grid(row=0, column=2, padx=5,                                                                                   pady=5)
     ttk.Button(frame_order_ops, text="Export Logs", command=export_logs).grid(row=0, column=3, padx=5, pady=5)
-    ttk.Button(frame_misc_ops, text="Refresh Inventory", command=refresh_inventory).pack(padx=5, pady=5)
+    ttk.Button(frame_order_ops, text="Order Analytics", command=show_analytics).grid(row=0, column=4, padx=5, pady=5)
+    def start_intake():
+        if intake["server"] is not None:
+            update_status(f"Order intake already listening on {intake['server'].host}:{intake['server'].port}.")
+            return
+        try:
+            intake["server"] = start_intake_thread(order_manager)
+        except OSError as e:
+            messagebox.showerror("Order Intake", f"Could not start order intake: {e}")
+            return
+        update_status(f"Order intake listening on {intake['server'].host}:{intake['server'].port}.")
+    intake = {"server": None}
+    ttk.Button(frame_misc_ops, text="Refresh Inventory", command=refresh_inventory).pack(side="left", padx=5, pady=5)
+    ttk.Button(frame_misc_ops, text="Start Order Intake", command=start_intake).pack(side="left", padx=5, pady=5)
+    def on_close():
+        if processing["thread"] is not None:
+            processing["thread"].join()
+        persistence.stop()  # after any export or reset still queued
+        storage.checkpoint()
+        storage.close()
+        alerts.close()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(500, poll_alerts)
+    root.after(1000, poll_metrics)
     root.mainloop()
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warehouse Inventory & Order Management System.")
+    parser.add_argument("--db", help="keep data in this SQLite database instead of the JSON files")
+    parser.add_argument("--compact", action="store_true", help="write the JSON snapshots without indentation")
+    args = parser.parse_args()
+    log_listener = configure_logging(queued=True)
     inventory_manager = InventoryManager()
-    order_manager = OrderManager(inventory_manager)
+    order_manager = OrderManager(inventory_manager, retry_on_restock=True)
     if not os.path.exists("inventory.json"):
         sample_items = [
             Item("A101", "Widget", 50, "Gadgets"),
@@ -246,4 +646,5 @@ if __name__ == "__main__":
         for item in sample_items:
             inventory_manager.add_item(item)
         save_inventory_to_file(inventory_manager)
-    launch_gui(inventory_manager, order_manager)
+    launch_gui(inventory_manager, order_manager, database=args.db, compact=args.compact)
+    log_listener.stop()
@@ -0,0 +1,191 @@
+import argparse
+import csv
+import gc
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from warehouse_backend import InventoryManager, Item, Order, OrderManager, configure_logging
+from warehouse_intake import parse_order
+logger = logging.getLogger("warehouse.ingest")
+# Column names are matched case-insensitively, with spaces read as
+# underscores, so the headers of exported order logs ("Order ID", "Items
+# Ordered") are accepted as they are.
+ITEM_COLUMNS = ("item_id", "name", "quantity", "category", "reorder_point")
+ORDER_COLUMNS = ("order_id", "items_ordered", "priority", "due_date")
+@contextmanager
+def gc_paused():
+    # Bulk loads allocate millions of acyclic objects, and the cyclic
+    # collector would otherwise rescan the growing heap again and again.
+    # Process-wide, so only the command-line import uses it; the bulk
+    # methods on the managers leave the collector alone.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+def detect_format(source, format=None):
+    # "csv" or "ndjson", from `format` or the file name (a trailing .gz is
+    # ignored).
+    if format is not None:
+        if format not in ("csv", "ndjson"):
+            raise ValueError(f"Unknown format '{format}'. Choose from: csv, ndjson.")
+        return format
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    name = name[:-3] if name.endswith(".gz") else name
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise ValueError(f"Cannot tell the format of '{name}'; pass format='csv' or 'ndjson'.")
+def open_source(source):
+    # A path (optionally gzip-compressed) or an open text or binary file.
+    if isinstance(source, str):
+        if source.endswith(".gz"):
+            return gzip.open(source, "rt", encoding="utf-8", newline="")
+        return open(source, encoding="utf-8", newline="", buffering=1 << 16)
+    if isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+        return io.TextIOWrapper(source, encoding="utf-8", newline="")
+    return source
+def _csv_rows(f, columns):
+    # Yields each data row as a list of fields in `columns` order ("" for a
+    # column the file lacks), or a ValueError for a row that does not fit
+    # the header.
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip().lower().replace(" ", "_") for name in header]
+    missing = [column for column in columns[:2] if column not in names]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}.")
+    width = len(names)
+    # Index `width` is the padding field appended to every row.
+    positions = [names.index(column) if column in names else width for column in columns]
+    in_order = positions == list(range(len(columns)))
+    for row in reader:
+        if not row:
+            continue
+        if len(row) > width:
+            yield ValueError(f"Expected {width} fields, found {len(row)}.")
+            continue
+        # Spreadsheets tend to drop trailing empty fields.
+        row += [""] * (width + 1 - len(row))
+        yield row if in_order else [row[position] for position in positions]
+def _count(text, field):
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"Invalid {field} '{text}'.")
+def _item_from_csv(fields):
+    item_id, name, quantity, category, reorder_point = fields[:5]
+    reorder_point = reorder_point.strip()
+    return Item(item_id.strip(), name.strip(), _count(quantity, "quantity"), category.strip() or "General",
+                _count(reorder_point, "reorder point") if reorder_point else None)
+def _item_from_json(line):
+    try:
+        data = json.loads(line)
+    except ValueError:
+        raise ValueError("Invalid JSON.")
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object.")
+    if "item_id" not in data or "name" not in data or "quantity" not in data:
+        raise ValueError("Missing item_id, name or quantity.")
+    return Item(data["item_id"], data["name"], data["quantity"], data.get("category", "General"),
+                data.get("reorder_point"))
+def _order_from_csv(fields):
+    # Lines as written by the CSV export: "S101:2; F501:1".
+    order_id, lines, priority, due_date = fields[:4]
+    items_ordered = {}
+    for line in lines.split(";"):
+        if not line.strip():
+            continue
+        item_id, _, qty = line.rpartition(":")
+        if not item_id.strip():
+            raise ValueError(f"Invalid order line '{line.strip()}'.")
+        items_ordered[item_id.strip()] = _count(qty.strip(), "quantity")
+    priority = priority.strip()
+    return Order(order_id.strip(), items_ordered, _count(priority, "priority") if priority else 0,
+                 due_date.strip() or None)
+def _read(source, format, columns, from_csv, from_json):
+    # Yields one entry per record, an Item/Order or a ValueError, for the
+    # bulk APIs to validate; blank lines are not records.
+    format = detect_format(source, format)
+    f = open_source(source)
+    try:
+        if format == "csv":
+            for fields in _csv_rows(f, columns):
+                if isinstance(fields, ValueError):
+                    yield fields
+                    continue
+                try:
+                    yield from_csv(fields)
+                except ValueError as e:
+                    yield e
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield from_json(line)
+                except ValueError as e:
+                    yield e
+    finally:
+        if f is not source:
+            f.close()
+def read_items(source, format=None):
+    return _read(source, format, ITEM_COLUMNS, _item_from_csv, _item_from_json)
+def read_orders(source, format=None):
+    return _read(source, format, ORDER_COLUMNS, _order_from_csv, parse_order)
+def import_items(inventory_manager, source, format=None, upsert=True, batch_size=10000):
+    items = read_items(source, format)
+    if upsert:
+        return inventory_manager.upsert_items(items, batch_size)
+    return inventory_manager.add_items(items, batch_size)
+def import_orders(order_manager, source, format=None, batch_size=10000):
+    return order_manager.submit_orders(read_orders(source, format), batch_size)
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import of items or orders into the warehouse files.")
+    parser.add_argument("kind", choices=["items", "orders"])
+    parser.add_argument("source", help="CSV or NDJSON file, optionally .gz")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--add-only", action="store_true", help="reject items that already exist")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--errors", type=int, default=20, help="rejected rows to list")
+    args = parser.parse_args()
+    configure_logging()
+    from warehouse_journal import Journal
+    from warehouse_persistence import load_inventory_from_file, load_orders_from_file
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager)
+    load_inventory_from_file(inventory_manager)
+    journal = Journal()
+    journal.recover(inventory_manager, order_manager, load_orders_from_file(order_manager, lazy_history=True))
+    journal.attach(inventory_manager, order_manager)
+    started = time.perf_counter()
+    try:
+        with gc_paused():
+            if args.kind == "items":
+                result = import_items(inventory_manager, args.source, args.format, not args.add_only, args.batch_size)
+            else:
+                result = import_orders(order_manager, args.source, args.format, args.batch_size)
+    except (OSError, ValueError) as e:
+        logger.error("Import failed: %s", e)
+        result = None
+    finally:
+        journal.checkpoint()
+        journal.close()
+    if result is None:
+        return
+    logger.info("Imported %s in %.2fs.", os.path.basename(args.source), time.perf_counter() - started)
+    for row, error in result.errors[:args.errors]:
+        logger.warning("Row %s: %s", row, error)
+    if len(result.errors) > args.errors:
+        logger.warning("... and %s more rejected row(s).", len(result.errors) - args.errors)
+if __name__ == "__main__":
+    main()
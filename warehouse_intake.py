@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from warehouse_backend import InventoryManager, Order, OrderManager
+class IntakeServer:
+    # Local TCP service accepting newline-delimited JSON orders, e.g.
+    #   {"order_id": "ORD100", "items_ordered": {"S101": 2, "F501": 1}, "priority": 1}
+    # Parsed orders go through a bounded queue: when it is full, connection
+    # readers stop reading and TCP flow control pushes back on the sender. A
+    # single consumer submits the queue to OrderManager.submit_orders in
+    # batches, each journalled as one record, and answers each connection
+    # with one acknowledgement line per batch:
+    #   {"accepted": 250, "rejected": [{"line": 7, "error": "..."}], "through_line": 512}
+    def __init__(self, order_manager, host="127.0.0.1", port=8765, queue_size=10000, batch_size=500):
+        self.order_manager = order_manager
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.queue = None
+        self.server = None
+        self.consumer = None
+        self.accepted = 0
+        self.rejected = 0
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.consumer = asyncio.create_task(self._consume())
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.queue.join()
+        self.consumer.cancel()
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+    async def handle_client(self, reader, writer):
+        connection = _Connection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                connection.lines += 1
+                if not line.strip():
+                    continue
+                try:
+                    entry = parse_order(line)
+                except ValueError as e:
+                    entry = str(e)
+                connection.pending += 1
+                connection.settled.clear()
+                await self.queue.put((connection, connection.lines, entry))
+            await connection.settled.wait()
+        finally:
+            writer.close()
+    async def _consume(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            orders = [entry for _, _, entry in batch if isinstance(entry, Order)]
+            errors = {}  # position in `orders`, from 1 -> error
+            if orders:
+                errors = dict(self.order_manager.submit_orders(orders, batch_size=len(orders)).errors)
+            acks = {}
+            position = 0
+            for connection, line_number, entry in batch:
+                ack = acks.get(connection)
+                if ack is None:
+                    ack = acks[connection] = {"accepted": 0, "rejected": [], "through_line": 0}
+                if isinstance(entry, Order):
+                    position += 1
+                    error = errors.get(position)
+                else:
+                    error = entry
+                if error is None:
+                    ack["accepted"] += 1
+                    self.accepted += 1
+                else:
+                    ack["rejected"].append({"line": line_number, "error": error})
+                    self.rejected += 1
+                ack["through_line"] = line_number
+            for connection, ack in acks.items():
+                connection.acknowledge(ack)
+            for _ in batch:
+                self.queue.task_done()
+            # Let connection readers refill the queue before the next batch.
+            await asyncio.sleep(0)
+class _Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.lines = 0
+        self.pending = 0
+        self.settled = asyncio.Event()
+        self.settled.set()
+    def acknowledge(self, ack):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(ack) + "\n").encode())
+        self.pending -= ack["accepted"] + len(ack["rejected"])
+        if not self.pending:
+            self.settled.set()
+def parse_order(line):
+    try:
+        data = json.loads(line)
+    except ValueError:
+        raise ValueError("Invalid JSON.")
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object.")
+    order_id = data.get("order_id")
+    items_ordered = data.get("items_ordered")
+    if not isinstance(order_id, str) or not order_id:
+        raise ValueError("Missing order_id.")
+    if not isinstance(items_ordered, dict) or not items_ordered:
+        raise ValueError("Missing items_ordered.")
+    for item_id, qty in items_ordered.items():
+        if not isinstance(qty, int) or isinstance(qty, bool) or qty < 1:
+            raise ValueError(f"Invalid quantity for item '{item_id}'.")
+    priority = data.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise ValueError("Invalid priority.")
+    return Order(order_id, items_ordered, priority, data.get("due_date"))
+def start_intake_thread(order_manager, host="127.0.0.1", port=8765, **options):
+    # Runs an IntakeServer on its own event loop in a daemon thread, for use
+    # next to the Tk main loop. Returns the server once it is listening.
+    server = IntakeServer(order_manager, host, port, **options)
+    ready = threading.Event()
+    errors = []
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(server.start())
+        except Exception as e:
+            errors.append(e)
+            ready.set()
+            return
+        ready.set()
+        loop.run_forever()
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    if errors:
+        raise errors[0]
+    return server
+async def generate_load(host="127.0.0.1", port=8765, count=10000, item_ids=("S101",), prefix="LOAD"):
+    # Pushes `count` single-line orders over one connection and waits for all
+    # acknowledgements; returns (accepted, rejected, seconds).
+    reader, writer = await asyncio.open_connection(host, port)
+    started = time.perf_counter()
+    async def send():
+        for number in range(count):
+            order = {"order_id": f"{prefix}{number}", "items_ordered": {item_ids[number % len(item_ids)]: 1}}
+            writer.write((json.dumps(order) + "\n").encode())
+            if number % 1000 == 999:
+                await writer.drain()
+        await writer.drain()
+    sender = asyncio.create_task(send())
+    accepted = rejected = through_line = 0
+    while through_line < count:
+        line = await reader.readline()
+        if not line:
+            break
+        ack = json.loads(line)
+        accepted += ack["accepted"]
+        rejected += len(ack["rejected"])
+        through_line = ack["through_line"]
+    await sender
+    writer.close()
+    return accepted, rejected, time.perf_counter() - started
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse order intake service.")
+    parser.add_argument("mode", choices=["serve", "loadgen"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--count", type=int, default=10000, help="orders to send in loadgen mode")
+    args = parser.parse_args()
+    if args.mode == "loadgen":
+        accepted, rejected, seconds = asyncio.run(generate_load(args.host, args.port, args.count))
+        print(f"Sent {args.count} orders in {seconds:.2f}s ({args.count / seconds:.0f}/s): "
+              f"{accepted} accepted, {rejected} rejected.")
+        return
+    from warehouse_journal import Journal
+    from warehouse_persistence import load_inventory_from_file, load_orders_from_file
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager)
+    load_inventory_from_file(inventory_manager)
+    journal = Journal()
+    journal.recover(inventory_manager, order_manager, load_orders_from_file(order_manager, lazy_history=True))
+    journal.attach(inventory_manager, order_manager)
+    server = IntakeServer(order_manager, args.host, args.port)
+    print(f"Accepting orders on {args.host}:{args.port}. Press Ctrl+C to stop.")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        journal.checkpoint()
+        journal.close()
+        print(f"Accepted {server.accepted} orders, rejected {server.rejected}.")
+if __name__ == "__main__":
+    main()
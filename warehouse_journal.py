@@ -0,0 +1,263 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from warehouse_backend import OrderBacklog, OrderScheduler
+from warehouse_persistence import (item_to_dict, dict_to_item, order_to_dict, dict_to_order,
+                                   inventory_to_data, order_sections, write_json_atomic, write_orders_file)
+class Journal:
+    # Append-only log of inventory and order mutations, one JSON record per
+    # line. inventory.json and orders.json act as the snapshot; orders.json
+    # stores the sequence number it was checkpointed at and only later records
+    # are replayed on recovery.
+    #
+    # Item records carry absolute values (the full item, or the stock left
+    # after an order), so replaying them on top of an inventory.json that is
+    # newer than orders.json - a crash between the two snapshot writes -
+    # still converges on the right state.
+    def __init__(self, filename="warehouse.journal", inventory_filename="inventory.json",
+                 orders_filename="orders.json", checkpoint_every=1000, sync=False, indent=4):
+        # indent=None writes compact snapshots: smaller and quicker to write
+        # and parse, but not meant for reading by hand.
+        self.filename = filename
+        self.inventory_filename = inventory_filename
+        self.orders_filename = orders_filename
+        self.checkpoint_every = checkpoint_every
+        self.sync = sync
+        self.indent = indent
+        self.seq = 0
+        self.pending = 0
+        self.inventory_manager = None
+        self.order_manager = None
+        self.lock = threading.Lock()
+        self.checkpoint_lock = threading.Lock()  # one checkpoint at a time
+        self.file = None
+        self.valid_size = 0
+        self.metrics = None
+    def attach(self, inventory_manager, order_manager):
+        self.inventory_manager = inventory_manager
+        self.order_manager = order_manager
+        inventory_manager.journal = self
+        order_manager.journal = self
+        if self.file is None:
+            self.file = open(self.filename, "a")
+    def detach(self):
+        if self.inventory_manager is not None:
+            self.inventory_manager.journal = None
+        if self.order_manager is not None:
+            self.order_manager.journal = None
+    def close(self):
+        self.detach()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    def _append(self, record):
+        with self.lock:
+            self.seq += 1
+            record["seq"] = self.seq
+            self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.file.flush()
+            if self.sync:
+                os.fsync(self.file.fileno())
+            self.pending += 1
+        if self.metrics is not None:
+            self.metrics.inc("journal_records_total")
+    def item_put(self, item):
+        self._append({"op": "put_item", "item": item_to_dict(item)})
+    def items_put(self, items):
+        # A bulk import batch, replayed as a unit.
+        self._append({"op": "put_items", "items": [item_to_dict(item) for item in items]})
+    def item_removed(self, item_id):
+        self._append({"op": "remove_item", "item_id": item_id})
+    def items_cleared(self):
+        self._append({"op": "clear_items"})
+    def order_submitted(self, order):
+        self._append({"op": "submit_order", "order": order_to_dict(order)})
+    def orders_submitted(self, orders):
+        self._append({"op": "submit_orders", "orders": [order_to_dict(order) for order in orders]})
+    def orders_processed(self, fulfilled, unfulfilled, stock):
+        # `stock` maps item_id -> quantity left once all the listed orders were processed.
+        self._append({"op": "process_orders",
+                      "fulfilled": [order.order_id for order in fulfilled],
+                      "unfulfilled": [order.order_id for order in unfulfilled],
+                      "stock": stock})
+    def orders_cleared(self):
+        self._append({"op": "clear_orders"})
+    def orders_released(self, released, stock):
+        # Backordered orders moved from unfulfilled to fulfilled after a restock.
+        self._append({"op": "release_orders",
+                      "released": [order.order_id for order in released],
+                      "stock": stock})
+    def read_records(self, after_seq=0):
+        # Stops at a torn final line left by a crash mid-append; self.valid_size
+        # is the byte length of the intact prefix.
+        self.valid_size = 0
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.valid_size += len(line)
+                if record["seq"] > after_seq:
+                    yield record
+    def recover(self, inventory_manager, order_manager, base_seq=0, read_only=False):
+        # Replays the records after base_seq into the managers and cuts a
+        # torn final line off the file. With `read_only` the file is left
+        # untouched, for tools that only look at the state while the owning
+        # process keeps appending.
+        items = inventory_manager.items
+        queue = order_manager.order_queue
+        pending = _PendingOrders(queue.arrival_order() if isinstance(queue, OrderScheduler) else queue)
+        self.seq = base_seq
+        replayed = 0
+        for record in self.read_records(base_seq):
+            op = record["op"]
+            if op == "put_item":
+                item = dict_to_item(record["item"])
+                items[item.item_id] = item
+            elif op == "put_items":
+                for item_data in record["items"]:
+                    item = dict_to_item(item_data)
+                    items[item.item_id] = item
+            elif op == "remove_item":
+                items.pop(record["item_id"], None)
+            elif op == "clear_items":
+                items.clear()
+            elif op == "clear_orders":
+                pending = _PendingOrders(())
+                order_manager.fulfilled_orders.clear()
+                order_manager.unfulfilled_orders.clear()
+            elif op == "submit_order":
+                pending.extend([dict_to_order(record["order"])])
+            elif op == "submit_orders":
+                pending.extend(dict_to_order(order_data) for order_data in record["orders"])
+            elif op == "process_orders":
+                for order_id in record["fulfilled"]:
+                    order_manager.fulfilled_orders.append(pending.take(order_id))
+                for order_id in record["unfulfilled"]:
+                    order_manager.unfulfilled_orders.append(pending.take(order_id))
+                for item_id, quantity in record["stock"].items():
+                    if item_id in items:
+                        items[item_id].quantity = quantity
+            elif op == "release_orders":
+                # Moved to the fulfilled log in the order they were released.
+                wanted = Counter(record["released"])
+                matched = {}
+                remaining = []
+                for order in order_manager.unfulfilled_orders:
+                    if wanted[order.order_id]:
+                        wanted[order.order_id] -= 1
+                        matched.setdefault(order.order_id, deque()).append(order)
+                    else:
+                        remaining.append(order)
+                for order_id in record["released"]:
+                    orders = matched.get(order_id)
+                    if orders:
+                        order_manager.fulfilled_orders.append(orders.popleft())
+                order_manager.unfulfilled_orders.clear()
+                order_manager.unfulfilled_orders.extend(remaining)
+                for item_id, quantity in record["stock"].items():
+                    if item_id in items:
+                        items[item_id].quantity = quantity
+            self.seq = record["seq"]
+            replayed += 1
+        queue.clear()
+        queue.extend(pending.remaining())
+        # Orders carry their arrival numbers; new ones are numbered after them.
+        backlog = order_manager.unfulfilled_orders
+        for order in itertools.chain(queue, backlog if isinstance(backlog, OrderBacklog) else ()):
+            if order.arrival is not None and order.arrival >= order_manager.arrivals:
+                order_manager.arrivals = order.arrival + 1
+        if not read_only and os.path.exists(self.filename) and os.path.getsize(self.filename) > self.valid_size:
+            with open(self.filename, "r+b") as f:
+                f.truncate(self.valid_size)
+        inventory_manager.reindex()
+        self.pending = replayed
+        return replayed
+    def checkpoint(self):
+        # Snapshot the attached managers and drop the journal records the
+        # snapshot covers. The state is copied in memory under every stock
+        # stripe, the order manager's results lock and the journal lock, so
+        # no mutator is half way through, and written out with none of them
+        # held. Records appended meanwhile stay in the journal, to be
+        # replayed on top of the snapshot. A crash between any two steps
+        # recovers correctly: records up to the checkpoint are skipped only
+        # once orders.json carries its number, and a failed snapshot write
+        # raises before the journal is touched.
+        started = time.perf_counter()
+        with self.checkpoint_lock:
+            with self.inventory_manager.locks.hold_all(), self.order_manager.results_lock, self.lock:
+                inventory = inventory_to_data(self.inventory_manager)
+                sections = order_sections(self.order_manager)
+                seq = self.seq
+                covered = self.pending
+                offset = self._size()
+            write_json_atomic(inventory, self.inventory_filename, self.indent)
+            write_orders_file(self.order_manager, self.orders_filename, seq, self.indent, sections)
+            with self.lock:
+                self._drop_before(offset)
+                self.pending -= covered
+        if self.metrics is not None:
+            self.metrics.observe("checkpoint_seconds", time.perf_counter() - started)
+    def _size(self):
+        # Bytes written to the journal so far. Caller holds self.lock.
+        if self.file is None:
+            return 0
+        self.file.flush()
+        return os.path.getsize(self.filename)
+    def _drop_before(self, offset):
+        # Rewrites the journal without its first `offset` bytes and reopens
+        # it for appending. Caller holds self.lock.
+        rest = b""
+        if self.file is not None:
+            self.file.close()
+            with open(self.filename, "rb") as f:
+                f.seek(offset)
+                rest = f.read()
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(rest)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, self.filename)
+        self.file = open(self.filename, "a")
+    def maybe_checkpoint(self):
+        if self.pending >= self.checkpoint_every:
+            self.checkpoint()
+    def reset(self):
+        # Called after the managers were cleared (which is journalled, so a
+        # crash before this runs still recovers the empty state); the
+        # snapshot of it replaces everything written so far.
+        self.checkpoint()
+class _PendingOrders:
+    # The order queue while records are replayed: orders in arrival order
+    # with an index from order ID to their positions, so taking a processed
+    # order is O(1) rather than a scan and remove of the queue. Taken slots
+    # are blanked and the queue is rebuilt once, from remaining(), at the end.
+    def __init__(self, orders):
+        self.orders = []
+        self.positions = {}  # order_id -> positions in self.orders, oldest first
+        self.extend(orders)
+    def extend(self, orders):
+        for order in orders:
+            self.positions.setdefault(order.order_id, deque()).append(len(self.orders))
+            self.orders.append(order)
+    def take(self, order_id):
+        positions = self.positions.get(order_id)
+        if not positions:
+            raise ValueError(f"Journal refers to order '{order_id}' which is not in the queue.")
+        position = positions.popleft()
+        if not positions:
+            del self.positions[order_id]
+        order = self.orders[position]
+        self.orders[position] = None
+        return order
+    def remaining(self):
+        return [order for order in self.orders if order is not None]
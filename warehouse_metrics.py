@@ -0,0 +1,139 @@
+import bisect
+import json
+import os
+import threading
+import time
+# Upper bounds in seconds, four per decade from 1 microsecond to 10 seconds.
+LATENCY_BOUNDS = [round(10 ** (exponent / 4), 12) for exponent in range(-24, 5)]
+class Histogram:
+    # Bucketed observations, as in Prometheus: counts per upper bound plus a
+    # running sum; quantiles are interpolated within the matching bucket.
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds + [float("inf")], self.counts):
+            total += count
+            yield bound, total
+class Metrics:
+    # Counters, histograms and gauges for the managers and storage. Code
+    # paths hold an optional `metrics` attribute and skip instrumentation
+    # entirely while it is None. Gauges are callables sampled only when a
+    # snapshot is taken, so they cost nothing in between.
+    def __init__(self, prefix="warehouse_"):
+        self.prefix = prefix
+        self.counters = {}
+        self.maxima = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+    def attach(self, inventory_manager, order_manager, storage=None):
+        order_manager.metrics = self
+        if storage is not None:
+            storage.metrics = self
+        self.gauges["order_queue_depth"] = lambda: len(order_manager.order_queue)
+        self.gauges["unfulfilled_orders"] = lambda: len(order_manager.unfulfilled_orders)
+        self.gauges["inventory_items"] = lambda: len(inventory_manager.items)
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    def observe(self, name, value, counter=None):
+        # `counter`, if given, is incremented under the same lock acquisition.
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+            if counter is not None:
+                self.counters[counter] = self.counters.get(counter, 0) + 1
+    def record_max(self, name, value):
+        # A high-water mark, e.g. the deepest the queue has been.
+        if value > self.maxima.get(name, 0):
+            with self.lock:
+                if value > self.maxima.get(name, 0):
+                    self.maxima[name] = value
+    def counter(self, name):
+        return self.counters.get(name, 0)
+    def quantile(self, name, q):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            return histogram.quantile(q) if histogram is not None else 0.0
+    def snapshot(self):
+        gauges = {name: sample() for name, sample in self.gauges.items()}
+        with self.lock:
+            gauges.update(self.maxima)
+            return {
+                "timestamp": time.time(),
+                "uptime_seconds": time.time() - self.started,
+                "counters": dict(self.counters),
+                "gauges": gauges,
+                "histograms": {name: {"count": histogram.count,
+                                      "sum": histogram.sum,
+                                      "p50": histogram.quantile(0.5),
+                                      "p90": histogram.quantile(0.9),
+                                      "p99": histogram.quantile(0.99),
+                                      "buckets": [[bound if bound != float("inf") else "+Inf", count]
+                                                  for bound, count in histogram.cumulative()]}
+                               for name, histogram in self.histograms.items()},
+            }
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        prefix = self.prefix
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {prefix}{name} counter", f"{prefix}{name} {value}"]
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines += [f"# TYPE {prefix}{name} gauge", f"{prefix}{name} {value}"]
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for bound, count in histogram["buckets"]:
+                lines.append(f'{prefix}{name}_bucket{{le="{bound}"}} {count}')
+            lines += [f"{prefix}{name}_sum {histogram['sum']}", f"{prefix}{name}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+    def write_prometheus(self, filename="metrics.prom"):
+        _write_atomic(filename, self.to_prometheus())
+    def write_json(self, filename="metrics.json"):
+        _write_atomic(filename, json.dumps(self.snapshot(), indent=4))
+class RateMeter:
+    # Per-second rate of the sum of some counters between successive calls
+    # to rate().
+    def __init__(self, metrics, *names):
+        self.metrics = metrics
+        self.names = names
+        self.last_value = self.value()
+        self.last_time = time.perf_counter()
+    def value(self):
+        return sum(self.metrics.counter(name) for name in self.names)
+    def rate(self):
+        value = self.value()
+        now = time.perf_counter()
+        elapsed = now - self.last_time
+        rate = (value - self.last_value) / elapsed if elapsed > 0 else 0.0
+        self.last_value = value
+        self.last_time = now
+        return rate
+def _write_atomic(filename, text):
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w") as f:
+        f.write(text)
+    os.replace(tmp_filename, filename)
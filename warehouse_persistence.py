@@ -0,0 +1,482 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from warehouse_backend import ColumnarOrderLog, Item, Order, OrderBacklog
+logger = logging.getLogger("warehouse.persistence")
+def item_to_dict(item):
+    d = {
+        "item_id": item.item_id,
+        "name": item.name,
+        "quantity": item.quantity,
+        "category": item.category
+    }
+    if item.reorder_point is not None:
+        d["reorder_point"] = item.reorder_point
+    return d
+def dict_to_item(d):
+    return Item(d["item_id"], d["name"], d["quantity"], d.get("category", "General"), d.get("reorder_point"))
+def order_to_dict(order):
+    d = {
+        "order_id": order.order_id,
+        "items_ordered": order.items_ordered
+    }
+    if order.priority:
+        d["priority"] = order.priority
+    if order.due_date is not None:
+        d["due_date"] = order.due_date
+    if order.arrival is not None:
+        d["arrival"] = order.arrival
+    return d
+def dict_to_order(d):
+    order = Order(d["order_id"], d["items_ordered"], d.get("priority", 0), d.get("due_date"))
+    order.arrival = d.get("arrival")
+    return order
+def write_json_atomic(data, filename, indent=4):
+    # Write next to the target and rename over it, so a crash mid-write never
+    # leaves a truncated file behind. indent=None writes compact JSON.
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w") as f:
+        json.dump(data, f, indent=indent, separators=None if indent else (",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+class JsonStream:
+    # Incremental reader for large JSON documents. The file is read in binary
+    # chunks decoded as latin-1, so string positions equal byte offsets and
+    # callers can seek straight back to any value later on; values containing
+    # non-ASCII bytes are re-decoded as UTF-8.
+    _whitespace = re.compile(r"[ \t\n\r]*")
+    _decoder = json.JSONDecoder()
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.base = f.tell()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.base += self.pos
+        self.buf = self.buf[self.pos:] + chunk.decode("latin-1")
+        self.pos = 0
+        return True
+    def offset(self):
+        return self.base + self.pos
+    def peek(self):
+        while True:
+            self.pos = self._whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at byte {self.offset()}")
+        self.pos += 1
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self._fill():
+                    continue
+                raise
+            # A number running into the end of the buffer may be cut short.
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            break
+        raw = self.buf[self.pos:end]
+        self.pos = end
+        if not raw.isascii():
+            value = json.loads(raw.encode("latin-1").decode("utf-8"))
+        return value
+    def elements(self):
+        # Yields (offset, value) for the remaining elements of the array the
+        # stream is positioned in, consuming the closing bracket.
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            offset = self.offset()
+            yield offset, self.value()
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("]")
+                return
+    def array(self):
+        self.expect("[")
+        return self.elements()
+    def members(self):
+        # Yields each key of the object the stream is positioned at; the caller
+        # must consume the value (value(), array() or skip()) before resuming.
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+class OrderArchive:
+    # List-like view of an order history section stored in orders.json. Only a
+    # page offset index is kept in memory; pages are parsed on demand and a
+    # few are cached. Orders appended at runtime stay in a columnar log until
+    # the next save writes them out and the archive is rebound to the new file.
+    def __init__(self, filename, page_size=1000, cache_pages=4):
+        self.filename = filename
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.page_offsets = []
+        self.stored = 0
+        self.tail = ColumnarOrderLog()
+        self.cache = OrderedDict()
+        self.file = None
+    def index(self, stream):
+        self.page_offsets = []
+        self.stored = 0
+        for offset, _ in stream.elements():
+            if self.stored % self.page_size == 0:
+                self.page_offsets.append(offset)
+            self.stored += 1
+    def rebind(self, filename, page_offsets, stored, tail=()):
+        # `tail` holds orders appended after the new file was captured.
+        self.close()
+        self.filename = filename
+        self.page_offsets = page_offsets
+        self.stored = stored
+        self.tail = ColumnarOrderLog(tail)
+        self.cache.clear()
+    def snapshot(self):
+        return ArchiveSnapshot(self)
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    def page(self, number):
+        orders = self.cache.get(number)
+        if orders is not None:
+            self.cache.move_to_end(number)
+            return orders
+        if self.file is None:
+            self.file = open(self.filename, "rb")
+        self.file.seek(self.page_offsets[number])
+        count = min(self.page_size, self.stored - number * self.page_size)
+        orders = []
+        for _, order_data in JsonStream(self.file).elements():
+            orders.append(dict_to_order(order_data))
+            if len(orders) == count:
+                break
+        self.cache[number] = orders
+        if len(self.cache) > self.cache_pages:
+            self.cache.popitem(last=False)
+        return orders
+    def __len__(self):
+        return self.stored + len(self.tail)
+    def __iter__(self):
+        for number in range(len(self.page_offsets)):
+            yield from self.page(number)
+        yield from self.tail[:]
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("order archive index out of range")
+        if index >= self.stored:
+            return self.tail[index - self.stored]
+        return self.page(index // self.page_size)[index % self.page_size]
+    def append(self, order):
+        self.tail.append(order)
+    def extend(self, orders):
+        self.tail.extend(orders)
+    def clear(self):
+        self.close()
+        self.page_offsets = []
+        self.stored = 0
+        self.tail = ColumnarOrderLog()
+        self.cache.clear()
+class ArchiveSnapshot:
+    # The orders of an OrderArchive at the time it was taken, iterable later
+    # without holding the order manager's lock: the stored orders are read
+    # through a file handle of their own and the tail, which is only
+    # appended to until the archive is rebound, is cut at its current length.
+    def __init__(self, archive):
+        self.archive = archive
+        self.filename = archive.filename
+        self.first_offset = archive.page_offsets[0] if archive.page_offsets else None
+        self.stored = archive.stored
+        self.tail = archive.tail
+        self.tail_length = len(archive.tail)
+    def __iter__(self):
+        if self.stored:
+            with open(self.filename, "rb") as f:
+                f.seek(self.first_offset)
+                count = 0
+                for _, order_data in JsonStream(f).elements():
+                    yield dict_to_order(order_data)
+                    count += 1
+                    if count == self.stored:
+                        break
+        tail = self.tail
+        for index in range(self.tail_length):
+            yield tail[index]
+def inventory_to_data(inventory_manager):
+    return [item_to_dict(item) for item in inventory_manager.items.values()]
+def save_inventory_to_file(inventory_manager, filename="inventory.json"):
+    try:
+        write_json_atomic(inventory_to_data(inventory_manager), filename)
+    except Exception as e:
+        logger.error("Error saving inventory: %s", e)
+def load_inventory_from_file(inventory_manager, filename="inventory.json"):
+    if os.path.exists(filename):
+        try:
+            with open(filename, "rb") as f:
+                items = [dict_to_item(item_data) for _, item_data in JsonStream(f).array()]
+            inventory_manager.items.clear()
+            for item in items:
+                inventory_manager.items[item.item_id] = item
+            inventory_manager.reindex()
+        except Exception as e:
+            logger.error("Error loading inventory: %s", e)
+def order_sections(order_manager):
+    # What write_orders_file writes, captured while the caller holds the
+    # order manager's results lock (and every stock stripe, which keeps
+    # batch allocation out): the pending orders, including those taken off
+    # the queue but not yet logged, and copies of the order history.
+    # OrderArchive history is captured by length rather than copied.
+    in_flight = sorted(order_manager.in_flight.values(), key=lambda order: -1 if order.arrival is None else order.arrival)
+    sections = [("order_queue", in_flight + list(order_manager.order_queue))]
+    for key in ("fulfilled_orders", "unfulfilled_orders"):
+        orders = getattr(order_manager, key)
+        sections.append((key, orders.snapshot() if isinstance(orders, OrderArchive) else list(orders)))
+    return sections
+def write_orders_file(order_manager, filename, journal_seq=None, indent=4, sections=None):
+    # Streams the order lists out one order at a time (archived history is
+    # paged through rather than materialised), writing to a temp file that
+    # is renamed over `filename`. OrderArchive sections are then rebound to
+    # the new file, keeping orders appended since the capture. Pass
+    # `sections` from order_sections() to write a capture taken earlier;
+    # without it the lists are captured here, which suits a single thread.
+    tmp_filename = filename + ".tmp"
+    if sections is None:
+        sections = order_sections(order_manager)
+    pad = " " * indent if indent else ""
+    newline = "\n" if indent else ""
+    rebinds = []
+    with open(tmp_filename, "wb") as f:
+        f.write(b"{")
+        if journal_seq is not None:
+            f.write(f'{newline}{pad}"journal_seq": {journal_seq},'.encode())
+        for number, (key, orders) in enumerate(sections):
+            f.write(f'{newline}{pad}"{key}": ['.encode())
+            page_size = orders.archive.page_size if isinstance(orders, ArchiveSnapshot) else None
+            page_offsets = []
+            count = 0
+            for order in orders:
+                if count:
+                    f.write(b",")
+                f.write((newline + pad * 2).encode())
+                if page_size is not None and count % page_size == 0:
+                    page_offsets.append(f.tell())
+                text = json.dumps(order_to_dict(order), indent=indent, separators=None if indent else (",", ":"))
+                if indent:
+                    text = text.replace("\n", "\n" + pad * 2)
+                f.write(text.encode())
+                count += 1
+            if count:
+                f.write((newline + pad).encode())
+            f.write(b"]," if number < len(sections) - 1 else b"]")
+            if page_size is not None:
+                rebinds.append((orders, page_offsets, count))
+        f.write((newline + "}").encode())
+        f.flush()
+        os.fsync(f.fileno())
+    with order_manager.results_lock:
+        for snapshot, _, _ in rebinds:
+            snapshot.archive.close()
+        os.replace(tmp_filename, filename)
+        for snapshot, page_offsets, count in rebinds:
+            archive = snapshot.archive
+            if archive.tail is snapshot.tail:
+                archive.rebind(filename, page_offsets, count, archive.tail[snapshot.tail_length:])
+def save_orders_to_file(order_manager, filename="orders.json", journal_seq=None):
+    try:
+        write_orders_file(order_manager, filename, journal_seq)
+    except Exception as e:
+        logger.error("Error saving orders: %s", e)
+def load_orders_from_file(order_manager, filename="orders.json", lazy_history=False, page_size=1000):
+    # Parses the file one order at a time. With lazy_history the fulfilled and
+    # unfulfilled lists become OrderArchive views paged in from the file on
+    # demand, so only the live queue is materialised. An OrderBacklog of
+    # unfulfilled orders is always filled, as restocks release from it. Returns the journal
+    # sequence number the file was checkpointed at (0 if none).
+    journal_seq = 0
+    if os.path.exists(filename):
+        try:
+            order_manager.order_queue.clear()
+            order_manager.fulfilled_orders.clear()
+            order_manager.unfulfilled_orders.clear()
+            with open(filename, "rb") as f:
+                stream = JsonStream(f)
+                for key in stream.members():
+                    if key == "journal_seq":
+                        journal_seq = stream.value()
+                    elif key == "order_queue":
+                        for _, order_data in stream.array():
+                            order_manager.order_queue.append(dict_to_order(order_data))
+                    elif key in ("fulfilled_orders", "unfulfilled_orders"):
+                        if lazy_history and not isinstance(getattr(order_manager, key), OrderBacklog):
+                            archive = OrderArchive(filename, page_size)
+                            stream.expect("[")
+                            archive.index(stream)
+                            setattr(order_manager, key, archive)
+                        else:
+                            orders = getattr(order_manager, key)
+                            for _, order_data in stream.array():
+                                orders.append(dict_to_order(order_data))
+                    else:
+                        stream.value()
+        except Exception as e:
+            logger.error("Error loading orders: %s", e)
+    return journal_seq
+class PersistenceWorker:
+    # Runs storage.maybe_checkpoint() on a background thread so the Tk event
+    # loop never waits on a snapshot. request() marks the state dirty; once no
+    # request has come in for `debounce` seconds (or `max_delay` after the
+    # first), the requests are coalesced into one call. Other disk work that
+    # must not overlap a snapshot - an export, a reset - is handed over with
+    # submit() and runs on the same thread, so the caller only polls the
+    # returned Future. Work on other threads that a snapshot must wait for
+    # runs between pause() and resume() (or inside paused()): the worker
+    # waits for it, and pause() waits for a snapshot already in progress.
+    def __init__(self, storage, debounce=1.0, max_delay=10.0, clock=time.monotonic):
+        self.storage = storage
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.dirty_since = None
+        self.last_request = None
+        self.pauses = 0
+        self.saving = False
+        self.stopping = False
+        self.saves = 0
+        self.jobs = deque()  # (job, Future) in submission order
+        self.thread = None
+    def start(self):
+        if self.thread is None:
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+    def stop(self):
+        # Returns once the thread has run the submitted jobs and exited;
+        # pending requests are dropped, as callers checkpoint on exit anyway.
+        if self.thread is not None:
+            with self.condition:
+                self.stopping = True
+                self.condition.notify_all()
+            self.thread.join()
+            self.thread = None
+    def request(self):
+        with self.condition:
+            now = self.clock()
+            if self.dirty_since is None:
+                self.dirty_since = now
+            self.last_request = now
+            self.condition.notify_all()
+    def submit(self, job):
+        # Runs job() on the worker thread, ahead of any due save and even
+        # while paused. The Future carries its result or exception.
+        future = Future()
+        with self.condition:
+            self.jobs.append((job, future))
+            self.condition.notify_all()
+        return future
+    def pause(self):
+        with self.condition:
+            while self.saving:
+                self.condition.wait()
+            self.pauses += 1
+    def resume(self):
+        with self.condition:
+            self.pauses -= 1
+            self.condition.notify_all()
+    @contextmanager
+    def paused(self):
+        self.pause()
+        try:
+            yield
+        finally:
+            self.resume()
+    def _due(self):
+        # Caller holds self.condition. Returns seconds until a save is due
+        # (0 when due), or None while there is nothing to save.
+        if self.dirty_since is None or self.pauses:
+            return None
+        now = self.clock()
+        return max(0.0, min(self.last_request + self.debounce, self.dirty_since + self.max_delay) - now)
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopping and not self.jobs:
+                    wait = self._due()
+                    if wait == 0:
+                        break
+                    self.condition.wait(wait)
+                if self.jobs:
+                    job, future = self.jobs.popleft()
+                elif self.stopping:
+                    return
+                else:
+                    job = None
+                    self.dirty_since = None
+                    self.saving = True
+            if job is not None:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(job())
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            try:
+                self.storage.maybe_checkpoint()
+            except Exception:
+                logger.exception("Background checkpoint failed")
+                with self.condition:
+                    # Still dirty: retried after the next debounce.
+                    now = self.clock()
+                    if self.dirty_since is None:
+                        self.dirty_since = now
+                    self.last_request = now
+            finally:
+                with self.condition:
+                    self.saving = False
+                    self.saves += 1
+                    self.condition.notify_all()
+def peak_rss_bytes():
+    # Peak resident set size of this process, or None where the platform does
+    # not report it.
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
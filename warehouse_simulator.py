@@ -0,0 +1,188 @@
+import argparse
+import heapq
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from warehouse_backend import InventoryManager, OrderManager, OrderScheduler, configure_logging
+logger = logging.getLogger("warehouse.simulator")
+class StockOverlay:
+    # Copy-on-write view of a stock dict (item_id -> units). Reads fall
+    # through to `base` until an item is written, and writes only land in
+    # the overlay, so many scenarios can share one base and each costs
+    # memory for the items it touches. Items missing from the base read as
+    # None (unknown).
+    def __init__(self, base):
+        self.base = base
+        self.changes = {}
+    def get(self, item_id, default=None):
+        units = self.changes.get(item_id)
+        if units is None:
+            units = self.base.get(item_id, default)
+        return units
+    def __setitem__(self, item_id, units):
+        self.changes[item_id] = units
+    def __contains__(self, item_id):
+        return item_id in self.changes or item_id in self.base
+class Scenario:
+    # A what-if to evaluate against the pending queue: absolute stock levels
+    # (`stock`) and then units added (`restock`), both item_id -> units, on
+    # top of the live available stock, with the queue drained under one of
+    # OrderScheduler's policies.
+    def __init__(self, name, restock=None, stock=None, policy="fifo"):
+        if policy not in OrderScheduler.policies:
+            raise ValueError(f"Unknown scheduling policy '{policy}'. Choose from: "
+                             f"{', '.join(OrderScheduler.policies)}.")
+        self.name = name
+        self.restock = dict(restock or {})
+        self.stock = dict(stock or {})
+        self.policy = policy
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data.get("restock"), data.get("stock"), data.get("policy", "fifo"))
+class ScenarioResult:
+    def __init__(self, name, policy):
+        self.name = name
+        self.policy = policy
+        self.orders = 0
+        self.fulfilled = 0
+        self.units = 0
+        self.units_fulfilled = 0
+        self.shortages = {}  # item_id -> [orders blocked on it, units short]; units short is None for unknown items
+        self.seconds = 0.0
+    @property
+    def fill_rate(self):
+        return self.fulfilled / self.orders if self.orders else 1.0
+    @property
+    def unit_fill_rate(self):
+        return self.units_fulfilled / self.units if self.units else 1.0
+    def top_shortages(self, k=10):
+        # The items that turned away the most orders.
+        return heapq.nlargest(k, self.shortages.items(), key=lambda entry: entry[1][0])
+    def to_dict(self):
+        return {"name": self.name, "policy": self.policy, "orders": self.orders, "fulfilled": self.fulfilled,
+                "fill_rate": self.fill_rate, "unit_fill_rate": self.unit_fill_rate,
+                "shortages": {str(item_id): {"orders": blocked, "units_short": short}
+                              for item_id, (blocked, short) in self.shortages.items()},
+                "seconds": self.seconds}
+    def __str__(self):
+        return (f"{self.name} ({self.policy}): {self.fulfilled}/{self.orders} orders fulfilled "
+                f"({self.fill_rate:.1%}, {self.unit_fill_rate:.1%} of units), "
+                f"{len(self.shortages)} item(s) short")
+def simulate(stock, orders, scenario):
+    # Drains `orders` (pending orders in arrival order) against an overlay
+    # of `stock` (item_id -> available units). Each order is all-or-nothing,
+    # as in OrderManager._allocate, and its first shortage is charged to
+    # the item that caused it.
+    started = time.perf_counter()
+    result = ScenarioResult(scenario.name, scenario.policy)
+    overlay = StockOverlay(stock)
+    for item_id, units in scenario.stock.items():
+        overlay[item_id] = units
+    for item_id, units in scenario.restock.items():
+        overlay[item_id] = overlay.get(item_id, 0) + units
+    if scenario.policy == "fifo":
+        sequence = orders
+    else:
+        scheduler = OrderScheduler(scenario.policy, orders)
+        sequence = (scheduler.popleft() for _ in range(len(scheduler)))
+    shortages = result.shortages
+    for order in sequence:
+        lines = order.items_ordered
+        units = sum(lines.values())
+        result.units += units
+        for item_id, qty in lines.items():
+            available = overlay.get(item_id)
+            if available is None or available < qty:
+                entry = shortages.get(item_id)
+                if entry is None:
+                    entry = shortages[item_id] = [0, 0 if available is not None else None]
+                entry[0] += 1
+                if available is not None:
+                    entry[1] += qty - max(available, 0)
+                break
+        else:
+            for item_id, qty in lines.items():
+                overlay[item_id] = overlay.get(item_id) - qty
+            result.fulfilled += 1
+            result.units_fulfilled += units
+    result.orders = len(orders)
+    result.seconds = time.perf_counter() - started
+    return result
+# Set in each worker process by _init_worker, so the base stock and the
+# queue are pickled once per worker rather than once per scenario.
+_base_stock = None
+_pending = None
+def _init_worker(stock, orders):
+    global _base_stock, _pending
+    _base_stock = stock
+    _pending = orders
+def _simulate(scenario):
+    return simulate(_base_stock, _pending, scenario)
+class WhatIfSimulator:
+    # Dry runs of an OrderManager's pending queue. snapshot() copies the
+    # queue in arrival order (under the results lock, which every queue
+    # mutator takes) and the available stock of just the items it asks for
+    # (those stripes held briefly); every scenario then
+    # runs on its own overlay of that copy, so the live InventoryManager and
+    # queue are only read. Like compare_policies, with restock plans and
+    # optionally in worker processes.
+    def __init__(self, order_manager):
+        self.order_manager = order_manager
+    def snapshot(self):
+        order_manager = self.order_manager
+        with order_manager.results_lock:
+            queue = order_manager.order_queue
+            orders = queue.arrival_order() if isinstance(queue, OrderScheduler) else list(queue)
+        item_ids = {item_id for order in orders for item_id in order.items_ordered}
+        inventory_manager = order_manager.inventory_manager
+        items = inventory_manager.items
+        reserved = inventory_manager.reserved
+        with inventory_manager.locks.hold(item_ids):
+            stock = {item_id: items[item_id].quantity - reserved.get(item_id, 0)
+                     for item_id in item_ids if item_id in items}
+        return stock, orders
+    def run(self, scenarios, processes=None):
+        # Results in the order of `scenarios`; with `processes`, scenarios
+        # are spread over that many worker processes.
+        scenarios = list(scenarios)
+        stock, orders = self.snapshot()
+        if processes and len(scenarios) > 1:
+            with ProcessPoolExecutor(max_workers=min(processes, len(scenarios)), initializer=_init_worker,
+                                     initargs=(stock, orders)) as pool:
+                return list(pool.map(_simulate, scenarios))
+        return [simulate(stock, orders, scenario) for scenario in scenarios]
+def main():
+    parser = argparse.ArgumentParser(description="What-if fulfilment of the pending order queue.")
+    parser.add_argument("scenarios", nargs="?",
+                        help='JSON list of {"name", "restock", "stock", "policy"} objects '
+                             "(default: the current stock under each scheduling policy)")
+    parser.add_argument("--processes", type=int, help="worker processes to spread the scenarios over")
+    parser.add_argument("--shortages", type=int, default=5, help="top shortages to list per scenario")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    configure_logging()
+    from warehouse_journal import Journal
+    from warehouse_persistence import load_inventory_from_file, load_orders_from_file
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager)
+    load_inventory_from_file(inventory_manager)
+    # Read-only: a live GUI or intake service may be appending to the journal.
+    Journal().recover(inventory_manager, order_manager, load_orders_from_file(order_manager, lazy_history=True),
+                      read_only=True)
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios = [Scenario.from_dict(data) for data in json.load(f)]
+    else:
+        scenarios = [Scenario(policy, policy=policy) for policy in OrderScheduler.policies]
+    results = WhatIfSimulator(order_manager).run(scenarios, args.processes)
+    for result in results:
+        logger.info("%s", result)
+        for item_id, (blocked, short) in result.top_shortages(args.shortages):
+            logger.info("    %s: %s order(s) turned away, %s", item_id, blocked,
+                        "unknown item" if short is None else f"{short} unit(s) short")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=4)
+if __name__ == "__main__":
+    main()
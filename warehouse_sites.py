@@ -0,0 +1,345 @@
+import logging
+import math
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from warehouse_backend import AllocationResult, InventoryManager, Item, Order, OrderManager, Result, _report
+logger = logging.getLogger("warehouse.sites")
+def shard_of(item_id, shards):
+    # Stable across processes and runs, unlike hash(), so worker processes
+    # and a restarted application agree on where an item lives.
+    return zlib.crc32(str(item_id).encode()) % shards
+class Site:
+    # A warehouse with its own InventoryManager. `location` is an (x, y)
+    # point used by the "nearest" allocation policy.
+    def __init__(self, name, location=(0.0, 0.0), inventory_manager=None):
+        self.name = name
+        self.location = location
+        self.inventory_manager = inventory_manager if inventory_manager is not None else InventoryManager()
+    def distance(self, point):
+        return math.dist(self.location, point)
+class ShardedInventory:
+    # Inventory split across sites, one InventoryManager each. With
+    # partition="site" an item may be stocked at any number of sites and
+    # add_item names the site; with partition="hash" each item ID lives on
+    # exactly one shard, chosen by shard_of, and orders can be allocated
+    # shard by shard in worker processes.
+    def __init__(self, sites, partition="site"):
+        if partition not in ("site", "hash"):
+            raise ValueError(f"Unknown partitioning '{partition}'. Choose from: site, hash.")
+        self.sites = list(sites)
+        self.by_name = {site.name: site for site in self.sites}
+        self.partition = partition
+    def shard_index(self, item_id):
+        return shard_of(item_id, len(self.sites))
+    def add_item(self, item, site=None):
+        if self.partition == "hash":
+            target = self.sites[self.shard_index(item.item_id)]
+        elif site is None:
+            raise ValueError("Site partitioning needs the site each item is stocked at.")
+        else:
+            target = self.by_name[site]
+        return target.inventory_manager.add_item(item)
+    def candidate_sites(self, item_ids):
+        # Indices of the sites that may stock any of `item_ids`.
+        if self.partition == "hash":
+            return sorted({self.shard_index(item_id) for item_id in item_ids})
+        return list(range(len(self.sites)))
+    def quantity(self, index, item_id):
+        # Units of `item_id` available at site `index`, or None if the site
+        # does not stock it.
+        return self.sites[index].inventory_manager.available(item_id)
+    def available(self, item_id):
+        total = 0
+        for index in self.candidate_sites((item_id,)):
+            quantity = self.quantity(index, item_id)
+            if quantity is not None:
+                total += quantity
+        return total
+    def search(self, search_term, limit=None):
+        # Returns (site name, item) pairs from every site, site by site.
+        matches = []
+        for site in self.sites:
+            remaining = None if limit is None else limit - len(matches)
+            if remaining is not None and remaining <= 0:
+                break
+            matches.extend((site.name, item) for item in site.inventory_manager.search(search_term, remaining))
+        return matches
+class SiteAllocator:
+    # Splits an order's lines across the sites that stock them. Policies:
+    #   nearest        - each line is taken from the closest site with stock,
+    #                    spilling over to the next closest when it runs short;
+    #   fewest_splits  - sites that can ship most of the order go first, so it
+    #                    ships from as few sites as possible; distance breaks
+    #                    ties.
+    # Without a destination sites are ranked in the order they were given.
+    policies = ("nearest", "fewest_splits")
+    def __init__(self, sharded, policy="nearest"):
+        if policy not in self.policies:
+            raise ValueError(f"Unknown allocation policy '{policy}'. Choose from: {', '.join(self.policies)}.")
+        self.sharded = sharded
+        self.policy = policy
+    def ranked_sites(self, candidates, ship_to=None):
+        if ship_to is None:
+            return list(candidates)
+        sites = self.sharded.sites
+        point = self.sharded.by_name[ship_to].location if isinstance(ship_to, str) else ship_to
+        return sorted(candidates, key=lambda index: sites[index].distance(point))
+    def _by_coverage(self, items_ordered, ranked, quantity):
+        # Greedy set cover: repeatedly take the site that can fill the most
+        # remaining lines outright, then the most remaining units.
+        remaining = dict(items_ordered)
+        chosen = []
+        candidates = list(ranked)
+        while remaining and candidates:
+            best = None
+            best_score = (0, 0)
+            for index in candidates:
+                lines = units = 0
+                for item_id, qty in remaining.items():
+                    available = quantity(index, item_id) or 0
+                    if available >= qty:
+                        lines += 1
+                    units += min(qty, available)
+                if (lines, units) > best_score:
+                    best, best_score = index, (lines, units)
+            if best is None:
+                break
+            chosen.append(best)
+            candidates.remove(best)
+            for item_id in list(remaining):
+                remaining[item_id] -= min(remaining[item_id], quantity(best, item_id) or 0)
+                if remaining[item_id] <= 0:
+                    del remaining[item_id]
+        return chosen + candidates
+    def plan(self, items_ordered, ship_to=None, quantity=None):
+        # Returns ({site index: {item_id: qty}}, None), or (None, shortage) with
+        # shortage as from OrderManager._allocate, available being the units
+        # stocked across all sites. `quantity(index, item_id)` defaults to
+        # live stock; callers hold the stripes of the ordered items.
+        quantity = quantity if quantity is not None else self.sharded.quantity
+        ranked = self.ranked_sites(self.sharded.candidate_sites(items_ordered), ship_to)
+        if self.policy == "fewest_splits" and len(ranked) > 1:
+            ranked = self._by_coverage(items_ordered, ranked, quantity)
+        plan = {}
+        for item_id, qty in items_ordered.items():
+            remaining = qty
+            stocked = False
+            for index in ranked:
+                if remaining <= 0:
+                    break
+                available = quantity(index, item_id)
+                if available is None:
+                    continue
+                stocked = True
+                if available > 0:
+                    take = min(remaining, available)
+                    lines = plan.get(index)
+                    if lines is None:
+                        lines = plan[index] = {}
+                    lines[item_id] = take
+                    remaining -= take
+            if remaining > 0:
+                return None, (item_id, qty, qty - remaining if stocked else None)
+        return plan, None
+def _allocate_shard(stock, legs):
+    # Runs in a worker process: allocates one shard's legs (position, lines)
+    # in FIFO order over a copy of the shard's stock. Returns the failed legs
+    # as {position: shortage} and the stock left for every item taken from.
+    inventory_manager = InventoryManager()
+    for item_id, quantity in stock.items():
+        inventory_manager.items[item_id] = Item(item_id, item_id, quantity)
+    order_manager = OrderManager(inventory_manager)
+    order_manager.order_queue.extend(Order(position, lines) for position, lines in legs)
+    result = order_manager.allocate_batch()
+    return result.shortages, {item_id: inventory_manager.items[item_id].quantity for item_id in result.units_allocated}
+class ShardedOrderManager:
+    # Allocates orders against a ShardedInventory. Each order is
+    # all-or-nothing across sites: its items' stripes are taken at every
+    # candidate site (in site order, so orders cannot deadlock) before the
+    # allocator plans and stock is taken. The sites an order shipped from are
+    # kept in `shipments`.
+    def __init__(self, sharded, allocator=None):
+        self.sharded = sharded
+        self.allocator = allocator if allocator is not None else SiteAllocator(sharded)
+        self.order_queue = deque()  # (order, ship_to)
+        self.fulfilled_orders = []
+        self.unfulfilled_orders = []
+        self.shipments = {}  # order_id -> {site name: {item_id: qty}}
+        self.metrics = None
+        self.results_lock = threading.Lock()
+    def submit_order(self, order, ship_to=None):
+        # `ship_to` is an (x, y) point or a site name.
+        with self.results_lock:
+            self.order_queue.append((order, ship_to))
+        return _report(logging.INFO, Result.OK, "Order '%s' submitted successfully.", order.order_id,
+                       order_id=order.order_id)
+    def _allocate(self, order, ship_to=None):
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        sites = self.sharded.sites
+        candidates = self.sharded.candidate_sites(order.items_ordered)
+        held = [(sites[index].inventory_manager.locks,
+                 sites[index].inventory_manager.locks.acquire(order.items_ordered)) for index in candidates]
+        try:
+            plan, shortage = self.allocator.plan(order.items_ordered, ship_to)
+            if plan is not None:
+                for index, lines in plan.items():
+                    items = sites[index].inventory_manager.items
+                    for item_id, qty in lines.items():
+                        items[item_id].quantity -= qty
+            with self.results_lock:
+                if plan is not None:
+                    self.fulfilled_orders.append(order)
+                    self.shipments[order.order_id] = {sites[index].name: lines for index, lines in plan.items()}
+                else:
+                    self.unfulfilled_orders.append(order)
+        finally:
+            for locks, stripes in reversed(held):
+                locks.release(stripes)
+        if plan is not None:
+            for index, lines in plan.items():
+                sites[index].inventory_manager._notify(lines)
+        if metrics is not None:
+            metrics.observe("order_processing_seconds", time.perf_counter() - started,
+                            "orders_fulfilled_total" if shortage is None else "orders_unfulfilled_total")
+        return shortage
+    def _outcome(self, order, shortage):
+        order_id = order.order_id
+        if shortage is None:
+            return _report(logging.INFO, Result.FULFILLED, "Order '%s' has been fulfilled from %s.", order_id,
+                           ", ".join(self.shipments.get(order_id, ())), order_id=order_id)
+        item_id, qty, available = shortage
+        if available is None:
+            result = _report(logging.WARNING, Result.UNKNOWN_ITEM,
+                             "Item ID '%s' is not stocked at any site for Order '%s'.", item_id, order_id,
+                             item_id=item_id, order_id=order_id, needed=qty)
+        else:
+            result = _report(logging.WARNING, Result.INSUFFICIENT_STOCK,
+                             "Not enough stock for '%s' across sites (needed: %s, available: %s) in Order '%s'.",
+                             item_id, qty, available, order_id,
+                             item_id=item_id, order_id=order_id, needed=qty, available=available)
+        logger.info("Order '%s' could not be fulfilled due to inventory issues.", order_id)
+        return result
+    def process_next_order(self):
+        try:
+            order, ship_to = self.order_queue.popleft()
+        except IndexError:
+            return _report(logging.INFO, Result.QUEUE_EMPTY, "No pending orders to process.")
+        return self._outcome(order, self._allocate(order, ship_to))
+    def process_all_orders(self, processes=None):
+        # With `processes`, hash-partitioned shards are allocated in parallel
+        # worker processes; see _process_in_parallel.
+        if processes:
+            return self._process_in_parallel(processes)
+        result = AllocationResult()
+        while True:
+            try:
+                order, ship_to = self.order_queue.popleft()
+            except IndexError:
+                return result
+            shortage = self._allocate(order, ship_to)
+            self._outcome(order, shortage)
+            result.record(order, shortage)
+    def _process_in_parallel(self, processes):
+        # Each order is split into one leg per shard and every shard runs its
+        # legs through allocate_batch in a worker process, in FIFO order. An
+        # order is fulfilled when all of its legs are; otherwise the legs
+        # that succeeded are put back. Stock a failed order held meanwhile may
+        # have turned away later orders, so failed orders then get a second,
+        # in-process pass in arrival order. Stock never oversells, but orders
+        # can complete out of FIFO order.
+        if self.sharded.partition != "hash":
+            raise ValueError("Parallel allocation needs hash-partitioned shards.")
+        started = time.perf_counter()
+        sites = self.sharded.sites
+        result = AllocationResult()
+        with ExitStack() as stack:
+            for site in sites:
+                stack.enter_context(site.inventory_manager.locks.hold_all())
+            with self.results_lock:
+                pending = [self.order_queue.popleft()[0] for _ in range(len(self.order_queue))]
+            legs = [[] for _ in sites]
+            splits = []
+            for position, order in enumerate(pending):
+                split = {}
+                for item_id, qty in order.items_ordered.items():
+                    index = self.sharded.shard_index(item_id)
+                    lines = split.get(index)
+                    if lines is None:
+                        lines = split[index] = {}
+                    lines[item_id] = qty
+                for index, lines in split.items():
+                    legs[index].append((position, lines))
+                splits.append(split)
+            jobs = []
+            for index, shard_legs in enumerate(legs):
+                inventory_manager = sites[index].inventory_manager
+                items = inventory_manager.items
+                reserved = inventory_manager.reserved
+                stock = {item_id: items[item_id].quantity - reserved.get(item_id, 0)
+                         for _, lines in shard_legs for item_id in lines if item_id in items}
+                jobs.append((stock, shard_legs))
+            if pending:
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    outcomes = list(pool.map(_allocate_shard, *zip(*jobs)))
+            else:
+                outcomes = [({}, {}) for _ in sites]
+            shortages = {}
+            for shard_shortages, _ in outcomes:
+                for position, shortage in shard_shortages.items():
+                    shortages.setdefault(position, shortage)
+            # Workers saw available stock; apply what they took as a delta so
+            # reserved units stay on hand.
+            changed = [dict(left) for _, left in outcomes]
+            for index, shard_legs in enumerate(legs):
+                items = sites[index].inventory_manager.items
+                stock = jobs[index][0]
+                left = changed[index]
+                for position, lines in shard_legs:
+                    if position in shortages and position not in outcomes[index][0]:
+                        for item_id, qty in lines.items():
+                            left[item_id] = left.get(item_id, stock[item_id]) + qty
+                for item_id, available in left.items():
+                    items[item_id].quantity -= stock[item_id] - available
+            for position in sorted(shortages):
+                split = splits[position]
+                fits = True
+                for index, lines in split.items():
+                    inventory_manager = sites[index].inventory_manager
+                    for item_id, qty in lines.items():
+                        available = inventory_manager.available(item_id)
+                        if available is None or available < qty:
+                            fits = False
+                            break
+                    if not fits:
+                        break
+                if fits:
+                    for index, lines in split.items():
+                        items = sites[index].inventory_manager.items
+                        for item_id, qty in lines.items():
+                            items[item_id].quantity -= qty
+                            changed[index][item_id] = items[item_id].quantity
+                    del shortages[position]
+            with self.results_lock:
+                for position, order in enumerate(pending):
+                    shortage = shortages.get(position)
+                    if shortage is None:
+                        self.fulfilled_orders.append(order)
+                        self.shipments[order.order_id] = {sites[index].name: lines
+                                                          for index, lines in splits[position].items()}
+                    else:
+                        self.unfulfilled_orders.append(order)
+                    result.record(order, shortage)
+        for index, site in enumerate(sites):
+            if changed[index]:
+                site.inventory_manager._notify(changed[index])
+        if self.metrics is not None:
+            self.metrics.observe("batch_allocation_seconds", time.perf_counter() - started)
+            self.metrics.inc("orders_fulfilled_total", len(result.fulfilled))
+            self.metrics.inc("orders_unfulfilled_total", len(result.unfulfilled))
+        return result
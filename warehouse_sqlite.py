@@ -0,0 +1,358 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from warehouse_backend import InventoryManager, Item, Order, OrderManager
+logger = logging.getLogger("warehouse.sqlite")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    reorder_point INTEGER
+);
+CREATE INDEX IF NOT EXISTS items_id_nocase ON items (item_id COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS items_name ON items (name COLLATE NOCASE, item_id);
+CREATE INDEX IF NOT EXISTS items_quantity ON items (quantity);
+CREATE INDEX IF NOT EXISTS items_category ON items (category COLLATE NOCASE, name COLLATE NOCASE, item_id);
+CREATE INDEX IF NOT EXISTS items_reorder_gap ON items (quantity - reorder_point) WHERE reorder_point IS NOT NULL;
+CREATE TABLE IF NOT EXISTS orders (
+    seq INTEGER PRIMARY KEY,
+    order_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    moved INTEGER,
+    priority INTEGER NOT NULL DEFAULT 0,
+    due_date TEXT,
+    arrival INTEGER
+);
+CREATE INDEX IF NOT EXISTS orders_order_id ON orders (order_id, status);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, moved);
+CREATE TABLE IF NOT EXISTS order_lines (
+    order_seq INTEGER NOT NULL REFERENCES orders (seq),
+    item_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (order_seq, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS order_lines_item ON order_lines (item_id);
+"""
+PUT_ITEM = ("INSERT INTO items (item_id, name, quantity, category, reorder_point) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (item_id) DO UPDATE SET name = excluded.name, quantity = excluded.quantity, "
+            "category = excluded.category, reorder_point = excluded.reorder_point")
+SET_QUANTITY = "UPDATE items SET quantity = ? WHERE item_id = ?"
+INSERT_ORDER = "INSERT INTO orders (order_id, status, moved, priority, due_date, arrival) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_LINE = "INSERT INTO order_lines (order_seq, item_id, quantity) VALUES (?, ?, ?)"
+# Orders are matched by ID and current status, oldest first, the same way the
+# journal replays them.
+MOVE_ORDER = ("UPDATE orders SET status = ?, moved = ? WHERE seq = "
+              "(SELECT seq FROM orders WHERE order_id = ? AND status = ? ORDER BY seq LIMIT 1)")
+SORT_COLUMNS = {
+    "item_id": "item_id",
+    "name": "name COLLATE NOCASE",
+    "category": "category COLLATE NOCASE, name COLLATE NOCASE",
+    "quantity": "quantity",
+}
+def _like_escape(term):
+    return str(term).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+class SqliteStore:
+    # SQLite storage with the same hook interface as Journal: once attached,
+    # InventoryManager and OrderManager write every change through to the
+    # database, which replaces inventory.json, orders.json and the journal.
+    # Writes are batched into one transaction per `batch_size` changes (and on
+    # every maybe_checkpoint/checkpoint), so a crash loses at most that many;
+    # the connection runs in WAL mode so readers never block the writer.
+    #
+    # The managers keep working on their in-memory state; the query methods
+    # below answer search, sorting, low stock and order history from SQL
+    # indexes without loading everything. The GUI's inventory view, search
+    # and low-stock list use them when the store is the backend. They read
+    # through the same connection, so writes not yet committed are seen.
+    def __init__(self, filename="warehouse.db", batch_size=100):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.pending = 0
+        self.inventory_manager = None
+        self.order_manager = None
+        self.metrics = None
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        if "arrival" not in {row[1] for row in self.connection.execute("PRAGMA table_info(orders)")}:
+            # Databases created before orders kept their arrival numbers.
+            self.connection.execute("ALTER TABLE orders ADD COLUMN arrival INTEGER")
+        self.moves = self.connection.execute("SELECT coalesce(max(moved), 0) FROM orders").fetchone()[0]
+    def attach(self, inventory_manager, order_manager):
+        self.inventory_manager = inventory_manager
+        self.order_manager = order_manager
+        inventory_manager.journal = self
+        order_manager.journal = self
+    def detach(self):
+        if self.inventory_manager is not None:
+            self.inventory_manager.journal = None
+        if self.order_manager is not None:
+            self.order_manager.journal = None
+    def close(self):
+        self.detach()
+        with self.lock:
+            if self.connection is not None:
+                self._commit()
+                self.connection.close()
+                self.connection = None
+    def _commit(self):
+        # Caller holds self.lock.
+        if self.connection.in_transaction:
+            self.connection.execute("COMMIT")
+        self.pending = 0
+    def _begin(self):
+        # Caller holds self.lock.
+        if not self.connection.in_transaction:
+            self.connection.execute("BEGIN")
+    def _written(self):
+        # Caller holds self.lock.
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self._commit()
+    def _write(self, sql, rows):
+        with self.lock:
+            self._begin()
+            self.connection.executemany(sql, rows)
+            self._written()
+    def _order_rows(self, orders, status):
+        # Caller holds self.lock and an open transaction.
+        cursor = self.connection.cursor()
+        for order in orders:
+            moved = None
+            if status != "queued":
+                self.moves += 1
+                moved = self.moves
+            cursor.execute(INSERT_ORDER, (order.order_id, status, moved, order.priority, order.due_date, order.arrival))
+            seq = cursor.lastrowid
+            cursor.executemany(INSERT_LINE, [(seq, item_id, qty) for item_id, qty in order.items_ordered.items()])
+    def _move(self, orders, old_status, new_status):
+        # Caller holds self.lock and an open transaction.
+        rows = []
+        for order in orders:
+            self.moves += 1
+            rows.append((new_status, self.moves, order.order_id, old_status))
+        self.connection.executemany(MOVE_ORDER, rows)
+    def item_put(self, item):
+        self._write(PUT_ITEM, [(item.item_id, item.name, item.quantity, item.category, item.reorder_point)])
+    def items_put(self, items):
+        self._write(PUT_ITEM, [(item.item_id, item.name, item.quantity, item.category, item.reorder_point)
+                               for item in items])
+    def item_removed(self, item_id):
+        self._write("DELETE FROM items WHERE item_id = ?", [(item_id,)])
+    def items_cleared(self):
+        self._write("DELETE FROM items", [()])
+    def order_submitted(self, order):
+        with self.lock:
+            self._begin()
+            self._order_rows([order], "queued")
+            self._written()
+    def orders_submitted(self, orders):
+        with self.lock:
+            self._begin()
+            self._order_rows(orders, "queued")
+            self._written()
+    def orders_processed(self, fulfilled, unfulfilled, stock):
+        with self.lock:
+            self._begin()
+            self._move(fulfilled, "queued", "fulfilled")
+            self._move(unfulfilled, "queued", "unfulfilled")
+            self.connection.executemany(SET_QUANTITY, [(qty, item_id) for item_id, qty in stock.items()])
+            self._written()
+    def orders_cleared(self):
+        with self.lock:
+            self._begin()
+            self.connection.execute("DELETE FROM order_lines")
+            self.connection.execute("DELETE FROM orders")
+            self._written()
+    def orders_released(self, released, stock):
+        with self.lock:
+            self._begin()
+            self._move(released, "unfulfilled", "fulfilled")
+            self.connection.executemany(SET_QUANTITY, [(qty, item_id) for item_id, qty in stock.items()])
+            self._written()
+    def checkpoint(self):
+        started = time.perf_counter()
+        with self.lock:
+            self._commit()
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if self.metrics is not None:
+            self.metrics.observe("checkpoint_seconds", time.perf_counter() - started)
+    def maybe_checkpoint(self):
+        with self.lock:
+            self._commit()
+    def reset(self):
+        # Empties the database, e.g. after the managers were cleared.
+        with self.lock:
+            self._commit()
+            self.connection.execute("BEGIN")
+            self.connection.execute("DELETE FROM order_lines")
+            self.connection.execute("DELETE FROM orders")
+            self.connection.execute("DELETE FROM items")
+            self._commit()
+    def save_all(self, inventory_manager, order_manager):
+        # Replaces the database contents with the managers' state in a single
+        # transaction.
+        with self.lock:
+            self._commit()
+            connection = self.connection
+            connection.execute("BEGIN")
+            try:
+                connection.execute("DELETE FROM order_lines")
+                connection.execute("DELETE FROM orders")
+                connection.execute("DELETE FROM items")
+                connection.executemany(PUT_ITEM, ((item.item_id, item.name, item.quantity, item.category,
+                                                   item.reorder_point)
+                                                  for item in inventory_manager.items.values()))
+                self.moves = 0
+                self._order_rows(order_manager.order_queue.arrival_order()
+                                 if hasattr(order_manager.order_queue, "arrival_order")
+                                 else order_manager.order_queue, "queued")
+                self._order_rows(order_manager.fulfilled_orders, "fulfilled")
+                self._order_rows(order_manager.unfulfilled_orders, "unfulfilled")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            self._commit()
+    def recover(self, inventory_manager, order_manager, base_seq=0):
+        # Loads the stored state into the managers (base_seq is accepted for
+        # compatibility with Journal.recover and ignored). Returns the number
+        # of items loaded.
+        with self.lock:
+            self._commit()
+            connection = self.connection
+            items = inventory_manager.items
+            items.clear()
+            for item_id, name, quantity, category, reorder_point in connection.execute(
+                    "SELECT item_id, name, quantity, category, reorder_point FROM items"):
+                items[item_id] = Item(item_id, name, quantity, category, reorder_point)
+            order_manager.order_queue.clear()
+            order_manager.fulfilled_orders.clear()
+            order_manager.unfulfilled_orders.clear()
+            for status, orders, order_by in (("queued", order_manager.order_queue, "seq"),
+                                             ("fulfilled", order_manager.fulfilled_orders, "moved"),
+                                             ("unfulfilled", order_manager.unfulfilled_orders, "moved")):
+                for order in self._orders("status = ?", [status], order_by):
+                    orders.append(order)
+            # New orders are numbered after the stored ones, as after a journal replay.
+            last_arrival = connection.execute("SELECT max(arrival) FROM orders").fetchone()[0]
+            if last_arrival is not None and last_arrival >= order_manager.arrivals:
+                order_manager.arrivals = last_arrival + 1
+        inventory_manager.reindex()
+        return len(items)
+    def _orders(self, where, params, order_by, limit=-1, offset=0):
+        # Caller holds self.lock. Streams the matching orders with their lines
+        # from a single query.
+        order = None
+        for seq, order_id, priority, due_date, arrival, item_id, qty in self.connection.execute(
+                "SELECT o.seq, o.order_id, o.priority, o.due_date, o.arrival, l.item_id, l.quantity "
+                f"FROM (SELECT * FROM orders WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?) AS o "
+                f"JOIN order_lines AS l ON l.order_seq = o.seq ORDER BY o.{order_by}", params + [limit, offset]):
+            if order is None or order[0] != seq:
+                if order is not None:
+                    yield order[1]
+                order = (seq, Order(order_id, {}, priority, due_date))
+                order[1].arrival = arrival
+            order[1].items_ordered[item_id] = qty
+        if order is not None:
+            yield order[1]
+    def _items(self, sql, params):
+        with self.lock:
+            return [Item(*row) for row in self.connection.execute(
+                "SELECT item_id, name, quantity, category, reorder_point FROM items " + sql, params)]
+    def search(self, search_term, limit=100):
+        # ID or name prefix matches first (served by the indexes), then any
+        # other substring match.
+        term = _like_escape(search_term)
+        if not term:
+            return []
+        matches = self._items("WHERE item_id LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' "
+                              "ORDER BY name COLLATE NOCASE LIMIT ?", (term + "%", term + "%", limit))
+        if len(matches) < limit:
+            seen = {item.item_id for item in matches}
+            for item in self._items("WHERE item_id LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' "
+                                    "ORDER BY name COLLATE NOCASE LIMIT ?",
+                                    ("%" + term + "%", "%" + term + "%", limit)):
+                if item.item_id not in seen and len(matches) < limit:
+                    matches.append(item)
+        return matches
+    def items_page(self, sort_by="name", page=0, page_size=50, descending=False, term=None):
+        # (items on the page, total) like SortIndex.page; with `term`, only
+        # items whose ID or name contains it (case-insensitively).
+        columns = SORT_COLUMNS[sort_by]
+        if descending:
+            columns = ", ".join(column + " DESC" for column in columns.split(", "))
+        where, params = "", ()
+        if term:
+            pattern = "%" + _like_escape(term) + "%"
+            where, params = "WHERE item_id LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' ", (pattern, pattern)
+        items = self._items(f"{where}ORDER BY {columns}, item_id LIMIT ? OFFSET ?", params + (page_size, page * page_size))
+        with self.lock:
+            total = self.connection.execute("SELECT count(*) FROM items " + where, params).fetchone()[0]
+        return items, total
+    def items_below(self, quantity, limit=-1):
+        return self._items("WHERE quantity < ? ORDER BY quantity LIMIT ?", (quantity, limit))
+    def items_at_reorder_point(self, limit=-1):
+        # Items at or below their reorder point, furthest below first, as
+        # ReorderAlerts.below_reorder_point.
+        return self._items("WHERE reorder_point IS NOT NULL AND quantity - reorder_point <= 0 "
+                           "ORDER BY quantity - reorder_point LIMIT ?", (limit,))
+    def items_in_category(self, category, limit=-1):
+        return self._items("WHERE category = ? COLLATE NOCASE ORDER BY name COLLATE NOCASE LIMIT ?",
+                           (category, limit))
+    def order_history(self, status=None, order_id=None, item_id=None, limit=100, offset=0):
+        # Fulfilled/unfulfilled orders in the order they were processed,
+        # optionally only those with a given ID or containing a given item.
+        conditions = ["status != 'queued'" if status is None else "status = ?"]
+        params = [] if status is None else [status]
+        if order_id is not None:
+            conditions.append("order_id = ?")
+            params.append(order_id)
+        if item_id is not None:
+            conditions.append("seq IN (SELECT order_seq FROM order_lines WHERE item_id = ?)")
+            params.append(item_id)
+        with self.lock:
+            return list(self._orders(" AND ".join(conditions), params, "moved", limit, offset))
+def migrate_from_json(store, inventory_filename="inventory.json", orders_filename="orders.json",
+                      journal_filename="warehouse.journal"):
+    # Imports the JSON snapshot plus any journal records written after it. The
+    # journal is only read: another process may still be appending to it.
+    from warehouse_journal import Journal
+    from warehouse_persistence import load_inventory_from_file, load_orders_from_file
+    inventory_manager = InventoryManager()
+    order_manager = OrderManager(inventory_manager)
+    load_inventory_from_file(inventory_manager, inventory_filename)
+    journal_seq = load_orders_from_file(order_manager, orders_filename)
+    Journal(journal_filename).recover(inventory_manager, order_manager, journal_seq, read_only=True)
+    store.save_all(inventory_manager, order_manager)
+    return len(inventory_manager.items), len(order_manager.fulfilled_orders) + len(order_manager.unfulfilled_orders)
+def open_store(filename="warehouse.db", **options):
+    # Opens (creating if needed) the database, importing the JSON files the
+    # first time if they exist.
+    new = not os.path.exists(filename)
+    store = SqliteStore(filename, **options)
+    if new and os.path.exists("inventory.json"):
+        items, orders = migrate_from_json(store)
+        logger.info("Imported %s items and %s processed orders into %s.", items, orders, filename)
+    return store
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse SQLite storage.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default="warehouse.db")
+    parser.add_argument("--inventory", default="inventory.json")
+    parser.add_argument("--orders", default="orders.json")
+    parser.add_argument("--journal", default="warehouse.journal")
+    args = parser.parse_args()
+    store = SqliteStore(args.db)
+    items, orders = migrate_from_json(store, args.inventory, args.orders, args.journal)
+    store.checkpoint()
+    store.close()
+    print(f"Imported {items} items and {orders} processed orders into {args.db}.")
+if __name__ == "__main__":
+    main()